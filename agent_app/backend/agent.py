@@ -1,14 +1,23 @@
 
 from langchain_groq import ChatGroq
-from langchain_tavily import TavilySearch
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
+from langgraph.graph import StateGraph, START, END
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from typing import Iterable, Tuple, TypedDict
 import os
-import requests
+import asyncio
+import logging
 import json
 from dotenv import load_dotenv
 from model import TicketModel
+from http_client import TICKET_API_URL, post_json, apost_json
+from inprocess_retrieval import search_similar_tickets, asearch_similar_tickets
+from web_search import build_web_search
+from solution_memo import build_solution_memo
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -16,6 +25,15 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY") 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 CHAT_MODEL_NAME = os.getenv("CHAT_MODEL_NAME", "llama-3.1-8b-instant")
+# "fast": both tools in parallel + one synthesis call (ReAct as fallback); "react": always the ReAct loop
+AGENT_MODE = os.getenv("AGENT_MODE", "fast")
+# "http": query the ticket API over HTTP (remote deployments); "inprocess": call its retriever directly (same host)
+AGENT_RETRIEVAL_MODE = os.getenv("AGENT_RETRIEVAL_MODE", "http")
+# Tavily rejects longer queries
+WEB_QUERY_MAX_CHARS = 400
+# Prefixes of the tool outputs returned when a tool call fails
+SIMILAR_TICKETS_ERROR = "Error querying similar tickets"
+WEB_SEARCH_ERROR = "Error searching web"
 
 # Initialize LLM
 llm = ChatGroq(
@@ -26,17 +44,12 @@ llm = ChatGroq(
 
 # --- Tools ---
 
-@tool
-def get_similar_tickets_tool(description: str) -> str:
-    """
-    Useful to find similar support tickets in the database. 
-    Input should be a detailed description of the problem.
-    Returns a string representation of similar tickets found.
-    """
-    url = "http://localhost:8000/api/get_similar_tickets"
-    
+SIMILAR_TICKETS_URL = f"{TICKET_API_URL}/api/get_similar_tickets"
+
+
+def _search_payload(description: str) -> dict:
     # Construct a dummy ticket dictionary for the API
-    payload = {
+    return {
         "ticketId": "SEARCH-QUERY",
         "creationDate": "2024-01-01", # Required
         "priority": "Medium", # Default
@@ -46,27 +59,50 @@ def get_similar_tickets_tool(description: str) -> str:
         "actions": "None"
     }
 
+
+def _format_similar_tickets(tickets: list) -> str:
+    if not tickets:
+        return "No similar tickets found."
+
+    # Format the output for the LLM
+    result_str = "Found similar tickets:\n"
+    for i, t in enumerate(tickets):
+        result_str += f"{i+1}. ID: {t.get('ticketId')} - Description: {t.get('description')} - Actions: {t.get('actions')}\n"
+    return result_str
+
+
+@tool
+def get_similar_tickets_tool(description: str) -> str:
+    """
+    Useful to find similar support tickets in the database. 
+    Input should be a detailed description of the problem.
+    Returns a string representation of similar tickets found.
+    """
+    try:
+        if AGENT_RETRIEVAL_MODE == "inprocess":
+            return _format_similar_tickets(search_similar_tickets(description))
+        return _format_similar_tickets(post_json(SIMILAR_TICKETS_URL, _search_payload(description)))
+    except Exception as e:
+        return f"{SIMILAR_TICKETS_ERROR}: {str(e)}"
+
+
+async def aget_similar_tickets(description: str) -> str:
+    """
+    Async version of `get_similar_tickets_tool`, for concurrent tool calls.
+    """
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        tickets = response.json()
-        
-        if not tickets:
-            return "No similar tickets found."
-            
-        # Format the output for the LLM
-        result_str = "Found similar tickets:\n"
-        for i, t in enumerate(tickets):
-            result_str += f"{i+1}. ID: {t.get('ticketId')} - Description: {t.get('description')} - Actions: {t.get('actions')}\n"
-        return result_str
-        
+        if AGENT_RETRIEVAL_MODE == "inprocess":
+            return _format_similar_tickets(await asearch_similar_tickets(description))
+        return _format_similar_tickets(await apost_json(SIMILAR_TICKETS_URL, _search_payload(description)))
     except Exception as e:
-        return f"Error querying similar tickets: {str(e)}"
+        return f"{SIMILAR_TICKETS_ERROR}: {str(e)}"
 
-# Tavily Tool wrapped to avoid schema complexity / type errors
+# Web search wrapped to avoid schema complexity / type errors
 # LLMs sometimes struggle with the complex schema of TavilySearch (sending strings for lists)
 # So we expose a simpler interface.
-tavily_search = TavilySearch(max_results=3)
+# The provider (Tavily or the offline corpus stand-in) is chosen by WEB_SEARCH_PROVIDER,
+# and results are kept in a persistent TTL cache keyed by the normalized query.
+web_search = build_web_search()
 
 @tool
 def search_web_tool(query: str) -> str:
@@ -75,14 +111,27 @@ def search_web_tool(query: str) -> str:
     Input should be a search query string.
     """
     try:
-        results = tavily_search.invoke({"query": query})
-        # Parse results to string
-        output = []
-        for res in results:
-            output.append(f"Source: {res.get('url')}\nContent: {res.get('content')}")
-        return "\n\n".join(output)
+        return _format_web_results(web_search.search(query))
     except Exception as e:
-        return f"Error searching web: {str(e)}"
+        return f"{WEB_SEARCH_ERROR}: {str(e)}"
+
+
+async def asearch_web(query: str) -> str:
+    """
+    Async version of `search_web_tool`.
+    """
+    try:
+        return _format_web_results(await web_search.asearch(query))
+    except Exception as e:
+        return f"{WEB_SEARCH_ERROR}: {str(e)}"
+
+
+def _format_web_results(results) -> str:
+    # Parse results to string
+    output = []
+    for res in results:
+        output.append(f"Source: {res.get('url')}\nContent: {res.get('content')}")
+    return "\n\n".join(output)
 
 tools = [get_similar_tickets_tool, search_web_tool]
 
@@ -95,15 +144,99 @@ Propose a complete solution based on the findings.'''
 # Create the agent using LangGraph
 agent_executor = create_react_agent(llm, tools, prompt=system_message)
 
-def solve_ticket(ticket_to_resolve: TicketModel) -> str:
+# --- Fast path ---
+# The ReAct prompt always runs the same sequence (similar tickets, web search, answer), paying one
+# LLM turn per step. The fast path runs both tools concurrently and makes a single synthesis call.
+
+synthesis_system_message = '''You are a support engineer. You receive a support ticket, similar tickets from our database
+(with the actions taken) and web search results. Combine them into a complete, step-by-step solution.
+Rely on the similar tickets when they are relevant and on the web results for public documentation.
+The solution must match the language of the ticket description; translate it if necessary.'''
+
+
+class FastPathState(TypedDict, total=False):
+    description: str
+    similar_tickets: str
+    web_results: str
+    solution: str
+
+
+def similar_tickets_node(state: FastPathState) -> dict:
+    return {"similar_tickets": get_similar_tickets_tool.invoke({"description": state["description"]})}
+
+
+def web_search_node(state: FastPathState) -> dict:
+    return {"web_results": search_web_tool.invoke({"query": state["description"][:WEB_QUERY_MAX_CHARS]})}
+
+
+async def asimilar_tickets_node(state: FastPathState) -> dict:
+    return {"similar_tickets": await aget_similar_tickets(state["description"])}
+
+
+async def aweb_search_node(state: FastPathState) -> dict:
+    return {"web_results": await asearch_web(state["description"][:WEB_QUERY_MAX_CHARS])}
+
+
+def _synthesis_messages(state: FastPathState) -> list:
+    findings = f"""
+    Ticket description:
+    "{state["description"]}"
+
+    Similar tickets:
+    {state.get("similar_tickets", "Not available.")}
+
+    Web search results:
+    {state.get("web_results", "Not available.")}
     """
-    Main entry point for the agent.
+    return [SystemMessage(content=synthesis_system_message), HumanMessage(content=findings)]
+
+
+def synthesize_node(state: FastPathState) -> dict:
+    return {"solution": llm.invoke(_synthesis_messages(state)).content}
+
+
+async def asynthesize_node(state: FastPathState) -> dict:
+    return {"solution": (await llm.ainvoke(_synthesis_messages(state))).content}
+
+
+fast_path_builder = StateGraph(FastPathState)
+# Each node has a sync and an async implementation, so the graph supports both invoke and ainvoke
+fast_path_builder.add_node("similar_tickets", RunnableLambda(similar_tickets_node, afunc=asimilar_tickets_node))
+fast_path_builder.add_node("web_search", RunnableLambda(web_search_node, afunc=aweb_search_node))
+fast_path_builder.add_node("synthesize", RunnableLambda(synthesize_node, afunc=asynthesize_node))
+# Both tools start from START, so LangGraph runs them in the same (parallel) step
+fast_path_builder.add_edge(START, "similar_tickets")
+fast_path_builder.add_edge(START, "web_search")
+fast_path_builder.add_edge(["similar_tickets", "web_search"], "synthesize")
+fast_path_builder.add_edge("synthesize", END)
+fast_path_graph = fast_path_builder.compile()
+
+
+def _tools_succeeded(outputs: Iterable[str]) -> bool:
+    return not any(str(output).startswith((SIMILAR_TICKETS_ERROR, WEB_SEARCH_ERROR)) for output in outputs)
+
+
+def _fast_path_result(state: FastPathState) -> Tuple[str, bool]:
+    return state.get("solution", ""), _tools_succeeded([state.get("similar_tickets", ""), state.get("web_results", "")])
+
+
+def solve_ticket_fast(description: str) -> Tuple[str, bool]:
     """
-    description = ticket_to_resolve.description
-    if not description:
-        return "Error: Ticket has no description."
+    Deterministic fast path: similar tickets and web search in parallel, then one LLM call.
+    Returns the solution and whether both tools succeeded.
+    """
+    return _fast_path_result(fast_path_graph.invoke({"description": description}))
+
+
+async def asolve_ticket_fast(description: str) -> Tuple[str, bool]:
+    """
+    Async version of `solve_ticket_fast`: both tools run as concurrent coroutines.
+    """
+    return _fast_path_result(await fast_path_graph.ainvoke({"description": description}))
+
 
-    query = f"""
+def _react_query(description: str) -> str:
+    return f"""
     I have a support ticket with the following description:
     "{description}"
     
@@ -113,11 +246,154 @@ def solve_ticket(ticket_to_resolve: TicketModel) -> str:
     3. Finally, combine the information to propose a step-by-step solution.
     4. The solution must match the language of the ticket description; please translate it if necessary.
     """
-    
+
+
+def _react_result(response: dict) -> Tuple[str, bool]:
+    messages = response["messages"]
+    # The last message is the AI's final answer
+    tool_outputs = [message.content for message in messages if isinstance(message, ToolMessage)]
+    return messages[-1].content, _tools_succeeded(tool_outputs)
+
+
+def solve_ticket_react(description: str) -> Tuple[str, bool]:
+    """
+    ReAct loop: the LLM decides which tools to call, one reasoning turn per step.
+    Returns the solution and whether every tool call succeeded.
+    """
+    # LangGraph invoke expects "messages"
+    return _react_result(agent_executor.invoke({"messages": [HumanMessage(content=_react_query(description))]}))
+
+
+async def asolve_ticket_react(description: str) -> Tuple[str, bool]:
+    """
+    Async version of `solve_ticket_react`.
+    """
+    return _react_result(await agent_executor.ainvoke({"messages": [HumanMessage(content=_react_query(description))]}))
+
+
+# Memo of final solutions: near-duplicate tickets reuse a stored solution instead of running the agent
+solution_memo = build_solution_memo()
+
+
+def _log_memo_error(e: Exception) -> None:
+    # The memo is an optimization: a failure there must not prevent solving the ticket
+    logger.warning("Solution memo unavailable: %s: %s", type(e).__name__, e)
+
+
+def _reused_response(match) -> dict:
+    return {
+        "solution": match.solution,
+        "reused": True,
+        "reusedFrom": match.ticket_id,
+        "similarity": round(match.similarity, 4),
+    }
+
+
+def _run_agent(description: str) -> Tuple[str, bool]:
+    """
+    Fast path (AGENT_MODE=fast) with the ReAct agent as fallback. Raises if the ReAct agent fails.
+    Returns the solution and whether it was built without tool errors (only then is it memoized).
+    """
+    if AGENT_MODE == "fast":
+        try:
+            solution, tools_ok = solve_ticket_fast(description)
+            if solution:
+                return solution, tools_ok
+        except Exception as e:
+            logger.warning("Fast path failed, falling back to ReAct: %s: %s", type(e).__name__, e)
+    return solve_ticket_react(description)
+
+
+async def _arun_agent(description: str) -> Tuple[str, bool]:
+    """
+    Async version of `_run_agent`.
+    """
+    if AGENT_MODE == "fast":
+        try:
+            solution, tools_ok = await asolve_ticket_fast(description)
+            if solution:
+                return solution, tools_ok
+        except Exception as e:
+            logger.warning("Fast path failed, falling back to ReAct: %s: %s", type(e).__name__, e)
+    return await asolve_ticket_react(description)
+
+
+def solve_ticket_with_details(ticket_to_resolve: TicketModel) -> dict:
+    """
+    Solve a ticket, reusing the stored solution of a near-duplicate ticket when there is one.
+    Returns {"solution", "reused"} plus "reusedFrom" (ticket id) and "similarity" when reused.
+    """
+    description = ticket_to_resolve.description
+    if not description:
+        return {"solution": "Error: Ticket has no description.", "reused": False}
+
+    fingerprint = None
+    if solution_memo is not None:
+        try:
+            fingerprint = solution_memo.fingerprint(description)
+            match = solution_memo.lookup(fingerprint)
+            if match is not None:
+                return _reused_response(match)
+        except Exception as e:
+            _log_memo_error(e)
+
+    try:
+        solution, tools_ok = _run_agent(description)
+    except Exception as e:
+        return {"solution": f"Error running agent: {str(e)}", "reused": False}
+
+    # A solution written without the similar tickets or the web results must not be reused
+    if fingerprint is not None and solution and tools_ok:
+        try:
+            solution_memo.store(fingerprint, description, solution, ticket_to_resolve.ticketId)
+        except Exception as e:
+            _log_memo_error(e)
+    return {"solution": solution, "reused": False}
+
+
+async def solve_ticket_with_details_async(ticket_to_resolve: TicketModel) -> dict:
+    """
+    Async version of `solve_ticket_with_details`, so the API does not block its event loop during an agent run.
+    """
+    description = ticket_to_resolve.description
+    if not description:
+        return {"solution": "Error: Ticket has no description.", "reused": False}
+
+    fingerprint = None
+    if solution_memo is not None:
+        try:
+            fingerprint = await solution_memo.afingerprint(description)
+            # The memo is SQLite: keep its queries off the event loop
+            match = await asyncio.to_thread(solution_memo.lookup, fingerprint)
+            if match is not None:
+                return _reused_response(match)
+        except Exception as e:
+            _log_memo_error(e)
+
     try:
-        # LangGraph invoke expects "messages"
-        response = agent_executor.invoke({"messages": [HumanMessage(content=query)]})
-        # The last message is the AI's final answer
-        return response["messages"][-1].content
+        solution, tools_ok = await _arun_agent(description)
     except Exception as e:
-        return f"Error running agent: {str(e)}"
+        return {"solution": f"Error running agent: {str(e)}", "reused": False}
+
+    if fingerprint is not None and solution and tools_ok:
+        try:
+            await asyncio.to_thread(solution_memo.store, fingerprint, description, solution, ticket_to_resolve.ticketId)
+        except Exception as e:
+            _log_memo_error(e)
+    return {"solution": solution, "reused": False}
+
+
+def solve_ticket(ticket_to_resolve: TicketModel) -> str:
+    """
+    Main entry point for the agent.
+    Reuses the solution of a near-duplicate ticket if one was already solved; otherwise uses
+    the fast path (AGENT_MODE=fast) and falls back to the ReAct agent if it fails.
+    """
+    return solve_ticket_with_details(ticket_to_resolve)["solution"]
+
+
+async def solve_ticket_async(ticket_to_resolve: TicketModel) -> str:
+    """
+    Async version of `solve_ticket`.
+    """
+    return (await solve_ticket_with_details_async(ticket_to_resolve))["solution"]
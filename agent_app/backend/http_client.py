@@ -0,0 +1,120 @@
+import os
+import random
+import asyncio
+from typing import Any, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+TICKET_API_URL = os.getenv("TICKET_API_URL", "http://localhost:8000")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+# Backoff between retries: HTTP_BACKOFF_FACTOR * 2^attempt plus up to HTTP_BACKOFF_JITTER seconds of jitter
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.3"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+def build_session(
+    max_retries: int = HTTP_MAX_RETRIES,
+    pool_size: int = HTTP_POOL_SIZE,
+) -> requests.Session:
+    """
+    Session with a keep-alive connection pool and retries with jittered backoff
+    on connection errors and on 429/502/503/504 (honoring Retry-After).
+    """
+    retry = Retry(
+        total=max_retries,
+        # A single read retry covers stale keep-alive connections without repeating a hung call many times
+        read=1,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUS_CODES,
+        # The ticket API endpoints we call are read-only, so POST is safe to retry
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+http_session = build_session()
+
+
+def post_json(url: str, payload: Any, read_timeout: float = HTTP_READ_TIMEOUT) -> Any:
+    """
+    POST a JSON payload through the pooled session and return the decoded JSON response.
+    """
+    response = http_session.post(url, json=payload, timeout=(HTTP_CONNECT_TIMEOUT, read_timeout))
+    response.raise_for_status()
+    return response.json()
+
+
+# --- Async variant ---
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared AsyncClient (created on first use) with its own keep-alive pool.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        )
+    return _async_client
+
+
+def _backoff_seconds(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return HTTP_BACKOFF_FACTOR * 2 ** attempt + random.uniform(0, HTTP_BACKOFF_JITTER)
+
+
+async def apost_json(url: str, payload: Any, max_retries: int = HTTP_MAX_RETRIES) -> Any:
+    """
+    Async version of `post_json`. Connection errors and 429/502/503/504 are retried with
+    jittered backoff; read timeouts are not, so a hung API cannot stall the agent run several times over.
+    """
+    client = get_async_client()
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.post(url, json=payload)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError):
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(_backoff_seconds(attempt))
+            continue
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            await asyncio.sleep(_backoff_seconds(attempt, response))
+            continue
+        response.raise_for_status()
+        return response.json()
+
+
+async def aclose() -> None:
+    """
+    Close the shared AsyncClient (call on application shutdown).
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
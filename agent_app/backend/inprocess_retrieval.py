@@ -0,0 +1,97 @@
+import os
+import sys
+import asyncio
+import importlib
+import threading
+from typing import Any, List
+from dotenv import dotenv_values
+
+# Directory of the Part 1 API (this repository's `api/` by default)
+TICKET_API_DIR = os.path.abspath(
+    os.getenv("TICKET_API_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "api"))
+)
+
+# Store and cache paths of the API config, with the API's defaults. Relative values are resolved
+# from the API directory, as when the API itself is started there
+API_PATH_SETTINGS = {
+    "TICKET_STORE_PATH": ".tickets.sqlite",
+    "LOCAL_VECTOR_STORE_PATH": ".vector_store",
+    "INDEX_GENERATION_PATH": ".index_generation",
+    "EMBEDDING_CACHE_PATH": ".embedding_cache.sqlite",
+    "RETRIEVAL_CACHE_PATH": ".retrieval_cache.sqlite",
+    "LLM_CACHE_PATH": ".llm_cache.sqlite",
+    "INGESTION_JOBS_DIR": ".ingestion_jobs",
+}
+
+_retriever = None
+_import_lock = threading.Lock()
+
+
+def _resolve_api_paths() -> None:
+    """
+    Point the API's store and cache settings at absolute paths under the API directory, so the
+    import neither depends on nor changes this process's working directory.
+    """
+    api_env = dotenv_values(os.path.join(TICKET_API_DIR, ".env"))
+    for name, default in API_PATH_SETTINGS.items():
+        value = os.environ.get(name) or api_env.get(name) or default
+        os.environ[name] = os.path.join(TICKET_API_DIR, value)
+
+
+def get_retriever() -> Any:
+    """
+    Import `api.modules.rag_tickets_retriever` once and return it.
+    The API's clients (embeddings, vector store) and caches are created here and shared by every
+    agent run. Relative store paths in the API config (local vector store, ticket store, caches)
+    are resolved from the API directory, as when the API itself is started (see `_resolve_api_paths`).
+    """
+    global _retriever
+    if _retriever is not None:
+        return _retriever
+    with _import_lock:
+        if _retriever is None:
+            repo_root = os.path.dirname(TICKET_API_DIR)
+            if repo_root not in sys.path:
+                sys.path.insert(0, repo_root)
+            _resolve_api_paths()
+            _retriever = importlib.import_module(f"{os.path.basename(TICKET_API_DIR)}.modules.rag_tickets_retriever")
+    return _retriever
+
+
+async def aopen() -> None:
+    """
+    Import the retriever and open the API's shared vector-store session on the running event loop.
+    """
+    retriever = await asyncio.to_thread(get_retriever)
+    await retriever.open_vector_store()
+
+
+async def aclose() -> None:
+    """
+    Close the API's async clients (vector-store session, Groq) if the retriever was imported.
+    """
+    if _retriever is not None:
+        package = _retriever.__name__.rsplit(".", 1)[0]
+        await importlib.import_module(f"{package}.third_party_clients").close_clients()
+
+
+def _query_ticket(retriever: Any, description: str) -> Any:
+    # Retrieval only reads the description: build the query ticket without validating placeholder fields
+    return retriever.TicketModel.model_construct(description=description)
+
+
+def search_similar_tickets(description: str) -> List[dict]:
+    """
+    Similar tickets from the API's retriever, called in-process (no HTTP hop, no JSON round trip).
+    """
+    retriever = get_retriever()
+    return [ticket.model_dump() for ticket in retriever.retrieve_relevant_tickets(_query_ticket(retriever, description))]
+
+
+async def asearch_similar_tickets(description: str) -> List[dict]:
+    """
+    Async version of `search_similar_tickets`.
+    """
+    retriever = get_retriever()
+    tickets = await retriever.retrieve_relevant_tickets_async(_query_ticket(retriever, description))
+    return [ticket.model_dump() for ticket in tickets]
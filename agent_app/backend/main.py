@@ -1,13 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from agent import solve_ticket
+from agent import solve_ticket_with_details_async, AGENT_RETRIEVAL_MODE
+from http_client import aclose as close_http_client
+from inprocess_retrieval import aopen as open_inprocess_retrieval, aclose as close_inprocess_retrieval
 import uvicorn
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Ticket Resolution Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AGENT_RETRIEVAL_MODE == "inprocess":
+        # Import the API's retriever (and open its stores) before serving the first request
+        await open_inprocess_retrieval()
+    yield
+    # Close the pooled connections to the ticket API
+    await close_http_client()
+    await close_inprocess_retrieval()
+
+app = FastAPI(title="Ticket Resolution Agent API", lifespan=lifespan)
 
 class Item(BaseModel):
     ticket: dict
@@ -19,8 +32,8 @@ async def solve_ticket_endpoint(item: Item):
     try:
         # Convert dict to TicketModel
         ticket_model = TicketModel(**item.ticket)
-        solution = solve_ticket(ticket_model)
-        return {"solution": solution}
+        # {"solution", "reused"} (+ "reusedFrom", "similarity" when a near-duplicate's solution is reused)
+        return await solve_ticket_with_details_async(ticket_model)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
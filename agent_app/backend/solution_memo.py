@@ -0,0 +1,295 @@
+import os
+import time
+import sqlite3
+import hashlib
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from text_tokens import tokenize
+
+load_dotenv()
+
+# --- Configuration ---
+SOLUTION_MEMO_ENABLED = os.getenv("SOLUTION_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+SOLUTION_MEMO_PATH = os.getenv("SOLUTION_MEMO_PATH", ".solution_memo.sqlite")
+# Estimated Jaccard similarity (word 3-shingles) above which a stored solution is reused
+SOLUTION_MEMO_MINHASH_THRESHOLD = float(os.getenv("SOLUTION_MEMO_MINHASH_THRESHOLD", "0.8"))
+# Cosine similarity of the description embeddings above which a stored solution is reused
+SOLUTION_MEMO_EMBEDDING_THRESHOLD = float(os.getenv("SOLUTION_MEMO_EMBEDDING_THRESHOLD", "0.95"))
+# Stored solutions older than this are not reused (0: never expire)
+SOLUTION_MEMO_TTL_SECONDS = float(os.getenv("SOLUTION_MEMO_TTL_SECONDS", str(30 * 24 * 3600)))
+# Expired solutions and their LSH buckets are deleted at most this often, on store
+SOLUTION_MEMO_PURGE_INTERVAL_SECONDS = float(os.getenv("SOLUTION_MEMO_PURGE_INTERVAL_SECONDS", "3600"))
+# "none" (MinHash only), "inprocess" (the ticket API's embedding client) or "package.module:factory"
+SOLUTION_MEMO_EMBEDDINGS = os.getenv(
+    "SOLUTION_MEMO_EMBEDDINGS", "inprocess" if os.getenv("AGENT_RETRIEVAL_MODE") == "inprocess" else "none"
+)
+
+# MinHash: NUM_PERM hash functions split into LSH bands of NUM_PERM / LSH_BANDS rows.
+# With 32 bands of 4 rows, pairs with Jaccard 0.8 share a bucket with probability > 0.99.
+NUM_PERM = 128
+LSH_BANDS = 32
+SHINGLE_SIZE = 3
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; the fixed seed keeps stored signatures valid
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20251211)
+_PERM_A = _rng.randint(1, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+def _shingles(text: str) -> set:
+    tokens = tokenize(text)
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature (NUM_PERM uint32 values) of the word 3-shingles of the text.
+    The fraction of equal positions between two signatures estimates their Jaccard similarity.
+    """
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+         for shingle in _shingles(text)),
+        dtype=np.uint64,
+    )
+    permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_buckets(signature: np.ndarray) -> List[int]:
+    rows = NUM_PERM // LSH_BANDS
+    return [
+        int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+                       "little", signed=True)
+        for band in range(LSH_BANDS)
+    ]
+
+
+def build_memo_embeddings(name: str = SOLUTION_MEMO_EMBEDDINGS) -> Optional[Any]:
+    """
+    LangChain embeddings client used for the memo, or None for MinHash-only lookups.
+    """
+    if name == "none":
+        return None
+    if name == "inprocess":
+        # Reuse the ticket API's (cached) embedding client
+        from inprocess_retrieval import get_retriever
+        return get_retriever().vector_store.embeddings
+    if ":" in name:
+        module_name, factory_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory_name)()
+    raise ValueError(f"Unknown memo embeddings: {name}. Options: none, inprocess or 'package.module:factory'")
+
+
+@dataclass
+class Fingerprint:
+    """MinHash signature and (optional) normalized embedding of a ticket description."""
+    signature: np.ndarray
+    embedding: Optional[np.ndarray] = None
+
+
+@dataclass
+class MemoMatch:
+    """A stored solution reused for a near-duplicate ticket."""
+    solution: str
+    ticket_id: Optional[str]
+    similarity: float
+    method: str
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+class SolutionMemo:
+    """
+    Persistent (SQLite) memo of final solutions, looked up by near-duplicate descriptions.
+    MinHash + LSH finds tickets that are near copies; when an embeddings client is configured,
+    cosine similarity of the descriptions also catches reworded duplicates.
+    """
+
+    def __init__(
+        self,
+        path: str = SOLUTION_MEMO_PATH,
+        embeddings: Any = SOLUTION_MEMO_EMBEDDINGS,
+        minhash_threshold: float = SOLUTION_MEMO_MINHASH_THRESHOLD,
+        embedding_threshold: float = SOLUTION_MEMO_EMBEDDING_THRESHOLD,
+        ttl_seconds: float = SOLUTION_MEMO_TTL_SECONDS,
+    ):
+        # An embeddings client, None, or a name for `build_memo_embeddings` resolved on first use
+        self._embeddings = embeddings
+        self.minhash_threshold = minhash_threshold
+        self.embedding_threshold = embedding_threshold
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions ("
+            "id INTEGER PRIMARY KEY, ticket_id TEXT, description TEXT NOT NULL, solution TEXT NOT NULL, "
+            "signature BLOB NOT NULL, embedding BLOB, created_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS lsh_buckets (band INTEGER NOT NULL, bucket INTEGER NOT NULL, solution_id INTEGER NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS lsh_buckets_lookup ON lsh_buckets(band, bucket)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS lsh_buckets_solution ON lsh_buckets(solution_id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS solutions_created_at ON solutions(created_at)")
+        self._connection.commit()
+        # Embedding matrix of the stored solutions, loaded on first use
+        self._embedding_ids: Optional[List[int]] = None
+        self._embedding_rows: List[np.ndarray] = []
+        self._embedding_matrix: Optional[np.ndarray] = None
+        self._last_purge = float("-inf")
+        self.purge_expired()
+
+    @property
+    def embeddings(self) -> Optional[Any]:
+        if isinstance(self._embeddings, str):
+            self._embeddings = build_memo_embeddings(self._embeddings)
+        return self._embeddings
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else float("-inf")
+
+    def fingerprint(self, description: str) -> Fingerprint:
+        embedding = _normalize(self.embeddings.embed_query(description)) if self.embeddings is not None else None
+        return Fingerprint(minhash_signature(description), embedding)
+
+    async def afingerprint(self, description: str) -> Fingerprint:
+        embedding = None
+        if self.embeddings is not None:
+            embedding = _normalize(await self.embeddings.aembed_query(description))
+        return Fingerprint(minhash_signature(description), embedding)
+
+    def _minhash_match(self, signature: np.ndarray) -> Optional[MemoMatch]:
+        buckets = _band_buckets(signature)
+        clauses = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        params = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+        candidate_ids = [
+            row[0] for row in self._connection.execute(
+                f"SELECT DISTINCT solution_id FROM lsh_buckets WHERE {clauses}", params
+            )
+        ]
+        if not candidate_ids:
+            return None
+        placeholders = ",".join("?" * len(candidate_ids))
+        rows = self._connection.execute(
+            f"SELECT ticket_id, solution, signature FROM solutions WHERE id IN ({placeholders}) AND created_at >= ?",
+            [*candidate_ids, self._min_created_at()],
+        ).fetchall()
+        best = None
+        for ticket_id, solution, stored in rows:
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint32) == signature))
+            if similarity >= self.minhash_threshold and (best is None or similarity > best.similarity):
+                best = MemoMatch(solution, ticket_id, similarity, "minhash")
+        return best
+
+    def _load_embeddings(self) -> None:
+        self._embedding_ids = []
+        self._embedding_rows = []
+        for solution_id, embedding in self._connection.execute(
+            "SELECT id, embedding FROM solutions WHERE embedding IS NOT NULL ORDER BY id"
+        ):
+            self._embedding_ids.append(solution_id)
+            self._embedding_rows.append(np.frombuffer(embedding, dtype=np.float32))
+        self._embedding_matrix = None
+
+    def _embedding_match(self, embedding: np.ndarray) -> Optional[MemoMatch]:
+        if self._embedding_ids is None:
+            self._load_embeddings()
+        if not self._embedding_ids:
+            return None
+        if self._embedding_matrix is None:
+            self._embedding_matrix = np.vstack(self._embedding_rows)
+        if self._embedding_matrix.shape[1] != embedding.shape[0]:
+            # Stored with a different embedding model: only MinHash applies
+            return None
+        scores = self._embedding_matrix @ embedding
+        for position in np.argsort(-scores):
+            if scores[position] < self.embedding_threshold:
+                break
+            row = self._connection.execute(
+                "SELECT ticket_id, solution FROM solutions WHERE id = ? AND created_at >= ?",
+                (self._embedding_ids[position], self._min_created_at()),
+            ).fetchone()
+            if row is not None:
+                return MemoMatch(row[1], row[0], float(scores[position]), "embedding")
+        return None
+
+    def lookup(self, fingerprint: Fingerprint) -> Optional[MemoMatch]:
+        """
+        Best stored solution whose description is a near-duplicate (MinHash first, then embeddings).
+        """
+        with self._lock:
+            match = self._minhash_match(fingerprint.signature)
+            if match is None and fingerprint.embedding is not None:
+                match = self._embedding_match(fingerprint.embedding)
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return match
+
+    def store(self, fingerprint: Fingerprint, description: str, solution: str, ticket_id: Optional[str] = None) -> None:
+        """
+        Store a final solution with the fingerprint of its ticket description.
+        """
+        embedding = fingerprint.embedding.astype(np.float32).tobytes() if fingerprint.embedding is not None else None
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO solutions (ticket_id, description, solution, signature, embedding, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (ticket_id, description, solution, fingerprint.signature.tobytes(), embedding, time.time()),
+            )
+            solution_id = cursor.lastrowid
+            self._connection.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, solution_id) VALUES (?, ?, ?)",
+                [(band, bucket, solution_id) for band, bucket in enumerate(_band_buckets(fingerprint.signature))],
+            )
+            self._connection.commit()
+            if fingerprint.embedding is not None and self._embedding_ids is not None:
+                self._embedding_ids.append(solution_id)
+                self._embedding_rows.append(fingerprint.embedding.astype(np.float32))
+                self._embedding_matrix = None
+        if time.monotonic() - self._last_purge >= SOLUTION_MEMO_PURGE_INTERVAL_SECONDS:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """
+        Delete the solutions past the TTL together with their LSH bucket rows. Returns how many were deleted.
+        """
+        self._last_purge = time.monotonic()
+        if self.ttl_seconds <= 0:
+            return 0
+        with self._lock:
+            min_created_at = self._min_created_at()
+            self._connection.execute(
+                "DELETE FROM lsh_buckets WHERE solution_id IN (SELECT id FROM solutions WHERE created_at < ?)",
+                (min_created_at,),
+            )
+            deleted = self._connection.execute("DELETE FROM solutions WHERE created_at < ?", (min_created_at,)).rowcount
+            self._connection.commit()
+            if deleted:
+                # Reload the embedding matrix without the deleted rows on next use
+                self._embedding_ids = None
+                self._embedding_matrix = None
+        return deleted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def build_solution_memo() -> Optional[SolutionMemo]:
+    if not SOLUTION_MEMO_ENABLED:
+        return None
+    return SolutionMemo()
@@ -0,0 +1,16 @@
+import re
+import unicodedata
+from typing import List
+
+# Alphanumeric tokens that may contain inner '.', '-' or '_' (e.g. "err-0x80", "srv01.corp"),
+# the same tokens the ticket API's BM25 index uses
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-_]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens of the text with accents removed, shared by the web search corpus ranking
+    and the solution memo shingles.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    return TOKEN_PATTERN.findall("".join(char for char in text if not unicodedata.combining(char)))
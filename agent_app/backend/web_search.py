@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import math
+import sqlite3
+import hashlib
+import asyncio
+import logging
+import importlib
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Optional
+from dotenv import load_dotenv
+from text_tokens import tokenize
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# --- Configuration ---
+# "tavily", "local" (offline corpus stand-in) or "package.module:factory"
+WEB_SEARCH_PROVIDER = os.getenv("WEB_SEARCH_PROVIDER", "tavily")
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "3"))
+# JSON array or JSONL file of {"url", "title", "content"} documents for the local provider
+WEB_SEARCH_CORPUS_PATH = os.getenv("WEB_SEARCH_CORPUS_PATH", "web_corpus.jsonl")
+WEB_SEARCH_CACHE_ENABLED = os.getenv("WEB_SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", ".web_search_cache.sqlite")
+WEB_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "86400"))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase, Unicode-normalize and collapse whitespace, so trivially different queries share a cache entry.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).lower().split())
+
+
+# --- Providers ---
+
+class WebSearchProvider(ABC):
+    """
+    Interface for web search backends. Results are dicts with at least "url" and "content".
+    Subclasses must implement `search`; `asearch` defaults to running it in a thread.
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    def search(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        """Up to `max_results` results for the query."""
+
+    async def asearch(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        return await asyncio.to_thread(self.search, query, max_results)
+
+
+class TavilyProvider(WebSearchProvider):
+    """
+    Live web search through Tavily.
+    """
+
+    name = "tavily"
+
+    def __init__(self, max_results: int = WEB_SEARCH_MAX_RESULTS):
+        # Imported here so the local provider works without the Tavily package or network access
+        from langchain_tavily import TavilySearch
+        self.max_results = max_results
+        self._client = TavilySearch(max_results=max_results)
+
+    @staticmethod
+    def _results(response) -> List[dict]:
+        # TavilySearch returns a dict with a "results" list
+        if isinstance(response, dict):
+            return response.get("results", [])
+        return list(response or [])
+
+    def search(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        return self._results(self._client.invoke({"query": query}))[:max_results]
+
+    async def asearch(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        return self._results(await self._client.ainvoke({"query": query}))[:max_results]
+
+
+class LocalCorpusProvider(WebSearchProvider):
+    """
+    Offline stand-in: ranks the documents of a local corpus file by BM25 over title and content.
+    Lets the agent run without network access and be load-tested without spending Tavily quota.
+    """
+
+    name = "local"
+
+    def __init__(self, corpus_path: str = WEB_SEARCH_CORPUS_PATH, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = self._load(corpus_path)
+        self._terms = [Counter(tokenize(f"{doc.get('title', '')} {doc.get('content', '')}")) for doc in self.documents]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        self._document_frequency = Counter(term for terms in self._terms for term in terms)
+
+    @staticmethod
+    def _load(corpus_path: str) -> List[dict]:
+        if not os.path.exists(corpus_path):
+            return []
+        with open(corpus_path, "r", encoding="utf-8") as file:
+            text = file.read().strip()
+        if not text:
+            return []
+        if text.startswith("["):
+            return json.loads(text)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def search(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        if not self.documents:
+            return []
+        count = len(self.documents)
+        scored = []
+        query_terms = set(tokenize(query))
+        for doc, terms, length in zip(self.documents, self._terms, self._lengths):
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term)
+                if not frequency:
+                    continue
+                df = self._document_frequency[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * length / (self._average_length or 1))
+                score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scored.append((score, doc))
+        scored.sort(key=lambda item: -item[0])
+        return [doc for _, doc in scored[:max_results]]
+
+    async def asearch(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        # In-memory ranking: no need for a thread
+        return self.search(query, max_results)
+
+
+WEB_SEARCH_PROVIDERS = {
+    "tavily": TavilyProvider,
+    "local": LocalCorpusProvider,
+}
+
+
+def build_web_search_provider(name: str = WEB_SEARCH_PROVIDER) -> WebSearchProvider:
+    """
+    Build the configured provider: a registered name or a "package.module:factory" path.
+    """
+    if name in WEB_SEARCH_PROVIDERS:
+        return WEB_SEARCH_PROVIDERS[name]()
+    if ":" in name:
+        module_name, factory_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory_name)()
+    raise ValueError(
+        f"Unknown web search provider: {name}. Options: {', '.join(WEB_SEARCH_PROVIDERS)} or 'package.module:factory'"
+    )
+
+
+# --- Cache ---
+
+class WebSearchCache:
+    """
+    Persistent (SQLite) cache of search results keyed by provider, normalized query and result count.
+    Entries expire after a TTL; above the maximum size the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = WEB_SEARCH_CACHE_PATH,
+        ttl_seconds: float = WEB_SEARCH_CACHE_TTL_SECONDS,
+        max_entries: int = WEB_SEARCH_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "key TEXT PRIMARY KEY, results TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS searches_last_access ON searches(last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(provider: str, query: str, max_results: int) -> str:
+        payload = f"{provider}\n{max_results}\n{normalize_query(query)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT results, expires_at FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            try:
+                self._connection.execute("UPDATE searches SET last_access = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+            except sqlite3.Error as e:
+                # Only the LRU order is lost: the hit is still served
+                self._connection.rollback()
+                logger.warning("Web search cache unavailable: %s", e)
+            return json.loads(row[0])
+
+    def put(self, key: str, results: List[dict]) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO searches (key, results, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(results, ensure_ascii=False), now + self.ttl_seconds, now),
+                )
+                # Eviction: expired entries first, then the least recently used above the maximum
+                self._connection.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+                self._connection.execute(
+                    "DELETE FROM searches WHERE key IN ("
+                    "SELECT key FROM searches ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self._connection.rollback()
+                logger.warning("Web search cache unavailable: %s", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class CachedWebSearch:
+    """
+    Provider wrapped with the persistent cache. Empty results are not cached, so a transient
+    provider problem is not remembered for the whole TTL. A cache error (e.g. a locked database)
+    counts as a miss: the search always falls through to the provider.
+    """
+
+    def __init__(self, provider: WebSearchProvider, cache: Optional[WebSearchCache]):
+        self.provider = provider
+        self.cache = cache
+
+    def _key(self, query: str, max_results: int) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return WebSearchCache.make_key(self.provider.name, query, max_results)
+
+    def _cache_get(self, key: Optional[str]) -> Optional[List[dict]]:
+        if key is None:
+            return None
+        try:
+            return self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning("Web search cache unavailable: %s", e)
+            return None
+
+    def search(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        key = self._key(query, max_results)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        results = self.provider.search(query, max_results)
+        if key and results:
+            self.cache.put(key, results)
+        return results
+
+    async def asearch(self, query: str, max_results: int = WEB_SEARCH_MAX_RESULTS) -> List[dict]:
+        key = self._key(query, max_results)
+        # The cache is SQLite: keep its queries off the event loop
+        cached = await asyncio.to_thread(self._cache_get, key) if key else None
+        if cached is not None:
+            return cached
+        results = await self.provider.asearch(query, max_results)
+        if key and results:
+            await asyncio.to_thread(self.cache.put, key, results)
+        return results
+
+
+def build_web_search() -> CachedWebSearch:
+    return CachedWebSearch(
+        build_web_search_provider(),
+        WebSearchCache() if WEB_SEARCH_CACHE_ENABLED else None,
+    )
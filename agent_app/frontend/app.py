@@ -1,6 +1,37 @@
 import streamlit as st
 import requests
 import json
+import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+AGENT_API_URL = os.getenv("AGENT_API_URL", "http://localhost:8001")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+# An agent run takes several seconds; the read timeout only guards against a hung backend
+AGENT_READ_TIMEOUT = float(os.getenv("AGENT_READ_TIMEOUT", "180"))
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    Pooled keep-alive session shared across Streamlit reruns.
+    Solving a ticket is expensive, so only connection errors and 502/503/504 are retried.
+    """
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=0,
+        backoff_factor=0.3,
+        backoff_jitter=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(max_retries=retry))
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    return session
+
 
 st.set_page_config(page_title="Agente de Resolución de Tickets", page_icon="🤖")
 
@@ -33,20 +64,29 @@ if st.button("Resolver Ticket"):
             
             with st.spinner("El agente está trabajando... esto puede tomar unos segundos..."):
                 # Call Agent Backend
-                response = requests.post(
-                    "http://localhost:8001/solve_ticket",
-                    json={"ticket": ticket_data}
+                response = get_http_session().post(
+                    f"{AGENT_API_URL}/solve_ticket",
+                    json={"ticket": ticket_data},
+                    timeout=(HTTP_CONNECT_TIMEOUT, AGENT_READ_TIMEOUT)
                 )
                 
                 if response.status_code == 200:
-                    solution = response.json().get("solution", "No solution returned.")
+                    result = response.json()
+                    solution = result.get("solution", "No solution returned.")
                     st.success("¡Análisis completado!")
                     st.markdown("### 💡 Solución Propuesta")
+                    if result.get("reused"):
+                        st.info(
+                            f"Solución reutilizada de un ticket casi idéntico ya resuelto "
+                            f"({result.get('reusedFrom') or 'sin ID'}, similitud {result.get('similarity')})."
+                        )
                     st.markdown(solution)
                 else:
                     st.error(f"Error del servidor: {response.text}")
                     
         except json.JSONDecodeError:
             st.error("El formato ingresado no es un JSON válido.")
+        except requests.Timeout:
+            st.error("El agente no respondió a tiempo. Intenta nuevamente.")
         except Exception as e:
             st.error(f"Ocurrió un error: {str(e)}")
@@ -1,15 +1,72 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from modules.news_summarizer import NewsInput, NewsSummary, summarize_news
-from modules.rag_tickets_ingestor import TicketModel, ingest_individual_ticket, run_ingestion_from
-from modules.rag_tickets_retriever import retrieve_relevant_tickets, augment_similar_tickets
-import sys
-import shutil
-import os
+from modules.news_summarizer import (
+    NewsInput,
+    NewsSummary,
+    NewsBatchItem,
+    NEWS_BATCH_MAX_ITEMS,
+    summarize_news_async,
+    summarize_news_batch_async,
+    stream_summarize_news,
+)
+from modules.rag_tickets_ingestor import (
+    TicketModel,
+    StreamIngestionResult,
+    ingest_individual_ticket_async,
+    ingest_ticket_stream,
+    ingest_ticket_stream_async,
+)
+from modules.rag_tickets_retriever import (
+    retrieve_relevant_tickets_async,
+    retrieve_relevant_tickets_batch,
+    augment_similar_tickets_async,
+    stream_augment_similar_tickets,
+    ScoredTicketModel,
+    TicketFilters,
+    TicketPriority,
+    RETRIEVAL_MODES,
+    RETRIEVAL_BATCH_MAX_TICKETS,
+)
+from modules.ticket_stream_parser import guess_format
+from modules.ingestion_jobs import IngestionJobStatus, ingestion_job_manager
+from modules.completion_cache import LLM_CACHE_BYPASS_VALUES
+from modules.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, registry as metrics_registry
+from modules.logging_config import configure_logging, shutdown_logging, get_logger, log_payload
+from modules.readiness import ReadinessReport, WARMUP_ON_STARTUP, warmup_manager
+from modules.third_party_clients import close_clients, open_vector_store
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from datetime import date
+import json
 
-app = FastAPI()
+configure_logging()
+logger = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reanudar los jobs de ingestión que quedaron sin terminar en una ejecución anterior
+    await run_in_threadpool(ingestion_job_manager.resume_pending)
+    # La sesión HTTP del vectorstore se abre una sola vez y la comparten todos los requests,
+    # con o sin warmup; si falla, se vuelve a intentar en la primera búsqueda
+    try:
+        await open_vector_store()
+    except Exception as e:
+        logger.warning("No se pudo abrir el vectorstore al arrancar: %s: %s", type(e).__name__, e)
+    # Los clientes se crean al primer uso; el warmup los crea y abre sus conexiones de antemano
+    if WARMUP_ON_STARTUP == "blocking":
+        await warmup_manager.warmup()
+    elif WARMUP_ON_STARTUP == "background":
+        warmup_manager.start()
+    yield
+    await warmup_manager.stop()
+    ingestion_job_manager.shutdown()
+    await close_clients()
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configurar CORS para permitir solicitudes desde el frontend
 app.add_middleware(
@@ -20,17 +77,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta y header Server-Timing con las etapas de cada request
+app.add_middleware(MetricsMiddleware)
+
 # Montar archivos estáticos (CSS, JS, imágenes, etc.)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+def _sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Convierte un generador de eventos `(nombre, datos)` en una respuesta Server-Sent Events."""
+    async def event_stream():
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.exception("Error durante el streaming")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Evita que proxies intermedios acumulen el stream antes de reenviarlo
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Endpoint que devuelve la página de bienvenida en HTML
 @app.get("/")
 async def get_welcome():
     """Devuelve la página de bienvenida."""
     return FileResponse("templates/index.html")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Métricas en formato Prometheus: latencia por etapa y por ruta, tokens del LLM,
+    aciertos de las cachés y tickets ingestados.
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/health/live")
+async def liveness_endpoint():
+    """Liveness: responde mientras el proceso esté en pie, sin verificar las dependencias."""
+    return {"status": "ok"}
+
+@app.get("/health/ready", response_model=ReadinessReport, responses={503: {"model": ReadinessReport}})
+async def readiness_endpoint():
+    """
+    Readiness: estado de cada dependencia (Groq, modelo de embeddings, vectorstore, store de
+    tickets e índice léxico) según el warmup. Devuelve 503 hasta que todas estén disponibles;
+    las que fallaron se vuelven a verificar en segundo plano.
+    """
+    report = warmup_manager.report()
+    return JSONResponse(report.model_dump(mode="json"), status_code=200 if report.ready else 503)
+
 @app.post("/api/summarize_news", response_model=NewsSummary)
-async def summarize_news_endpoint(news: NewsInput):
+async def summarize_news_endpoint(news: NewsInput, x_llm_cache: Optional[str] = Header(None)):
     """
     Endpoint POST que devuelve el resumen de una noticia determinada.
     
@@ -38,6 +138,9 @@ async def summarize_news_endpoint(news: NewsInput):
     - `title` (string): Título de la noticia
     - `content` (string): Contenido completo de la noticia
     
+    **Headers opcionales:**
+    - `X-LLM-Cache: bypass`: ignora la caché de completions para este request
+    
     **Ejemplo de body JSON:**
     ```json
     {
@@ -46,43 +149,60 @@ async def summarize_news_endpoint(news: NewsInput):
     }
     ```
     """
-    sys.stderr.write("\n========== DEBUG: Llamada a /api/summarize_news ==========\n")
-    sys.stderr.write(f"DEBUG: Datos recibidos: {news}\n")
-    sys.stderr.flush()
+    logger.debug("Llamada a /api/summarize_news")
+    log_payload(logger, "Datos recibidos: %s", news)
     
     try:
         # Llamar a la función del módulo para resumir la noticia
-        result = summarize_news(news)
-        
-        sys.stderr.write(f"DEBUG: Resultado de summarize_news: {result}\n")
-        sys.stderr.write(f"DEBUG: Validando respuesta para response_model...\n")
-        sys.stderr.flush()
+        result = await summarize_news_async(news, use_cache=x_llm_cache not in LLM_CACHE_BYPASS_VALUES)
+        log_payload(logger, "Resultado de summarize_news: %s", result)
         
         # Validar que el resultado cumple con NewsSummary
         if not isinstance(result, NewsSummary):
-            sys.stderr.write(f"DEBUG: ERROR - El resultado no es NewsSummary, es {type(result)}\n")
-            sys.stderr.flush()
-        else:
-            sys.stderr.write("DEBUG: OK - El resultado es NewsSummary\n")
-            sys.stderr.flush()
-            
-        sys.stderr.write("========== DEBUG: Endpoint finalizado exitosamente ==========\n")
-        sys.stderr.flush()
+            logger.warning("El resultado de summarize_news no es NewsSummary, es %s", type(result))
         return result
         
     except Exception as e:
-        sys.stderr.write(f"\nDEBUG: ERROR en endpoint: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR en endpoint ==========\n")
-        sys.stderr.flush()
+        logger.exception("Error en /api/summarize_news")
         raise HTTPException(
             status_code=500,
             detail=f"Error al generar el resumen: {str(e)}"
         )
 
+@app.post("/api/summarize_news/batch", response_model=list[NewsBatchItem])
+async def summarize_news_batch_endpoint(items: List[dict[str, Any]], x_llm_cache: Optional[str] = Header(None)):
+    """
+    Endpoint POST que resume muchas noticias en un solo request.
+    Las llamadas a Groq se reparten en paralelo respetando la cuota configurada (requests y tokens
+    por minuto), con concurrencia adaptativa y reintentos ante 429.
+    
+    **Parámetros requeridos:**
+    - Lista de noticias con `title` y `content` (máximo NEWS_BATCH_MAX_ITEMS).
+    
+    **Respuesta:** un elemento por noticia, en el mismo orden, con `summary` o `error`.
+    Una noticia inválida o que falla no interrumpe al resto del lote.
+    """
+    logger.debug("Llamada a /api/summarize_news/batch con %d noticias", len(items))
+    if len(items) > NEWS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Se recibieron {len(items)} noticias; el máximo por request es {NEWS_BATCH_MAX_ITEMS}"
+        )
+    return await summarize_news_batch_async(items, use_cache=x_llm_cache not in LLM_CACHE_BYPASS_VALUES)
+
+@app.post("/api/summarize_news/stream")
+async def summarize_news_stream_endpoint(news: NewsInput, x_llm_cache: Optional[str] = Header(None)):
+    """
+    Endpoint POST que devuelve el resumen de una noticia como Server-Sent Events.
+    
+    **Eventos:**
+    - `token`: fragmento del texto generado por el LLM, a medida que llega.
+    - `result`: el NewsSummary final (`resumen`/`puntos_clave` ya parseados).
+    - `error`: detalle del error si la generación falla.
+    """
+    logger.debug("Llamada a /api/summarize_news/stream")
+    return _sse_response(stream_summarize_news(news, use_cache=x_llm_cache not in LLM_CACHE_BYPASS_VALUES))
+
 @app.post("/api/ingest_json_ticket", response_model=str)
 async def ingest_json_ticket_endpoint(ticket: TicketModel):
     """
@@ -104,23 +224,16 @@ async def ingest_json_ticket_endpoint(ticket: TicketModel):
     }
     ```
     """
-    sys.stderr.write("\n========== DEBUG: Llamada a /api/ingest_json_ticket ==========\n")
-    sys.stderr.write(f"DEBUG: Datos recibidos: {ticket}\n")
-    sys.stderr.flush()
+    logger.debug("Llamada a /api/ingest_json_ticket")
+    log_payload(logger, "Datos recibidos: %s", ticket)
     
     try:
         # Llamar a la función para realizar la ingestión de tickets
-        result = ingest_individual_ticket(ticket)
+        result = await ingest_individual_ticket_async(ticket)
         return result
         
     except Exception as e:
-        sys.stderr.write(f"\nDEBUG: ERROR en endpoint: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR en ingest_json_ticket ==========\n")
-        sys.stderr.flush()
+        logger.exception("Error en /api/ingest_json_ticket")
         raise HTTPException(
             status_code=500,
             detail=f"Error al generar el resumen: {str(e)}"
@@ -129,51 +242,129 @@ async def ingest_json_ticket_endpoint(ticket: TicketModel):
 @app.post("/api/ingest_json_file")
 async def ingest_json_file_endpoint(file: UploadFile = File(...)):
     """
-    Endpoint POST para la ingestión masiva de tickets desde un archivo JSON.
+    Endpoint POST para la ingestión masiva de tickets desde un archivo JSON (array) o NDJSON.
+    
+    El archivo se parsea en streaming y se ingesta por ventanas de tamaño fijo. Los registros
+    inválidos se reportan en `errors` sin abortar el resto del archivo.
     """
-    sys.stderr.write(f"\n========== DEBUG: Llamada a /api/ingest_json_file ==========\n")
-    sys.stderr.write(f"DEBUG: Archivo recibido: {file.filename}\n")
-    sys.stderr.flush()
+    logger.debug("Llamada a /api/ingest_json_file con el archivo %s", file.filename)
 
-    temp_file_path = f"temp_{file.filename}"
-    
     try:
-        # Guardar el archivo temporalmente
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Ejecutar la ingestión
-        run_ingestion_from(temp_file_path)
-        
-        # Eliminar el archivo temporal
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            
-        sys.stderr.write("DEBUG: Ingestión masiva completada exitosamente.\n")
-        sys.stderr.flush()
+        # Se lee directamente del upload, sin copiarlo a un archivo temporal propio
+        result = await run_in_threadpool(
+            ingest_ticket_stream,
+            file.file,
+            guess_format(file.filename, file.content_type)
+        )
+        logger.info("Ingestión masiva de %s completada: %d ingestados, %d con errores", file.filename, result.ingested, result.failed)
         
-        return {"message": f"Archivo {file.filename} procesado e ingestado exitosamente."}
+        return {
+            "message": f"Archivo {file.filename} procesado: {result.ingested} tickets ingestados, {result.failed} con errores.",
+            **result.model_dump()
+        }
         
     except Exception as e:
-        sys.stderr.write(f"\nDEBUG: ERROR en endpoint de carga masiva: {str(e)}\n")
-        sys.stderr.flush()
-        # Intentar limpiar archivo en caso de error
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            
+        logger.exception("Error en la carga masiva de %s", file.filename)
         raise HTTPException(
             status_code=500,
             detail=f"Error al procesar el archivo: {str(e)}"
         )
 
-@app.post("/api/get_similar_tickets", response_model=list[TicketModel])
-async def get_similar_tickets_endpoint(ticket: TicketModel):
+@app.post("/api/ingest_ticket_stream", response_model=StreamIngestionResult)
+async def ingest_ticket_stream_endpoint(request: Request):
+    """
+    Endpoint POST para la ingestión en streaming desde el body del request.
+    
+    El body es un array JSON de tickets (`Content-Type: application/json`) o un ticket por
+    línea (`Content-Type: application/x-ndjson`). Se parsea a medida que llega, por lo que
+    la memoria se mantiene constante sin importar el tamaño del archivo.
+    """
+    logger.debug("Llamada a /api/ingest_ticket_stream")
+
+    try:
+        return await ingest_ticket_stream_async(
+            request.stream(),
+            guess_format(content_type=request.headers.get("content-type"))
+        )
+    except Exception as e:
+        logger.exception("Error en la ingestión en streaming")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al procesar el stream: {str(e)}"
+        )
+
+@app.post("/api/ingestion_jobs", response_model=IngestionJobStatus, status_code=202)
+async def submit_ingestion_job_endpoint(file: UploadFile = File(...)):
+    """
+    Endpoint POST que encola la ingestión masiva de un archivo JSON/NDJSON como job en segundo plano.
+    Devuelve el id del job inmediatamente; el progreso se consulta en `GET /api/ingestion_jobs/{job_id}`.
+    """
+    logger.debug("Llamada a /api/ingestion_jobs con el archivo %s", file.filename)
+
+    try:
+        job = await run_in_threadpool(
+            ingestion_job_manager.submit,
+            file.file,
+            file.filename,
+            guess_format(file.filename, file.content_type)
+        )
+        return ingestion_job_manager.status(job)
+    except Exception as e:
+        logger.exception("Error al encolar el job de ingestión de %s", file.filename)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al encolar el archivo: {str(e)}"
+        )
+
+@app.get("/api/ingestion_jobs", response_model=list[IngestionJobStatus])
+async def list_ingestion_jobs_endpoint():
+    """Endpoint GET que lista los jobs de ingestión y su estado."""
+    jobs = await run_in_threadpool(ingestion_job_manager.list_jobs)
+    return [ingestion_job_manager.status(job) for job in jobs]
+
+@app.get("/api/ingestion_jobs/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job_endpoint(job_id: str):
+    """
+    Endpoint GET que devuelve el estado de un job de ingestión: tickets procesados y fallidos,
+    total (al terminar), progreso, velocidad y tiempo restante estimado.
+    """
+    job = ingestion_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return ingestion_job_manager.status(job)
+
+@app.post("/api/ingestion_jobs/{job_id}/cancel", response_model=IngestionJobStatus)
+async def cancel_ingestion_job_endpoint(job_id: str):
+    """Endpoint POST que cancela un job de ingestión. Las ventanas ya confirmadas quedan ingestadas."""
+    job = ingestion_job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return ingestion_job_manager.status(job)
+
+@app.post("/api/get_similar_tickets", response_model=list[ScoredTicketModel])
+async def get_similar_tickets_endpoint(
+    ticket: TicketModel,
+    mode: Optional[str] = None,
+    priority: Optional[List[TicketPriority]] = Query(None),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    department: Optional[str] = None,
+):
     """
     Endpoint POST que devuelve los tickets similares a un ticket determinado que se recibe como parámetro.
+    Devuelve k tickets distintos (los fragmentos de un mismo ticket se agrupan), cada uno con su `score`.
     
     **Parámetros requeridos:**
     - `ticket` (TicketModel): Objeto TicketModel a ingresar.
     
+    **Parámetros opcionales (query):**
+    - `mode`: "hybrid" (vectorial + BM25), "vector" o "lexical" (sólo BM25, sin llamar al servicio de embeddings).
+    - `priority`: Prioridad aceptada; puede repetirse (`?priority=High&priority=Urgent`).
+    - `date_from` / `date_to`: Rango de `creationDate` (YYYY-MM-DD, inclusive).
+    - `department`: Departamento del owner (la parte después de " - ", sin distinguir mayúsculas).
+    
+    Los filtros se aplican antes de la búsqueda: sólo se comparan los tickets que los cumplen.
+    
     **Ejemplo de body JSON:**
     ```json
     {
@@ -187,51 +378,81 @@ async def get_similar_tickets_endpoint(ticket: TicketModel):
     }
     ```
     """
-    sys.stderr.write(f"\n========== DEBUG: Llamada a /api/get_similar_tickets ==========\n")
-    sys.stderr.write(f"DEBUG: Datos recibidos: {ticket}\n")
-    sys.stderr.flush()
+    logger.debug("Llamada a /api/get_similar_tickets")
+    log_payload(logger, "Datos recibidos: %s", ticket)
+    if mode is not None and mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}. Opciones: {', '.join(RETRIEVAL_MODES)}")
     
     try:
         # Llamar a la función del módulo para obtener los tickets similares
-        result = retrieve_relevant_tickets(ticket)
-        
-        sys.stderr.write(f"DEBUG: Resultado de retrieve_relevant_tickets: {result}\n")
-        sys.stderr.write(f"DEBUG: Validando respuesta para response_model...\n")
-        sys.stderr.flush()
+        filters = TicketFilters(priority=priority, date_from=date_from, date_to=date_to, department=department)
+        result = await retrieve_relevant_tickets_async(ticket, mode=mode, filters=filters)
+        log_payload(logger, "Resultado de retrieve_relevant_tickets: %s", result)
         
         # Validar que el resultado cumple con list
         if not isinstance(result, list):
-            sys.stderr.write(f"DEBUG: ERROR - El resultado no es list, es {type(result)}\n")
-            sys.stderr.flush()
-        else:
-            sys.stderr.write("DEBUG: OK - El resultado es list\n")
-            sys.stderr.flush()
-            
-        sys.stderr.write("========== DEBUG: Endpoint finalizado exitosamente ==========\n")
-        sys.stderr.flush()
+            logger.warning("El resultado de retrieve_relevant_tickets no es list, es %s", type(result))
         return result
         
     except Exception as e:
-        sys.stderr.write(f"\nDEBUG: ERROR en endpoint: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR en endpoint ==========\n")
-        sys.stderr.flush()
+        logger.exception("Error en /api/get_similar_tickets")
         raise HTTPException(
             status_code=500,
             detail=f"Error al generar el resumen: {str(e)}"
         )
 
+@app.post("/api/get_similar_tickets/batch", response_model=list[list[ScoredTicketModel]])
+async def get_similar_tickets_batch_endpoint(
+    tickets: List[TicketModel],
+    mode: Optional[str] = None,
+    priority: Optional[List[TicketPriority]] = Query(None),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    department: Optional[str] = None,
+):
+    """
+    Endpoint POST que devuelve los tickets similares de varios tickets en un solo request.
+    Todas las descripciones se embeben en una sola llamada y las búsquedas se resuelven juntas.
+    La respuesta es una lista de resultados alineada con los tickets recibidos.
+    
+    **Parámetros requeridos:**
+    - `tickets` (List[TicketModel]): Lista de tickets (máximo RETRIEVAL_BATCH_MAX_TICKETS).
+    
+    **Parámetros opcionales (query):** los mismos que `/api/get_similar_tickets` (`mode`, `priority`,
+    `date_from`, `date_to`, `department`), aplicados a todo el lote.
+    """
+    logger.debug("Llamada a /api/get_similar_tickets/batch con %d tickets", len(tickets))
+    if mode is not None and mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}. Opciones: {', '.join(RETRIEVAL_MODES)}")
+    if len(tickets) > RETRIEVAL_BATCH_MAX_TICKETS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Se recibieron {len(tickets)} tickets; el máximo por request es {RETRIEVAL_BATCH_MAX_TICKETS}"
+        )
+    
+    try:
+        filters = TicketFilters(priority=priority, date_from=date_from, date_to=date_to, department=department)
+        # El embedding del lote y el producto matricial son bloqueantes: se corren en un hilo
+        return await run_in_threadpool(retrieve_relevant_tickets_batch, tickets, mode=mode, filters=filters)
+        
+    except Exception as e:
+        logger.exception("Error en /api/get_similar_tickets/batch")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al buscar tickets similares: {str(e)}"
+        )
+
 @app.post("/api/augment_ticket_information", response_model=dict)
-async def augment_ticket_information_endpoint(ticket: TicketModel):
+async def augment_ticket_information_endpoint(ticket: TicketModel, x_llm_cache: Optional[str] = Header(None)):
     """
     Endpoint POST que aumenta la información de un ticket determinado que se recibe como parámetro.
     
     **Parámetros requeridos:**
     - `ticket` (TicketModel): Objeto TicketModel a ingresar.
     
+    **Headers opcionales:**
+    - `X-LLM-Cache: bypass`: ignora la caché de completions para este request
+    
     **Ejemplo de body JSON:**
     ```json
     {
@@ -245,39 +466,36 @@ async def augment_ticket_information_endpoint(ticket: TicketModel):
     }
     ```
     """
-    sys.stderr.write(f"\n========== DEBUG: Llamada a /api/augment_ticket_information ==========\n")
-    sys.stderr.write(f"DEBUG: Datos recibidos: {ticket}\n")
-    sys.stderr.flush()
+    logger.debug("Llamada a /api/augment_ticket_information")
+    log_payload(logger, "Datos recibidos: %s", ticket)
     
     try:
         # Llamar a la función del módulo para obtener los tickets similares
-        result = augment_similar_tickets(ticket)
-        
-        sys.stderr.write(f"DEBUG: Resultado de augment_similar_tickets: {result}\n")
-        sys.stderr.write(f"DEBUG: Validando respuesta para response_model...\n")
-        sys.stderr.flush()
+        result = await augment_similar_tickets_async(ticket, use_cache=x_llm_cache not in LLM_CACHE_BYPASS_VALUES)
+        log_payload(logger, "Resultado de augment_similar_tickets: %s", result)
         
         # Validar que el resultado cumple con dict
         if not isinstance(result, dict):
-            sys.stderr.write(f"DEBUG: ERROR - El resultado no es dict, es {type(result)}\n")
-            sys.stderr.flush()
-        else:
-            sys.stderr.write("DEBUG: OK - El resultado es dict\n")
-            sys.stderr.flush()
-            
-        sys.stderr.write("========== DEBUG: Endpoint finalizado exitosamente ==========\n")
-        sys.stderr.flush()
+            logger.warning("El resultado de augment_similar_tickets no es dict, es %s", type(result))
         return result
         
     except Exception as e:
-        sys.stderr.write(f"\nDEBUG: ERROR en endpoint: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR en endpoint ==========\n")
-        sys.stderr.flush()
+        logger.exception("Error en /api/augment_ticket_information")
         raise HTTPException(
             status_code=500,
             detail=f"Error al generar el resumen: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@app.post("/api/augment_ticket_information/stream")
+async def augment_ticket_information_stream_endpoint(ticket: TicketModel, x_llm_cache: Optional[str] = Header(None)):
+    """
+    Endpoint POST que aumenta la información de un ticket como Server-Sent Events.
+    
+    **Eventos:**
+    - `tickets`: los tickets similares, apenas termina el retrieval.
+    - `token`: fragmento del resumen generado por el LLM, a medida que llega.
+    - `result`: la respuesta final (`resumen`/`contactos`).
+    - `error`: detalle del error si la generación falla.
+    """
+    logger.debug("Llamada a /api/augment_ticket_information/stream")
+    return _sse_response(stream_augment_similar_tickets(ticket, use_cache=x_llm_cache not in LLM_CACHE_BYPASS_VALUES))
@@ -2,12 +2,20 @@
 Punto de entrada para ejecutar la aplicación FastAPI con uvicorn.
 Este archivo sirve como script ejecutable para iniciar el servidor.
 Para debugging, importa directamente desde app.py
+Con API_WORKERS > 1 se levantan varios procesos que comparten los stores y cachés en disco.
 """
 
-from app import app
 from dotenv import load_dotenv
 import uvicorn
+import os
 
 if __name__ == "__main__":
     load_dotenv()
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = max(1, int(os.getenv("API_WORKERS", "1")))
+    if workers > 1:
+        # Cada worker importa la app por su cuenta (no se comparten clientes ni conexiones SQLite)
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        from app import app
+
+        uvicorn.run(app, host="0.0.0.0", port=8000)
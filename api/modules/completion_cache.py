@@ -0,0 +1,244 @@
+"""
+Módulo con la caché opcional de completions del LLM.
+Evita volver a enviar a Groq prompts idénticos (misma noticia, mismo ticket),
+persistiendo las respuestas en SQLite con desalojo por cantidad de entradas.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, List, Optional
+from .embedding_cache import content_hash
+from .metrics import stage, observe_stage, record_cache, record_llm_usage
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+# En modo determinístico las llamadas cacheables se hacen con temperature=0,
+# de modo que la respuesta cacheada es la misma que daría el modelo
+LLM_CACHE_DETERMINISTIC = os.getenv("LLM_CACHE_DETERMINISTIC", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Valores del header X-LLM-Cache que saltean la caché para un request
+LLM_CACHE_BYPASS_VALUES = ("bypass", "no-cache", "off")
+
+
+class CompletionCache:
+    """
+    Caché persistente de completions. La clave es un hash del modelo, los mensajes
+    (system y user) y los parámetros de muestreo.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS completions_last_access ON completions(last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[dict], params: dict) -> str:
+        payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+        return content_hash(payload.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                record_cache("llm", False)
+                return None
+            self.hits += 1
+            record_cache("llm", True)
+            self._connection.execute("UPDATE completions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return row[0]
+
+    def put(self, key: str, model: Optional[str], content: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, last_access) VALUES (?, ?, ?, ?)",
+                (key, model or "", content, time.time()),
+            )
+            # Desalojo de las entradas menos usadas por encima del máximo
+            self._connection.execute(
+                "DELETE FROM completions WHERE key IN ("
+                "SELECT key FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+completion_cache = CompletionCache() if LLM_CACHE_ENABLED else None
+
+
+def prepare_cached_call(params: dict, use_cache: bool) -> bool:
+    """
+    Ajusta los parámetros de muestreo para el modo determinístico y decide si la llamada es cacheable.
+
+    Args:
+        params (dict): Parámetros de muestreo (se modifican en el lugar).
+        use_cache (bool): False si el request pidió saltear la caché.
+
+    Returns:
+        bool: True si la respuesta puede leerse/guardarse en caché.
+    """
+    if completion_cache is None or not use_cache:
+        return False
+    if LLM_CACHE_DETERMINISTIC:
+        params["temperature"] = 0
+    # Sólo una completion determinística es reutilizable
+    return params.get("temperature") == 0
+
+
+def _cache_lookup(key: Optional[str]) -> Optional[str]:
+    if key is None:
+        return None
+    try:
+        cached = completion_cache.get(key)
+    except sqlite3.Error as e:
+        # Un problema con la caché nunca debe impedir la llamada al LLM
+        logger.warning("Error al leer la caché del LLM: %s", e)
+        return None
+    if cached is not None:
+        logger.debug("Completion obtenida de la caché del LLM")
+    return cached
+
+
+def _cache_store(key: Optional[str], model: Optional[str], content: Optional[str]) -> None:
+    if key is None or not content:
+        return
+    try:
+        completion_cache.put(key, model, content)
+    except sqlite3.Error as e:
+        logger.warning("Error al guardar en la caché del LLM: %s", e)
+
+
+async def _acache_lookup(key: Optional[str]) -> Optional[str]:
+    # SQLite bloquea: desde el event loop la caché se consulta en el threadpool
+    if key is None:
+        return None
+    return await asyncio.to_thread(_cache_lookup, key)
+
+
+async def _acache_store(key: Optional[str], model: Optional[str], content: Optional[str]) -> None:
+    if key is None or not content:
+        return
+    await asyncio.to_thread(_cache_store, key, model, content)
+
+
+def _stream_usage(chunk: Any) -> Any:
+    # Groq informa el uso de tokens en el último fragmento, dentro de `x_groq`
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+    return usage
+
+
+def cached_chat_completion(client: Any, model: Optional[str], messages: List[dict], use_cache: bool = True, **params: Any) -> str:
+    """
+    Ejecuta una completion de chat pasando por la caché cuando está habilitada.
+
+    Args:
+        client (Any): Cliente Groq.
+        model (str): Nombre del modelo.
+        messages (List[dict]): Mensajes system/user.
+        use_cache (bool): False para saltear la caché en este request.
+        **params: Parámetros de muestreo (temperature, max_tokens, ...).
+
+    Returns:
+        str: Contenido de la respuesta del modelo.
+    """
+    key = CompletionCache.make_key(model, messages, params) if prepare_cached_call(params, use_cache) else None
+    cached = _cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    with stage("llm"):
+        message = client.chat.completions.create(model=model, messages=messages, **params)
+    record_llm_usage(model, getattr(message, "usage", None))
+    content = message.choices[0].message.content
+    _cache_store(key, model, content)
+    return content
+
+
+async def acached_chat_completion(client: Any, model: Optional[str], messages: List[dict], use_cache: bool = True, **params: Any) -> str:
+    """
+    Versión asíncrona de `cached_chat_completion` para el cliente AsyncGroq.
+
+    Args:
+        client (Any): Cliente AsyncGroq.
+        model (str): Nombre del modelo.
+        messages (List[dict]): Mensajes system/user.
+        use_cache (bool): False para saltear la caché en este request.
+        **params: Parámetros de muestreo (temperature, max_tokens, ...).
+
+    Returns:
+        str: Contenido de la respuesta del modelo.
+    """
+    key = CompletionCache.make_key(model, messages, params) if prepare_cached_call(params, use_cache) else None
+    cached = await _acache_lookup(key)
+    if cached is not None:
+        return cached
+
+    with stage("llm"):
+        message = await client.chat.completions.create(model=model, messages=messages, **params)
+    record_llm_usage(model, getattr(message, "usage", None))
+    content = message.choices[0].message.content
+    await _acache_store(key, model, content)
+    return content
+
+
+async def astream_chat_completion(client: Any, model: Optional[str], messages: List[dict], use_cache: bool = True, **params: Any) -> AsyncIterator[str]:
+    """
+    Completion de chat en streaming: devuelve los fragmentos de texto a medida que llegan.
+    Si la respuesta está en caché se devuelve completa como un único fragmento, y al
+    terminar el stream la respuesta completa se guarda en caché.
+
+    Args:
+        client (Any): Cliente AsyncGroq.
+        model (str): Nombre del modelo.
+        messages (List[dict]): Mensajes system/user.
+        use_cache (bool): False para saltear la caché en este request.
+        **params: Parámetros de muestreo (temperature, max_tokens, ...).
+
+    Yields:
+        str: Fragmentos del contenido de la respuesta.
+    """
+    key = CompletionCache.make_key(model, messages, params) if prepare_cached_call(params, use_cache) else None
+    cached = await _acache_lookup(key)
+    if cached is not None:
+        yield cached
+        return
+
+    start = time.perf_counter()
+    parts = []
+    with stage("llm"):
+        stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **params)
+        async for chunk in stream:
+            record_llm_usage(model, _stream_usage(chunk))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    observe_stage("llm_first_token", time.perf_counter() - start)
+                parts.append(delta)
+                yield delta
+    await _acache_store(key, model, "".join(parts))
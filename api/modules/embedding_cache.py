@@ -0,0 +1,246 @@
+"""
+Módulo con una caché de embeddings direccionada por contenido.
+Evita recalcular embeddings de textos ya vistos (consultas repetidas, re-ingestas),
+con un nivel LRU en memoria sobre un nivel persistente en disco (SQLite).
+"""
+
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+from .metrics import stage, record_cache
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import xxhash
+
+    def content_hash(data: bytes) -> str:
+        return xxhash.xxh3_128_hexdigest(data)
+except ImportError:  # pragma: no cover - xxhash es una dependencia transitiva
+    import hashlib
+
+    def content_hash(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite")
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Bytes de la base que SQLite lee mapeados en memoria: las páginas quedan en el page cache del
+# sistema, compartidas entre workers, en lugar de copiarse a la caché de páginas de cada proceso
+EMBEDDING_CACHE_MMAP_BYTES = int(os.getenv("EMBEDDING_CACHE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza un texto para usarlo como clave (Unicode NFC y espacios colapsados)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_cache_key(model_name: str, text: str) -> str:
+    """Clave de caché: hash rápido del nombre del modelo más el texto normalizado."""
+    return content_hash(f"{model_name}\x00{normalize_text(text)}".encode("utf-8"))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envoltorio de un modelo de embeddings con caché de dos niveles.
+
+    - Memoria: LRU acotado a `memory_entries` vectores, guardados como float32 compactos.
+    - Disco: tabla SQLite acotada a `max_disk_bytes`; al superarse se desalojan
+      los vectores accedidos hace más tiempo. La comparten todos los workers.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        path: str = EMBEDDING_CACHE_PATH,
+        memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+        max_disk_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA mmap_size={EMBEDDING_CACHE_MMAP_BYTES}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+        self._connection.commit()
+        self._disk_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    # --- Niveles de caché ---
+
+    def _memory_put(self, key: str, vector: array) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Busca claves en memoria y luego, en una sola consulta, en disco."""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector.tolist()
+                    self.hits_memory += 1
+
+            pending = [key for key in dict.fromkeys(keys) if key not in found]
+            if not pending:
+                return found
+            try:
+                rows = []
+                # Consultas por bloques para no superar el límite de parámetros de SQLite
+                for start in range(0, len(pending), 500):
+                    block = pending[start:start + 500]
+                    placeholders = ",".join("?" * len(block))
+                    rows.extend(self._connection.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", block
+                    ).fetchall())
+                if rows:
+                    for key, blob in rows:
+                        vector = array("f", blob)
+                        found[key] = vector.tolist()
+                        self._memory_put(key, vector)
+                        self.hits_disk += 1
+                    self._connection.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows],
+                    )
+                    self._connection.commit()
+            except sqlite3.Error as e:
+                # La caché nunca hace fallar un embedding (ej. base bloqueada por otro worker): lo que falte se calcula
+                self._connection.rollback()
+                logger.warning("Error al leer la caché de embeddings: %s", e)
+        return found
+
+    def _store(self, entries: Dict[str, List[float]]) -> None:
+        now = time.time()
+        vectors = {key: array("f", vector) for key, vector in entries.items()}
+        rows = []
+        for key, vector in vectors.items():
+            blob = vector.tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            for key, vector in vectors.items():
+                self._memory_put(key, vector)
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                self._disk_bytes += sum(row[2] for row in rows)
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self._connection.rollback()
+                logger.warning("Error al guardar en la caché de embeddings: %s", e)
+
+    def _evict(self) -> None:
+        """Desaloja los vectores menos usados hasta bajar al 90% del tamaño máximo."""
+        target = int(self.max_disk_bytes * 0.9)
+        # El contador incremental puede sobreestimar (reemplazos); se recalcula antes de desalojar
+        self._disk_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        while self._disk_bytes > target:
+            rows = self._connection.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append((key,))
+                self._disk_bytes -= size
+                if self._disk_bytes <= target:
+                    break
+            self._connection.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    # --- Interfaz Embeddings ---
+
+    def _split(self, texts: List[str]):
+        keys = [embedding_cache_key(self.model_name, text) for text in texts]
+        found = self._lookup(keys)
+        # Se calculan una sola vez los textos que faltan (deduplicados por clave)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        record_cache("embedding", True, sum(key in found for key in keys))
+        record_cache("embedding", False, len(missing))
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split(texts)
+        if missing:
+            with stage("embedding_model"):
+                vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._split([text])
+        if missing:
+            with stage("embedding_model"):
+                vector = self.underlying.embed_query(text)
+            self._store({keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    # Desde el event loop, la consulta y la escritura en SQLite se hacen en el threadpool
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._split, texts)
+        if missing:
+            with stage("embedding_model"):
+                vectors = await self.underlying.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await asyncio.to_thread(self._split, [text])
+        if missing:
+            with stage("embedding_model"):
+                vector = await self.underlying.aembed_query(text)
+            await asyncio.to_thread(self._store, {keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos de la caché."""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
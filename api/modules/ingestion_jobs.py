@@ -0,0 +1,412 @@
+"""
+Módulo para la ingestión masiva de tickets en segundo plano.
+Cada archivo subido se convierte en un job que se ejecuta en un pool de workers,
+se puede consultar y cancelar, y se reanuda desde la última ventana confirmada
+si el proceso se reinicia. Con varios procesos de la API, un lock de archivo por job
+garantiza que lo ejecute uno solo, y cualquiera puede consultarlo o cancelarlo.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import threading
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional
+from pydantic import BaseModel, Field
+from .rag_tickets_ingestor import StreamIngestionResult, TicketStreamIngestor, INGEST_WINDOW_SIZE
+from .ticket_stream_parser import StreamParseError, iter_records
+from .shared_state import file_lock
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+INGESTION_JOBS_DIR = os.getenv("INGESTION_JOBS_DIR", ".ingestion_jobs")
+INGESTION_JOB_WORKERS = int(os.getenv("INGESTION_JOB_WORKERS", "2"))
+# Reintentos de una ventana con tickets que no pudieron ingestarse (espera de 1s, 2s, ... entre intentos)
+INGESTION_JOB_WINDOW_RETRIES = int(os.getenv("INGESTION_JOB_WINDOW_RETRIES", "2"))
+INGESTION_JOB_RETRY_DELAY_SECONDS = float(os.getenv("INGESTION_JOB_RETRY_DELAY_SECONDS", "1"))
+
+
+class JobStatus(str, Enum):
+    """Estados de un job de ingestión."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class IngestionJob(BaseModel):
+    """Estado persistido de un job de ingestión."""
+    job_id: str
+    filename: str
+    format: str = "auto"
+    status: JobStatus = JobStatus.QUEUED
+    cancel_requested: bool = False
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Segundos de ejecución de las corridas anteriores (sin contar el tiempo con el proceso detenido)
+    active_seconds: float = 0.0
+    # Inicio y último checkpoint de la corrida actual
+    run_started_at: Optional[float] = None
+    checkpoint_at: Optional[float] = None
+    bytes_total: int = 0
+    bytes_read: int = 0
+    # Cantidad de registros del archivo ya confirmados (checkpoint para reanudar)
+    committed_records: int = 0
+    # Conteos hasta el último checkpoint: al reanudar, los registros posteriores se vuelven a leer y contar
+    result: StreamIngestionResult = Field(default_factory=StreamIngestionResult)
+
+
+class IngestionJobStatus(BaseModel):
+    """Vista del estado de un job para el endpoint de consulta."""
+    job_id: str
+    filename: str
+    status: JobStatus
+    processed: int
+    failed: int
+    total: Optional[int] = Field(None, description="Total de registros; se conoce al terminar de leer el archivo")
+    progress: float = Field(..., description="Fracción del archivo leída (0 a 1)")
+    rate: float = Field(..., description="Tickets ingestados por segundo")
+    eta_seconds: Optional[float] = None
+    errors: List[dict] = Field(default_factory=list)
+    fatal_error: Optional[str] = None
+
+
+class _CountingReader:
+    """Envuelve un archivo binario y registra los bytes leídos en el job."""
+
+    def __init__(self, file: BinaryIO, job: IngestionJob):
+        self._file = file
+        self._job = job
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._job.bytes_read += len(data)
+        return data
+
+
+class JobCancelled(Exception):
+    """Se pidió la cancelación del job."""
+
+
+class JobInterrupted(Exception):
+    """El proceso se está deteniendo; el job se reanuda desde su checkpoint al reiniciar."""
+
+
+class JobWindowFailed(Exception):
+    """Una ventana siguió con tickets sin ingestar después de los reintentos."""
+
+
+class IngestionJobManager:
+    """
+    Administra los jobs de ingestión: los persiste en disco y los ejecuta en un pool de workers.
+    """
+
+    def __init__(self, jobs_dir: str = INGESTION_JOBS_DIR, workers: int = INGESTION_JOB_WORKERS):
+        self._jobs_dir = jobs_dir
+        self._workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, IngestionJob] = {}
+        # Jobs encolados o en ejecución en este proceso; el estado del resto se lee de disco
+        self._active: set = set()
+        self._lock = threading.Lock()
+        # Se activa al apagar: los jobs en curso se detienen antes de su próxima ventana
+        self._stopping = threading.Event()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    # --- Persistencia ---
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self._jobs_dir, f"{job_id}.json")
+
+    def _data_path(self, job_id: str) -> str:
+        return os.path.join(self._jobs_dir, f"{job_id}.data")
+
+    def _lock_path(self, job_id: str) -> str:
+        return os.path.join(self._jobs_dir, f"{job_id}.lock")
+
+    def _cancel_path(self, job_id: str) -> str:
+        return os.path.join(self._jobs_dir, f"{job_id}.cancel")
+
+    def _load(self, job_id: str) -> Optional[IngestionJob]:
+        if not os.path.exists(self._state_path(job_id)):
+            return None
+        with open(self._state_path(job_id), "r", encoding="utf-8") as file:
+            return IngestionJob.model_validate_json(file.read())
+
+    def _save(self, job: IngestionJob) -> None:
+        with self._lock:
+            tmp_path = self._state_path(job.job_id) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(job.model_dump_json())
+            os.replace(tmp_path, self._state_path(job.job_id))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="ingestion-job")
+        return self._executor
+
+    # --- API pública ---
+
+    def submit(self, file: BinaryIO, filename: str, format: str = "auto") -> IngestionJob:
+        """
+        Guarda el archivo recibido en el directorio de jobs y encola su ingestión.
+
+        Args:
+            file (BinaryIO): Archivo subido, abierto en modo binario.
+            filename (str): Nombre original del archivo.
+            format (str): "auto", "array" o "ndjson".
+
+        Returns:
+            IngestionJob: Job creado (en estado "queued").
+        """
+        job = IngestionJob(job_id=uuid.uuid4().hex, filename=filename, format=format)
+        with open(self._data_path(job.job_id), "wb") as buffer:
+            shutil.copyfileobj(file, buffer)
+        job.bytes_total = os.path.getsize(self._data_path(job.job_id))
+        self._jobs[job.job_id] = job
+        self._save(job)
+        self._active.add(job.job_id)
+        self._get_executor().submit(self._run, job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Devuelve un job por id. Los que no corren en este proceso se leen de disco,
+        donde el worker que los ejecuta guarda el progreso en cada ventana.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job_id not in self._active:
+            job = self._load(job_id) or job
+            if job is not None:
+                self._jobs[job_id] = job
+        return job
+
+    def list_jobs(self) -> List[IngestionJob]:
+        """Devuelve los jobs conocidos, del más reciente al más antiguo."""
+        for name in os.listdir(self._jobs_dir):
+            if name.endswith(".json"):
+                self.get(name[:-len(".json")])
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Pide la cancelación de un job. Un job en cola se cancela de inmediato; uno en
+        ejecución se detiene antes de confirmar la próxima ventana.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+        if job.status == JobStatus.QUEUED:
+            # Si nadie tiene el lock del job, ningún worker lo está ejecutando y se puede cerrar aquí
+            with file_lock(self._lock_path(job_id), blocking=False) as acquired:
+                if acquired:
+                    job = self._load(job_id) or job
+                    if job.status == JobStatus.QUEUED:
+                        self._jobs[job_id] = job
+                        self._finish(job, JobStatus.CANCELLED)
+                        return job
+        # La marca en disco llega al worker que ejecuta el job, aunque sea otro proceso
+        open(self._cancel_path(job_id), "w").close()
+        job.cancel_requested = True
+        if job_id in self._active:
+            self._save(job)
+        return job
+
+    def resume_pending(self) -> List[str]:
+        """
+        Re-encola los jobs que quedaron sin terminar (ej. tras un reinicio del proceso).
+        Cada uno continúa a partir de su último checkpoint. Con varios workers todos los
+        re-encolan, pero sólo el que obtiene el lock del job lo ejecuta.
+
+        Returns:
+            List[str]: IDs de los jobs reanudados.
+        """
+        resumed = []
+        for job in self.list_jobs():
+            if job.status in TERMINAL_STATUSES or not os.path.exists(self._data_path(job.job_id)):
+                continue
+            if job.job_id in self._active:
+                continue
+            self._active.add(job.job_id)
+            self._get_executor().submit(self._run, job.job_id)
+            resumed.append(job.job_id)
+        if resumed:
+            logger.info("Jobs de ingestión reanudados: %s", resumed)
+        return resumed
+
+    def shutdown(self) -> None:
+        """
+        Detiene el pool sin esperar. Los jobs en curso terminan la ventana que están confirmando,
+        vuelven a la cola en disco y se reanudan al reiniciar desde ese checkpoint.
+        """
+        self._stopping.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # --- Ejecución ---
+
+    @staticmethod
+    def _end_run(job: IngestionJob, end_time: float) -> None:
+        if job.run_started_at is not None:
+            job.active_seconds += max(0.0, end_time - job.run_started_at)
+            job.run_started_at = None
+
+    def _finish(self, job: IngestionJob, status: JobStatus) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self._end_run(job, job.finished_at)
+        self._save(job)
+        for path in (self._data_path(job.job_id), self._cancel_path(job.job_id), self._lock_path(job.job_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _cancel_requested(self, job: IngestionJob) -> bool:
+        return job.cancel_requested or os.path.exists(self._cancel_path(job.job_id))
+
+    def _run(self, job_id: str) -> None:
+        """Ejecuta un job, salvo que otro worker ya lo esté ejecutando o lo haya terminado."""
+        try:
+            with file_lock(self._lock_path(job_id), blocking=False) as acquired:
+                if not acquired:
+                    return
+                # El estado en disco es el vigente: otro worker pudo terminar el job mientras estaba en cola
+                job = self._load(job_id)
+                if job is None or job.status in TERMINAL_STATUSES or not os.path.exists(self._data_path(job_id)):
+                    return
+                self._jobs[job_id] = job
+                self._execute(job)
+        finally:
+            self._active.discard(job_id)
+
+    def _execute(self, job: IngestionJob) -> None:
+        # Una corrida anterior que no llegó a cerrarse (el proceso murió) cuenta hasta su último checkpoint
+        if job.run_started_at is not None:
+            self._end_run(job, job.checkpoint_at or job.run_started_at)
+        if self._cancel_requested(job):
+            self._finish(job, JobStatus.CANCELLED)
+            return
+
+        job.status = JobStatus.RUNNING
+        job.started_at = job.started_at or time.time()
+        job.run_started_at = job.checkpoint_at = time.time()
+        job.bytes_read = 0
+        self._save(job)
+
+        # El ingestor cuenta sobre una copia: `job.result` sólo avanza en cada checkpoint
+        ingestor = TicketStreamIngestor(INGEST_WINDOW_SIZE, result=job.result.model_copy(deep=True))
+        # Los registros anteriores al checkpoint ya fueron contados e ingestados
+        skip = job.committed_records
+
+        def commit(window, records_consumed: int) -> None:
+            if self._cancel_requested(job):
+                raise JobCancelled()
+            if self._stopping.is_set():
+                raise JobInterrupted()
+            self._commit_window(ingestor, window)
+            job.committed_records = records_consumed
+            job.checkpoint_at = time.time()
+            job.result = ingestor.result.model_copy(deep=True)
+            self._save(job)
+
+        try:
+            with open(self._data_path(job.job_id), "rb") as file:
+                for record in iter_records(_CountingReader(file, job), format=job.format):
+                    if record.index < skip:
+                        continue
+                    window = ingestor.accept(record)
+                    if window:
+                        commit(window, record.index + 1)
+                    elif job.cancel_requested:
+                        raise JobCancelled()
+                    elif self._stopping.is_set():
+                        raise JobInterrupted()
+            window = ingestor.drain()
+            if window:
+                commit(window, ingestor.result.received)
+            job.committed_records = ingestor.result.received
+            job.result = ingestor.finish()
+            self._finish(job, JobStatus.COMPLETED)
+        except JobCancelled:
+            self._finish(job, JobStatus.CANCELLED)
+        except JobWindowFailed as e:
+            # La ventana no se confirma: sus tickets fallidos quedan en `failed` y `errors`
+            job.result = ingestor.result
+            job.result.fatal_error = str(e)
+            logger.warning("Job de ingestión %s: %s", job.job_id, e)
+            self._finish(job, JobStatus.FAILED)
+        except JobInterrupted:
+            # No es un estado terminal: el job vuelve a la cola y conserva su checkpoint y sus archivos
+            job.status = JobStatus.QUEUED
+            self._end_run(job, time.time())
+            self._save(job)
+            logger.info("Job de ingestión %s interrumpido en el registro %d, se reanuda al reiniciar", job.job_id, job.committed_records)
+        except StreamParseError as e:
+            # Las ventanas ya confirmadas quedan ingestadas
+            ingestor.fail(e)
+            job.result.fatal_error = ingestor.result.fatal_error
+            self._finish(job, JobStatus.FAILED)
+        except Exception as e:
+            job.result.fatal_error = f"{type(e).__name__}: {str(e)}"
+            logger.exception("Error en el job de ingestión %s", job.job_id)
+            self._finish(job, JobStatus.FAILED)
+
+    def _commit_window(self, ingestor: TicketStreamIngestor, window: list) -> None:
+        """
+        Ingesta una ventana, reintentándola entera mientras queden tickets sin ingestar.
+        Cada reintento descarta los conteos del intento anterior (los upserts son idempotentes).
+        """
+        for attempt in range(INGESTION_JOB_WINDOW_RETRIES + 1):
+            before = ingestor.result.model_copy(deep=True)
+            stats = ingestor.commit(window)
+            if not stats.failed_tickets:
+                return
+            if attempt == INGESTION_JOB_WINDOW_RETRIES:
+                raise JobWindowFailed(
+                    f"{stats.failed_tickets} tickets de la ventana no pudieron ingestarse tras {attempt + 1} intentos"
+                )
+            ingestor.result = before
+            # La espera se corta si el proceso se está deteniendo
+            if self._stopping.wait(INGESTION_JOB_RETRY_DELAY_SECONDS * 2 ** attempt):
+                raise JobInterrupted()
+
+    # --- Consulta ---
+
+    def status(self, job: IngestionJob) -> IngestionJobStatus:
+        """Calcula progreso, velocidad y tiempo restante estimado de un job."""
+        progress = job.bytes_read / job.bytes_total if job.bytes_total else 0.0
+        if job.status == JobStatus.COMPLETED:
+            progress = 1.0
+        # Sólo cuenta el tiempo de ejecución: un job reanudado no suma el tiempo con el proceso detenido
+        elapsed = job.active_seconds
+        if job.run_started_at is not None:
+            elapsed += time.time() - job.run_started_at
+        rate = job.result.ingested / elapsed if elapsed > 0 else 0.0
+        eta_seconds = None
+        if job.status == JobStatus.RUNNING and 0 < progress < 1:
+            eta_seconds = elapsed * (1 - progress) / progress
+        return IngestionJobStatus(
+            job_id=job.job_id,
+            filename=job.filename,
+            status=job.status,
+            processed=job.result.ingested,
+            failed=job.result.failed,
+            total=job.result.received if job.status in TERMINAL_STATUSES else None,
+            progress=progress,
+            rate=rate,
+            eta_seconds=eta_seconds,
+            errors=job.result.errors,
+            fatal_error=job.result.fatal_error,
+        )
+
+
+ingestion_job_manager = IngestionJobManager()
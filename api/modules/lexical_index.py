@@ -0,0 +1,338 @@
+"""
+Módulo con el índice léxico (BM25) de tickets.
+Complementa a la búsqueda vectorial con coincidencias exactas de tokens (nombres de
+productos, códigos de error, hostnames) que los embeddings suelen rankear mal.
+El índice vive en memoria en arrays de numpy, se construye desde el ticket store en el warmup
+y luego incorpora los tickets que cambiaron en el store: tras cada ingestión propia y, cuando
+cambia la generación del índice, las que hicieron otros workers.
+"""
+
+import os
+import re
+import math
+import threading
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+from typing import Collection, DefaultDict, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from .ticket_store import ticket_store
+from .shared_state import IndexGeneration, index_generation
+
+# Campos del ticket que se indexan
+LEXICAL_FIELDS = ("description", "actions", "impact")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Los términos de la consulta presentes en más de esta fracción de los tickets no se puntúan
+# (casi no discriminan y son los que más postings recorren)
+BM25_MAX_DF = float(os.getenv("BM25_MAX_DF", "0.5"))
+# Postings nuevos que se acumulan antes de fusionarlos con los arrays del índice
+# (o el 10% de los postings del índice, si es mayor)
+BM25_MERGE_MIN_POSTINGS = int(os.getenv("BM25_MERGE_MIN_POSTINGS", "50000"))
+_MERGE_FRACTION = 0.1
+
+# Palabras vacías (español e inglés, sin tildes) que no se indexan
+STOPWORDS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi cada como con contra cual cuando
+    de del desde donde dos durante e el ella ellas ellos en entre era eran es esa esas ese eso esos esta
+    estaba estaban estan estar estas este esto estos fue fueron ha hace hacer han hasta hay la las le les
+    lo los mas me mi mis mucho muy nada ni no nos nuestra nuestro o otra otras otro otros para pero poco
+    por porque que quien se sea ser si sin sobre solo su sus tambien tan te tiene tienen todo todos tu
+    u un una unas uno unos y ya yo
+    an and are as at be been but by can do does for from had has have i if in into is it its my not of
+    on or our so than that the their then there these they this to was we were what when which will
+    with you your
+""".split())
+
+# Tokens alfanuméricos que pueden contener '.', '-' o '_' internos (ej. "err-0x80", "srv01.corp")
+_TOKEN_PATTERN = re.compile(r"\w+(?:[.\-_]\w+)*")
+# Marcas diacríticas que deja la descomposición NFKD (tildes, diéresis, virgulilla de la ñ)
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]+")
+
+
+# Máximo de tokens distintos cuyo término se recuerda
+_TERM_CACHE_MAX_ENTRIES = 1_000_000
+
+
+class _TermCache(dict):
+    """
+    Término de índice de cada token en minúsculas: el token sin tildes, o "" si es una palabra vacía.
+    Se calcula una vez por token distinto y no por cada aparición.
+    """
+
+    def __missing__(self, token: str) -> str:
+        term = _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", token))
+        if term in STOPWORDS:
+            term = ""
+        if len(self) < _TERM_CACHE_MAX_ENTRIES:
+            self[token] = term
+        return term
+
+
+_terms = _TermCache()
+
+
+def _iter_terms(text: str) -> Iterator[str]:
+    return map(_terms.__getitem__, _TOKEN_PATTERN.findall(text.lower()))
+
+
+def index_terms(text: str) -> List[str]:
+    """Pasa a minúsculas, separa en tokens, les quita las tildes y descarta las palabras vacías."""
+    return [term for term in _iter_terms(text) if term]
+
+
+class BM25Index:
+    """
+    Índice invertido con scoring BM25 sobre los campos de texto de los tickets.
+
+    Los postings (documento y frecuencia) de todos los términos están en arrays de numpy en formato
+    CSR, de modo que una consulta se puntúa con operaciones vectorizadas sobre los postings de sus
+    términos. Los tickets nuevos se acumulan aparte y se fusionan con los arrays cuando son muchos;
+    un ticket reindexado deja su versión anterior marcada como borrada hasta la próxima fusión.
+    """
+
+    def __init__(
+        self,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        max_df: float = BM25_MAX_DF,
+        generation: IndexGeneration = index_generation,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.generation = generation
+        # Término -> id; un término nuevo recibe como id la cantidad de términos ya registrados
+        self._vocabulary: DefaultDict[str, int] = defaultdict()
+        self._vocabulary.default_factory = self._vocabulary.__len__
+        # Posición de cada documento -> ticketId, y posición vigente de cada ticket
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._live_count = 0
+        self._total_length = 0.0
+        # Postings fusionados: los del término t están en [_indptr[t], _indptr[t + 1])
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._frequencies = np.zeros(0, dtype=np.float32)
+        # Postings pendientes de fusionar, como ternas (término, posición, frecuencia)
+        self._pending_terms = array("i")
+        self._pending_docs = array("i")
+        self._pending_frequencies = array("i")
+        self._pending_view: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._loaded = False
+        # Secuencia del ticket store y generación del índice hasta las que está sincronizado
+        self._seq = 0
+        self._synced_generation = -1
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        generation = self.generation.value
+        if self._loaded and generation == self._synced_generation:
+            return
+        with self._lock:
+            if not self._loaded:
+                # La secuencia se lee antes de recorrer el store: lo que se escriba durante la carga se re-indexa
+                self._seq = ticket_store.last_seq()
+                self._add(ticket_store.iter_all(), merge=False)
+                self._merge()
+                self._loaded = True
+            elif generation != self._synced_generation:
+                self._sync()
+            self._synced_generation = generation
+
+    def _sync(self) -> None:
+        for seq, ticket in ticket_store.iter_updated(self._seq):
+            self._add([ticket])
+            self._seq = seq
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._lengths):
+            capacity = max(size, 2 * len(self._lengths), 1024)
+            self._lengths = np.resize(self._lengths, capacity)
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:len(self._alive)] = self._alive
+            self._alive = alive
+
+    def _remove(self, ticket_id: str) -> None:
+        position = self._positions.pop(ticket_id, None)
+        if position is None:
+            return
+        self._alive[position] = False
+        self._live_count -= 1
+        self._total_length -= float(self._lengths[position])
+
+    def _add(self, tickets: Iterable[dict], merge: bool = True) -> None:
+        for ticket in tickets:
+            ticket_id = ticket["ticketId"]
+            self._remove(ticket_id)
+            terms = Counter(_iter_terms(" ".join(str(ticket.get(field) or "") for field in LEXICAL_FIELDS)))
+            terms.pop("", None)
+            length = sum(terms.values())
+            position = len(self._ids)
+            self._ids.append(ticket_id)
+            self._positions[ticket_id] = position
+            self._reserve(position + 1)
+            self._lengths[position] = length
+            self._alive[position] = True
+            self._live_count += 1
+            self._total_length += length
+            self._pending_terms.extend(map(self._vocabulary.__getitem__, terms))
+            self._pending_docs.extend([position] * len(terms))
+            self._pending_frequencies.extend(terms.values())
+        self._pending_view = None
+        if merge and len(self._pending_terms) > max(BM25_MERGE_MIN_POSTINGS, _MERGE_FRACTION * len(self._docs)):
+            self._merge()
+
+    def _merge(self) -> None:
+        """Fusiona los postings pendientes con los arrays y descarta los de documentos borrados."""
+        pending_terms, pending_docs, pending_frequencies = self._pending()
+        terms = np.concatenate([
+            np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int32), np.diff(self._indptr)), pending_terms
+        ])
+        docs = np.concatenate([self._docs, pending_docs])
+        frequencies = np.concatenate([self._frequencies, pending_frequencies])
+
+        document_count = len(self._ids)
+        if self._live_count < document_count:
+            # Se renumeran los documentos vigentes: los borrados dejan de ocupar lugar
+            live = np.flatnonzero(self._alive[:document_count])
+            keep = self._alive[docs]
+            terms, docs, frequencies = terms[keep], docs[keep], frequencies[keep]
+            renumber = np.zeros(document_count, dtype=np.int32)
+            renumber[live] = np.arange(len(live), dtype=np.int32)
+            docs = renumber[docs]
+            self._ids = [self._ids[position] for position in live.tolist()]
+            self._positions = {ticket_id: position for position, ticket_id in enumerate(self._ids)}
+            self._lengths = self._lengths[live]
+            self._alive = np.ones(len(live), dtype=bool)
+
+        # Orden estable: dentro de cada término los documentos quedan en orden de posición
+        order = np.argsort(terms, kind="stable")
+        self._docs = docs[order]
+        self._frequencies = frequencies[order]
+        self._indptr = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self._vocabulary)), out=self._indptr[1:])
+        self._pending_terms, self._pending_docs, self._pending_frequencies = array("i"), array("i"), array("i")
+        self._pending_view = None
+
+    def _pending(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Copia en numpy de los postings pendientes, que se reutiliza hasta el próximo ticket agregado
+        if self._pending_view is None:
+            self._pending_view = (
+                np.array(self._pending_terms, dtype=np.int32),
+                np.array(self._pending_docs, dtype=np.int32),
+                np.array(self._pending_frequencies, dtype=np.float32),
+            )
+        return self._pending_view
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id < len(self._indptr) - 1:
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            docs, frequencies = self._docs[start:end], self._frequencies[start:end]
+        else:
+            docs, frequencies = self._docs[:0], self._frequencies[:0]
+        if len(self._pending_terms):
+            pending_terms, pending_docs, pending_frequencies = self._pending()
+            matches = pending_terms == term_id
+            docs = np.concatenate([docs, pending_docs[matches]])
+            frequencies = np.concatenate([frequencies, pending_frequencies[matches]])
+        return docs, frequencies
+
+    def load(self) -> int:
+        """Construye el índice desde el ticket store (si aún no está construido) y devuelve su cantidad de tickets."""
+        self._ensure_loaded()
+        return self._live_count
+
+    def add_many(self, tickets: Iterable[dict]) -> None:
+        """Indexa (o reindexa) tickets representados como dict."""
+        self._ensure_loaded()
+        with self._lock:
+            self._add(tickets)
+
+    def sync(self) -> None:
+        """Indexa los tickets guardados o actualizados en el ticket store desde la última sincronización."""
+        if not self._loaded:
+            # Todavía no se construyó: la carga leerá esos tickets del store
+            return
+        self._ensure_loaded()
+        with self._lock:
+            self._sync()
+
+    def _top(self, scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+        """Las k posiciones de mayor score, de mayor a menor; a igual score, por orden de indexación."""
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def search(self, query: str, k: int = 5, allowed_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Busca los tickets con mayor score BM25 para la consulta.
+
+        Args:
+            query (str): Texto de la consulta.
+            k (int): Cantidad de resultados.
+            allowed_ids (Optional[Collection[str]]): Si se indica, sólo se devuelven estos tickets.
+
+        Returns:
+            List[Tuple[str, float]]: (ticketId, score) de mayor a menor score.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._live_count == 0 or k <= 0:
+                return []
+            matches = []
+            for term in set(index_terms(query)):
+                term_id = self._vocabulary.get(term)
+                if term_id is None:
+                    continue
+                docs, frequencies = self._postings(term_id)
+                live = self._alive[docs]
+                document_frequency = int(np.count_nonzero(live))
+                if document_frequency:
+                    matches.append((document_frequency, docs[live], frequencies[live]))
+            if not matches:
+                return []
+            # Si todos los términos son muy frecuentes se puntúa sólo el menos frecuente
+            selected = [match for match in matches if match[0] <= self.max_df * self._live_count]
+            selected = selected or [min(matches, key=lambda match: match[0])]
+
+            average_length = self._total_length / self._live_count
+            matched_scores = []
+            for document_frequency, docs, frequencies in selected:
+                idf = math.log(1 + (self._live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[docs] / average_length)
+                matched_scores.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+            scores = np.bincount(
+                np.concatenate([docs for _, docs, _ in selected]),
+                weights=np.concatenate(matched_scores),
+                minlength=len(self._ids),
+            )
+            candidates = np.flatnonzero(scores)
+
+            if allowed_ids is None:
+                ranked = self._top(scores, candidates, k).tolist()
+            elif len(allowed_ids) * 4 < len(candidates):
+                # Pocos tickets permitidos: se restringen los candidatos a sus posiciones
+                positions = [self._positions[ticket_id] for ticket_id in allowed_ids if ticket_id in self._positions]
+                allowed = np.zeros(len(self._ids), dtype=bool)
+                allowed[positions] = True
+                ranked = self._top(scores, candidates[allowed[candidates]], k).tolist()
+            else:
+                # Muchos tickets permitidos: se recorren los mejores candidatos hasta reunir k permitidos
+                limit = k
+                while True:
+                    top = self._top(scores, candidates, limit)
+                    ranked = [position for position in top.tolist() if self._ids[position] in allowed_ids]
+                    if len(ranked) >= k or len(top) == len(candidates):
+                        break
+                    limit *= 4
+            return [(self._ids[position], float(scores[position])) for position in ranked[:k]]
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return self._live_count
+
+
+lexical_index = BM25Index()
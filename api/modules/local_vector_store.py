@@ -0,0 +1,449 @@
+"""
+Módulo con un vectorstore local de búsqueda exacta.
+Los embeddings se guardan en una matriz float32 mapeada en memoria (memmap) en disco,
+y el top-k se resuelve con productos punto vectorizados de NumPy.
+Varios procesos (los workers de la API) pueden compartir el mismo directorio.
+"""
+
+import os
+import json
+import asyncio
+import threading
+import numpy as np
+from array import array
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from .shared_state import file_lock
+
+VECTORS_FILE_NAME = "vectors.f32"
+HEADER_FILE_NAME = "header.json"
+ENTRIES_FILE_NAME = "entries.jsonl"
+LOCK_FILE_NAME = "write.lock"
+INITIAL_CAPACITY = 1024
+# Máximo de scores (consultas x filas) que se materializan a la vez en una búsqueda por lotes
+SCORES_BLOCK_ELEMENTS = 1 << 25
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vectorstore local persistente con búsqueda exacta por similitud coseno.
+
+    Los vectores se normalizan al insertarse, por lo que el producto punto
+    contra la consulta normalizada equivale a la similitud coseno.
+
+    Cada proceso que abre el directorio comparte la matriz (memmap) a través del page cache
+    y guarda en memoria sólo los ids y los ticketId de las filas; textos y metadatos se leen
+    del log de entradas para los resultados. Las escrituras se serializan entre procesos con
+    un lock de archivo, y cada proceso incorpora lo que escribieron los demás leyendo el final
+    del log antes de escribir o buscar.
+    """
+
+    # El índice secundario resuelve filtros por ticketId de cualquier tamaño
+    max_filter_ids: Optional[int] = None
+
+    def __init__(self, embedding: Embeddings, path: str):
+        self._embedding = embedding
+        self._path = path
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._matrix: Optional[np.memmap] = None
+        self._ids: List[str] = []
+        self._ticket_ids: List[Optional[str]] = []
+        # Posición (offset y largo en bytes) de la entrada vigente de cada fila en el log
+        self._entry_offsets = array("q")
+        self._entry_lengths = array("q")
+        self._row_by_id: dict = {}
+        # Filas borradas (tombstones): se excluyen de la búsqueda y no se reutilizan
+        self._deleted_rows: set = set()
+        # Índice secundario ticketId -> filas, para filtrar antes de calcular similitudes
+        self._rows_by_ticket: dict = {}
+        # Bytes del log ya incorporados
+        self._log_offset = 0
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._refresh()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    # --- Persistencia ---
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self._path, VECTORS_FILE_NAME)
+
+    def _header_path(self) -> str:
+        return os.path.join(self._path, HEADER_FILE_NAME)
+
+    def _entries_path(self) -> str:
+        return os.path.join(self._path, ENTRIES_FILE_NAME)
+
+    def _map_matrix(self) -> None:
+        """Abre la matriz según la cabecera, o la reabre si otro proceso la agrandó."""
+        if not os.path.exists(self._header_path()):
+            return
+        with open(self._header_path(), "r", encoding="utf-8") as file:
+            header = json.load(file)
+        if self._matrix is not None and header["capacity"] == self._capacity:
+            return
+        self._dim = header["dim"]
+        self._capacity = header["capacity"]
+        if self._dim and self._capacity:
+            self._matrix = np.memmap(
+                self._vectors_path(), dtype=np.float32, mode="r+", shape=(self._capacity, self._dim)
+            )
+
+    def _refresh(self) -> None:
+        """
+        Incorpora las entradas agregadas al log desde la última lectura (al abrir el store,
+        todas). Se llama con `self._lock` tomado; si el log no creció, cuesta un `stat`.
+        """
+        try:
+            size = os.path.getsize(self._entries_path())
+        except FileNotFoundError:
+            self._map_matrix()
+            return
+        if size <= self._log_offset:
+            return
+        with open(self._entries_path(), "rb") as file:
+            file.seek(self._log_offset)
+            data = file.read(size - self._log_offset)
+        # Una última línea sin "\n" es una escritura en curso de otro proceso: se lee en la próxima
+        complete = data[:data.rfind(b"\n") + 1]
+        offset = self._log_offset
+        for line in complete.split(b"\n")[:-1]:
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("deleted"):
+                    self._apply_delete(entry["row"], entry["id"])
+                else:
+                    self._apply_entry(entry["row"], entry["id"], entry["metadata"].get("ticketId"), offset, len(line))
+            offset += len(line) + 1
+        self._log_offset = offset
+        # Los vectores se escriben antes que el log, así que la cabecera ya cubre las filas leídas
+        self._map_matrix()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Lock de escritura entre hilos y procesos; al tomarlo, el store queda al día con el log."""
+        with self._lock, file_lock(os.path.join(self._path, LOCK_FILE_NAME)):
+            self._refresh()
+            yield
+
+    def _unindex_row(self, row: int) -> None:
+        rows = self._rows_by_ticket.get(self._ticket_ids[row])
+        if rows is not None:
+            rows.discard(row)
+
+    def _apply_entry(self, row: int, doc_id: str, ticket_id: Optional[str], offset: int, length: int) -> None:
+        if row == len(self._ids):
+            self._ids.append(doc_id)
+            self._ticket_ids.append(ticket_id)
+            self._entry_offsets.append(offset)
+            self._entry_lengths.append(length)
+        else:
+            self._unindex_row(row)
+            self._ticket_ids[row] = ticket_id
+            self._entry_offsets[row] = offset
+            self._entry_lengths[row] = length
+        self._row_by_id[doc_id] = row
+        if ticket_id is not None:
+            self._rows_by_ticket.setdefault(ticket_id, set()).add(row)
+
+    def _apply_delete(self, row: int, doc_id: str) -> None:
+        self._unindex_row(row)
+        self._deleted_rows.add(row)
+        self._ticket_ids[row] = None
+        if self._row_by_id.get(doc_id) == row:
+            del self._row_by_id[doc_id]
+
+    def _append_log(self, lines: List[bytes]) -> None:
+        with open(self._entries_path(), "ab") as file:
+            file.write(b"".join(lines))
+        self._log_offset += sum(len(line) for line in lines)
+
+    def _read_entries(self, log: BinaryIO, rows: Iterable[int]) -> List[dict]:
+        """Lee del log la entrada vigente (texto y metadatos) de cada fila."""
+        with self._lock:
+            positions = [(self._entry_offsets[row], self._entry_lengths[row]) for row in rows]
+        entries = []
+        for offset, length in positions:
+            log.seek(offset)
+            entries.append(json.loads(log.read(length)))
+        return entries
+
+    def _save_header(self) -> None:
+        """Escribe la cabecera de forma atómica (archivo temporal + reemplazo)."""
+        tmp_path = self._header_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"dim": self._dim, "capacity": self._capacity}, file)
+        os.replace(tmp_path, self._header_path())
+
+    def _ensure_capacity(self, required_rows: int) -> None:
+        """Agranda el archivo de vectores (duplicando capacidad) si no alcanza."""
+        if self._matrix is not None and required_rows <= self._capacity:
+            return
+        new_capacity = max(self._capacity, INITIAL_CAPACITY)
+        while new_capacity < required_rows:
+            new_capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._vectors_path(), "ab") as file:
+            file.truncate(new_capacity * self._dim * np.dtype(np.float32).itemsize)
+        self._capacity = new_capacity
+        self._matrix = np.memmap(
+            self._vectors_path(), dtype=np.float32, mode="r+", shape=(self._capacity, self._dim)
+        )
+        self._save_header()
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Inserta (o reemplaza, si el id ya existe) vectores ya calculados.
+
+        Args:
+            texts (List[str]): Textos de cada fragmento.
+            embeddings (List[List[float]]): Embeddings de cada texto.
+            metadatas (Optional[List[dict]]): Metadatos por fragmento.
+            ids (Optional[List[str]]): IDs deterministas por fragmento.
+
+        Returns:
+            List[str]: IDs insertados.
+        """
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [f"{len(self._ids) + i}" for i in range(len(texts))]
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._write_lock():
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Dimensión de embedding {vectors.shape[1]} distinta a la del índice ({self._dim})"
+                )
+
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self._row_by_id]
+            self._ensure_capacity(len(self._ids) + len(new_ids))
+
+            lines = []
+            offset = self._log_offset
+            for text, vector, metadata, doc_id in zip(texts, vectors, metadatas, ids):
+                row = self._row_by_id.get(doc_id, len(self._ids))
+                line = json.dumps(
+                    {"row": row, "id": doc_id, "text": text, "metadata": metadata}, ensure_ascii=False
+                ).encode("utf-8")
+                self._apply_entry(row, doc_id, metadata.get("ticketId"), offset, len(line))
+                self._matrix[row] = vector
+                lines.append(line + b"\n")
+                offset += len(line) + 1
+
+            # Primero los vectores y luego el log: una entrada nunca apunta a una fila sin escribir
+            self._matrix.flush()
+            self._append_log(lines)
+        return list(ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        embeddings = await self._embedding.aembed_documents(texts)
+        return await asyncio.to_thread(self.add_embeddings, texts, embeddings, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Borra fragmentos por id dejando una marca (tombstone) en el log de entradas.
+
+        Args:
+            ids (Optional[List[str]]): IDs a borrar; los inexistentes se ignoran.
+
+        Returns:
+            Optional[bool]: True si la operación terminó.
+        """
+        if not ids:
+            return True
+        with self._write_lock():
+            lines = []
+            for doc_id in dict.fromkeys(ids):
+                row = self._row_by_id.get(doc_id)
+                if row is None:
+                    continue
+                self._apply_delete(row, doc_id)
+                lines.append(json.dumps({"row": row, "id": doc_id, "deleted": True}, ensure_ascii=False).encode("utf-8") + b"\n")
+            if lines:
+                self._append_log(lines)
+        return True
+
+    async def adelete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        return await asyncio.to_thread(self.delete, ids, **kwargs)
+
+    # --- Búsqueda ---
+
+    def _filter_rows(self, filter: dict) -> List[int]:
+        """
+        Resuelve un filtro por ticketId (`{"ticketId": id}` o `{"ticketId": {"$in": [...]}}`)
+        a las filas que lo cumplen, usando el índice secundario.
+        """
+        unsupported = set(filter) - {"ticketId"}
+        if unsupported:
+            raise ValueError(f"Filtro no soportado por el vectorstore local: {', '.join(sorted(unsupported))}")
+        condition = filter["ticketId"]
+        ticket_ids = condition["$in"] if isinstance(condition, dict) else [condition]
+        rows = set()
+        for ticket_id in ticket_ids:
+            rows.update(self._rows_by_ticket.get(ticket_id, ()))
+        return sorted(rows)
+
+    def _snapshot(self, filter: Optional[dict]) -> Tuple[int, Optional[np.memmap], Optional[np.ndarray], List[int]]:
+        """
+        Toma una foto (cantidad de filas, matriz, filas candidatas, filas borradas) bajo el lock;
+        los productos se calculan fuera. Con filtro sólo se comparan las filas de los tickets que lo cumplen.
+        """
+        with self._lock:
+            self._refresh()
+            if filter:
+                rows = np.asarray(self._filter_rows(filter), dtype=np.int64)
+                return len(self._ids), self._matrix, rows, []
+            return len(self._ids), self._matrix, None, list(self._deleted_rows)
+
+    def _top_k(
+        self, scores: np.ndarray, rows: Optional[np.ndarray], k: int, log: BinaryIO
+    ) -> List[Tuple[Document, float]]:
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        # argpartition es O(n); sólo se ordenan los k candidatos finales
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top_rows = [int(row) for row in (rows[top] if rows is not None else top)]
+        entries = self._read_entries(log, top_rows)
+        return [
+            (
+                Document(id=self._ids[row], page_content=entry["text"], metadata=entry["metadata"]),
+                float(score),
+            )
+            for row, entry, score in zip(top_rows, entries, scores[top])
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vectors_with_score([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_by_vectors_with_score(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Búsqueda de varias consultas a la vez: un único producto matricial (por bloques de consultas,
+        para acotar la memoria de la matriz de scores) en lugar de una pasada por consulta.
+
+        Args:
+            embeddings (List[List[float]]): Embeddings de las consultas.
+            k (int): Resultados por consulta.
+            filter (Optional[dict]): Filtro por ticketId, compartido por todas las consultas.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: Resultados de cada consulta, en el mismo orden.
+        """
+        if not embeddings:
+            return []
+        count, matrix, rows, deleted_rows = self._snapshot(filter)
+        if matrix is None or count == 0 or (rows is not None and len(rows) == 0):
+            return [[] for _ in embeddings]
+        candidates = matrix[rows] if rows is not None else matrix[:count]
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        block_size = max(1, SCORES_BLOCK_ELEMENTS // len(candidates))
+        results = []
+        with open(self._entries_path(), "rb") as log:
+            for start in range(0, len(queries), block_size):
+                scores_block = queries[start:start + block_size] @ candidates.T
+                if deleted_rows:
+                    scores_block[:, deleted_rows] = -np.inf
+                results.extend(self._top_k(scores, rows, k, log) for scores in scores_block)
+        return results
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = await self._embedding.aembed_query(query)
+        return await self.asimilarity_search_by_vector_with_score(embedding, k, **kwargs)
+
+    async def asimilarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # El producto matricial libera el GIL; se corre en un hilo para no frenar el event loop
+        return await asyncio.to_thread(self.similarity_search_by_vector_with_score, embedding, k, **kwargs)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Los scores ya son similitud coseno en [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str = ".vector_store",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, path=path)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
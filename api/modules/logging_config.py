@@ -0,0 +1,151 @@
+"""
+Módulo de logging de la API: loggers con niveles bajo el espacio de nombres `ticket_api`,
+un QueueHandler que saca el formateo y la escritura del event loop (un hilo de fondo los
+resuelve), formato de texto o JSON y muestreo de los payloads voluminosos en nivel DEBUG.
+"""
+
+import os
+import sys
+import json
+import queue
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Optional
+from .metrics import registry
+
+LOGGER_NAMESPACE = "ticket_api"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (una línea legible por registro) o "json" (un objeto JSON por línea)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Registros pendientes de escribir; con la cola llena se descartan en lugar de bloquear
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fracción de los payloads voluminosos (tickets, respuestas del LLM) que se registran en DEBUG
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+DROPPED_LOG_RECORDS = registry.counter(
+    "ticket_api_log_records_dropped_total", "Registros de log descartados por tener la cola llena."
+)
+
+# Atributos propios de LogRecord; el resto son campos agregados con `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger del módulo `name` (ej. `__name__`) dentro del espacio de nombres de la API."""
+    return logging.getLogger(f"{LOGGER_NAMESPACE}.{name.rsplit('.', 1)[-1]}")
+
+
+class Truncated:
+    """
+    Envuelve un valor para registrarlo recortado. La conversión a texto ocurre recién al
+    formatear el registro, en el hilo de logging, y sólo si el registro no se descartó.
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: int = LOG_PAYLOAD_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... ({len(text) - self.max_chars} caracteres más)"
+
+
+def log_payload(logger: logging.Logger, message: str, *args: Any) -> None:
+    """
+    Registra en DEBUG un mensaje con payloads voluminosos, sólo para una muestra de
+    LOG_PAYLOAD_SAMPLE_RATE de las llamadas. Los argumentos se recortan a LOG_PAYLOAD_MAX_CHARS.
+    Con DEBUG deshabilitado el costo es una comparación de nivel.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if LOG_PAYLOAD_SAMPLE_RATE < 1 and random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    logger.debug(message, *(Truncated(arg) for arg in args), stacklevel=2)
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro, con los campos pasados en `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text or record.exc_info:
+            entry["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca bloquea al que registra: con la cola llena el registro se descarta
+    (y se cuenta en /metrics). El mensaje se formatea en el hilo del listener, no en el request.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # La cola es en memoria: no hace falta serializar el registro, sólo resolver
+        # el traceback mientras la excepción sigue activa
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_LOG_RECORDS.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: str = LOG_LEVEL, format: str = LOG_FORMAT) -> None:
+    """
+    Configura los loggers de la API (idempotente): nivel, cola no bloqueante y un hilo
+    que formatea y escribe en stderr.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        if format == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        logger = logging.getLogger(LOGGER_NAMESPACE)
+        logger.setLevel(level)
+        logger.addHandler(NonBlockingQueueHandler(log_queue))
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Escribe los registros pendientes y detiene el hilo de logging."""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        logger = logging.getLogger(LOGGER_NAMESPACE)
+        for handler in list(logger.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                logger.removeHandler(handler)
+        logger.propagate = True
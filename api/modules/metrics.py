@@ -0,0 +1,297 @@
+"""
+Módulo de métricas de la API: latencia por etapa, tokens del LLM, aciertos de las cachés e ingestión.
+Las métricas se exponen en el formato de texto de Prometheus (endpoint `/metrics`) y las etapas
+de cada request se devuelven además en el header `Server-Timing` de la respuesta.
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+# Límites superiores (en segundos) de los buckets de los histogramas de latencia
+METRICS_LATENCY_BUCKETS = tuple(
+    float(bound) for bound in os.getenv(
+        "METRICS_LATENCY_BUCKETS", "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30"
+    ).split(",")
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    """Base de las métricas: nombre, descripción y nombres de las etiquetas."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"La métrica {self.name} espera las etiquetas {self.labelnames}, se recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monótono por combinación de etiquetas."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            # Un contador sin etiquetas se expone en 0 desde el arranque
+            values = [((), 0.0)]
+        for key, value in values:
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """Histograma de buckets acumulativos (más suma y cantidad) por combinación de etiquetas."""
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = METRICS_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteo por bucket (el último es +Inf), suma, cantidad]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """Conjunto de métricas que se exponen juntas en `/metrics`."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"La métrica {metric.name} ya está registrada")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs: Any) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "ticket_api_stage_duration_seconds", "Duración de cada etapa del procesamiento de un request.", ("stage",)
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "ticket_api_http_request_duration_seconds", "Duración de los requests HTTP por ruta.", ("method", "route", "status")
+)
+LLM_TOKENS = registry.counter(
+    "ticket_api_llm_tokens_total", "Tokens consumidos en llamadas al LLM (prompt o completion).", ("model", "kind")
+)
+CACHE_REQUESTS = registry.counter(
+    "ticket_api_cache_requests_total", "Consultas a las cachés de la API por resultado (hit o miss).", ("cache", "result")
+)
+INGESTED_TICKETS = registry.counter(
+    "ticket_api_ingested_tickets_total", "Tickets ingestados por modo (bulk o individual) y resultado.", ("mode", "result")
+)
+INGESTED_CHUNKS = registry.counter(
+    "ticket_api_ingested_chunks_total", "Fragmentos subidos al vectorstore.", ("mode",)
+)
+INGEST_FAILED_BATCHES = registry.counter(
+    "ticket_api_ingest_failed_batches_total", "Lotes de fragmentos que no pudieron subirse al vectorstore."
+)
+
+
+# --- Etapas por request ---
+
+# Etapas (nombre, segundos) del request en curso; None fuera de un request HTTP
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Registra la duración de una etapa en el histograma y en el Server-Timing del request en curso."""
+    if not METRICS_ENABLED:
+        return
+    STAGE_DURATION.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Mide la duración del bloque como la etapa `name` (también cuando el bloque lanza una excepción).
+    Puede usarse como decorador de funciones sincrónicas.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    """Cuenta `count` consultas a la caché `cache` como hit o miss."""
+    if METRICS_ENABLED and count:
+        CACHE_REQUESTS.inc(count, cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm_usage(model: Optional[str], usage: Any) -> None:
+    """Suma los tokens de prompt y completion del objeto `usage` devuelto por Groq."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, model=model or "", kind=kind)
+
+
+def record_ingestion(mode: str, ingested: int, chunks: int, skipped: int = 0, failed: int = 0, failed_batches: int = 0) -> None:
+    """Cuenta los tickets y fragmentos de una ingestión."""
+    if not METRICS_ENABLED:
+        return
+    for result, count in (("ingested", ingested), ("skipped", skipped), ("failed", failed)):
+        if count:
+            INGESTED_TICKETS.inc(count, mode=mode, result=result)
+    if chunks:
+        INGESTED_CHUNKS.inc(chunks, mode=mode)
+    if failed_batches:
+        INGEST_FAILED_BATCHES.inc(failed_batches)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """
+    Arma el header Server-Timing: una entrada por etapa (sumando las repetidas, ej. varias
+    rondas de consulta al vectorstore) en orden de finalización, más el total del request.
+    """
+    durations: Dict[str, float] = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in durations.items())
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la duración de cada request por ruta y agrega el header
+    `Server-Timing` con las etapas completadas hasta el envío de los headers. En las
+    respuestas en streaming, las etapas posteriores sólo quedan en los histogramas.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    header = server_timing_header(timings, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Se usa la plantilla de la ruta (ej. /api/jobs/{job_id}) para acotar la cantidad de series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=scope.get("method", ""), route=route, status=status
+            )
@@ -3,17 +3,28 @@ Módulo para la funcionalidad de resumen de noticias.
 Este archivo contiene la estructura mock para que implementes la funcionalidad.
 """
 
-from pydantic import BaseModel, field_validator, ConfigDict
-from .third_party_clients import groq_llm_client as groq_llm_client
-from groq import Groq
+from pydantic import BaseModel, field_validator, ConfigDict, ValidationError
+from .third_party_clients import LazyClient, groq_llm_client, async_groq_llm_client
+from .completion_cache import cached_chat_completion, acached_chat_completion, astream_chat_completion
+from .rate_limiter import groq_rate_limiter
+from .metrics import stage
+from .logging_config import get_logger, log_payload
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union
 import os
-import sys
 import re
 import json
+import asyncio
 
-groq_llm_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+logger = get_logger(__name__)
 
 NEWS_SUMMARIZER_MODEL_NAME = os.getenv("CHAT_MODEL_NAME")
+# Máximo de noticias por request de resumen en lote
+NEWS_BATCH_MAX_ITEMS = int(os.getenv("NEWS_BATCH_MAX_ITEMS", "1000"))
+
+# Cliente usado por los lotes: respeta la cuota de Groq y reintenta los 429 con backoff
+rate_limited_groq_client = LazyClient(
+    "async_groq_rate_limited", lambda: groq_rate_limiter.wrap(async_groq_llm_client.get())
+)
 NEWS_SUMMARIZER_SYSTEM_MESSAGE = """
     Eres un asistente que ayuda a resumir noticias de manera concisa y clara usando el idioma español.
     Debes proporcionar un resumen en 100 caracteres o menos y una lista de conceptos o tags clave que la noticia menciona.
@@ -36,18 +47,14 @@ class NewsInput(BaseModel):
     def validate_title(cls, v: str) -> str:
         """Valida y limpia el título - maneja comillas problemáticas."""
         if isinstance(v, str):
-            sys.stderr.write(f"\nDEBUG validator title - Raw input: {v[:100]}\n")
-            sys.stderr.flush()
-            
+            raw = v
             # Remover comillas dobles al inicio
             v = re.sub(r'^["\s]+', '', v)
             # Remover comillas dobles al final
             v = re.sub(r'["\s]+$', '', v)
             # Remover comillas internas duplicadas
             v = v.replace('""', '"')
-            
-            sys.stderr.write(f"DEBUG validator title - After clean: {v[:100]}\n")
-            sys.stderr.flush()
+            log_payload(logger, "Título recibido: %s, después de limpiarlo: %s", raw, v)
         
         if not v or len(str(v).strip()) == 0:
             raise ValueError("El título no puede estar vacío")
@@ -58,14 +65,10 @@ class NewsInput(BaseModel):
     def validate_content(cls, v: str) -> str:
         """Valida y limpia el contenido."""
         if isinstance(v, str):
-            sys.stderr.write(f"\nDEBUG validator content - Raw input length: {len(v)}\n")
-            sys.stderr.flush()
-            
+            raw_length = len(v)
             # Normalizar espacios y saltos de línea
             v = re.sub(r'\s+', ' ', v)
-            
-            sys.stderr.write(f"DEBUG validator content - After clean length: {len(v)}\n")
-            sys.stderr.flush()
+            logger.debug("Contenido recibido: %d caracteres, %d después de limpiarlo", raw_length, len(v))
         
         if not v or len(str(v).strip()) == 0:
             raise ValueError("El contenido no puede estar vacío")
@@ -80,125 +83,211 @@ class NewsSummary(BaseModel):
     key_points: list[str]
 
 
-def summarize_news(news: NewsInput) -> NewsSummary:
+class NewsBatchItem(BaseModel):
+    """Resultado de una noticia dentro de un resumen en lote: el resumen o el error."""
+    index: int
+    summary: Optional[NewsSummary] = None
+    error: Optional[str] = None
+
+
+def _prepare_news(news: NewsInput) -> None:
+    """Limpia y valida el título y contenido de la noticia."""
+    # Convertir el modelo Pydantic a diccionario
+    raw_data = news.model_dump()
+    
+    # Actualizar el objeto con datos limpios
+    news.title = raw_data['title']
+    news.content = raw_data['content']
+    
+    if not news.title or len(news.title.strip()) == 0:
+        raise ValueError("El título no puede estar vacío")
+    if not news.content or len(news.content.strip()) == 0:
+        raise ValueError("El contenido no puede estar vacío")
+
+def build_news_messages(news: NewsInput) -> list[dict]:
+    """Arma los mensajes system/user para resumir la noticia."""
+    return [
+        {
+            "role": "system",
+            "content": NEWS_SUMMARIZER_SYSTEM_MESSAGE
+        },
+        {
+            "role": "user",
+            "content": f"Título: {news.title}\n\nContenido: {news.content}"
+        }
+    ]
+
+# Parámetros de muestreo usados para resumir noticias
+NEWS_SUMMARIZER_PARAMS = {"max_tokens": 1024, "temperature": 0.7}
+
+@stage("parse")
+def parse_news_summary(news: NewsInput, summary_text: str) -> NewsSummary:
+    """
+    Convierte la respuesta bruta del LLM en un NewsSummary.
+    
+    Args:
+        news (NewsInput): Noticia resumida
+        summary_text (str): Respuesta bruta del LLM
+        
+    Returns:
+        NewsSummary: Objeto con el resumen y puntos clave
+    """
+    log_payload(logger, "Respuesta bruta de Groq: %s", summary_text)
+    
+    # Parsear JSON de la respuesta
+    summary_dict = None
+    key_points = []
+    
+    if not summary_text or len(summary_text.strip()) == 0:
+        summary_text = "Resumen no disponible"
+    else: # Se extrae el JSON de la respuesta paara que pueda ser recibido fácilmente por el frontend
+        try:
+            # Buscar el bloque JSON en la respuesta
+            json_match = re.search(r'\{.*\}', summary_text, re.DOTALL)
+            if json_match:
+                json_str = json_match.group(0) # Obtenemos el string que tendría el json
+                
+                summary_dict = json.loads(json_str) # Lo parseamos
+                
+                summary_text = summary_dict.get("resumen", summary_text)
+                if not summary_text: # A veces el LLM pone la key en comillas simples, así que cubrimos ese caso
+                    summary_text = summary_dict.get("'resumen'", summary_text)
+                
+                key_points = summary_dict.get("puntos_clave") # Idem
+                if not key_points:
+                    key_points = summary_dict.get("'puntos_clave'")
+            else:
+                logger.warning("No se encontró JSON en la respuesta del LLM")
+        except json.JSONDecodeError as je:
+            logger.warning("Error al parsear el JSON del LLM: %s", je)
+    
+    return NewsSummary(
+        original_title=news.title,
+        summary=summary_text.strip(),
+        summary_length=len(summary_text.strip()),
+        key_points=key_points
+    )
+
+def _error_summary(news: NewsInput, e: Exception) -> NewsSummary:
+    """Registra el error y devuelve un NewsSummary que lo describe."""
+    logger.error("Error en summarize_news: %s: %s", type(e).__name__, e, exc_info=e)
+    
+    try:
+        return NewsSummary(
+            original_title=news.title,
+            summary=f"Error al procesar la noticia: {str(e)}",
+            summary_length=len(f"Error al procesar la noticia: {str(e)}"),
+            key_points=["Error en procesamiento"]
+        )
+    except Exception as e2:
+        logger.error("Error al crear el NewsSummary de error: %s", e2)
+        raise
+
+def summarize_news(news: NewsInput, use_cache: bool = True) -> NewsSummary:
     """
     Resume una noticia usando la estrategia configurada.
     
     Args:
         news (NewsInput): Objeto con título y contenido de la noticia
+        use_cache (bool): False para saltear la caché de completions en este request
         
     Returns:
         NewsSummary: Objeto con el resumen y puntos clave
+    """
+    try:
+        _prepare_news(news)
+        summary_text = cached_chat_completion(
+            groq_llm_client,
+            NEWS_SUMMARIZER_MODEL_NAME,
+            build_news_messages(news),
+            use_cache=use_cache,
+            **NEWS_SUMMARIZER_PARAMS
+        )
+        return parse_news_summary(news, summary_text)
+    except Exception as e:
+        return _error_summary(news, e)
+
+async def summarize_news_async(news: NewsInput, use_cache: bool = True) -> NewsSummary:
+    """
+    Versión asíncrona de `summarize_news`: no bloquea el event loop mientras espera a Groq.
+    
+    Args:
+        news (NewsInput): Objeto con título y contenido de la noticia
+        use_cache (bool): False para saltear la caché de completions en este request
         
-    Implementar:
-        - Lógica de resumen (ej: con un modelo de IA, algoritmo de extracción, etc.)
-        - Extracción de puntos clave
-        - Validación de entrada
+    Returns:
+        NewsSummary: Objeto con el resumen y puntos clave
     """
+    try:
+        return await _summarize_news_with(async_groq_llm_client, news, use_cache)
+    except Exception as e:
+        return _error_summary(news, e)
+
 
+async def _summarize_news_with(client: Any, news: NewsInput, use_cache: bool) -> NewsSummary:
+    _prepare_news(news)
+    summary_text = await acached_chat_completion(
+        client,
+        NEWS_SUMMARIZER_MODEL_NAME,
+        build_news_messages(news),
+        use_cache=use_cache,
+        **NEWS_SUMMARIZER_PARAMS
+    )
+    return parse_news_summary(news, summary_text)
+
+
+async def _summarize_batch_item(index: int, item: Union[NewsInput, dict], use_cache: bool) -> NewsBatchItem:
     try:
-        # Convertir el modelo Pydantic a diccionario
-        raw_data = news.model_dump()
-        
-        # Actualizar el objeto con datos limpios
-        news.title = raw_data['title']
-        news.content = raw_data['content']
-        
-        if not news.title or len(news.title.strip()) == 0:
-            raise ValueError("El título no puede estar vacío")
-        if not news.content or len(news.content.strip()) == 0:
-            raise ValueError("El contenido no puede estar vacío")
+        news = item if isinstance(item, NewsInput) else NewsInput(**item)
+        return NewsBatchItem(index=index, summary=await _summarize_news_with(rate_limited_groq_client, news, use_cache))
+    except ValidationError as e:
+        fields = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        return NewsBatchItem(index=index, error=f"Noticia inválida: {fields}")
+    except Exception as e:
+        return NewsBatchItem(index=index, error=f"{type(e).__name__}: {str(e)}")
 
-        message = groq_llm_client.chat.completions.create(
-            model=NEWS_SUMMARIZER_MODEL_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": NEWS_SUMMARIZER_SYSTEM_MESSAGE
-                },
-                {
-                    "role": "user",
-                    "content": f"Título: {news.title}\n\nContenido: {news.content}"
-                }
-            ],
-            max_tokens=1024,
-            temperature=0.7
-        )
 
-        choice = message.choices[0]
+async def summarize_news_batch_async(items: List[Union[NewsInput, dict]], use_cache: bool = True) -> List[NewsBatchItem]:
+    """
+    Resume muchas noticias en paralelo, limitado por la cuota de Groq (requests y tokens por minuto)
+    en lugar de por llamadas secuenciales. La concurrencia se adapta a los 429 recibidos.
+    
+    Args:
+        items (List[Union[NewsInput, dict]]): Noticias a resumir (las inválidas se reportan como error).
+        use_cache (bool): False para saltear la caché de completions en este request
         
-        summary_text = choice.message.content
+    Returns:
+        List[NewsBatchItem]: Un resultado por noticia, en el mismo orden, con el resumen o el error.
+    """
+    return list(await asyncio.gather(
+        *(_summarize_batch_item(index, item, use_cache) for index, item in enumerate(items))
+    ))
 
-        sys.stderr.write(f"\nDEBUG: Respuesta bruta de Groq:\n{summary_text}\n")
-        sys.stderr.flush()
-        
-        # Parsear JSON de la respuesta
-        summary_dict = None
-        key_points = []
-        
-        if not summary_text or len(summary_text.strip()) == 0:
-            summary_text = "Resumen no disponible"
-        else: # Se extrae el JSON de la respuesta paara que pueda ser recibido fácilmente por el frontend
-            try:
-                # Buscar el bloque JSON en la respuesta
-                json_match = re.search(r'\{.*\}', summary_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0) # Obtenemos el string que tendría el json
-                    
-                    summary_dict = json.loads(json_str) # Lo parseamos
-                    
-                    summary_text = summary_dict.get("resumen", summary_text)
-                    if not summary_text: # A veces el LLM pone la key en comillas simples, así que cubrimos ese caso
-                        summary_text = summary_dict.get("'resumen'", summary_text)
-                    
-                    key_points = summary_dict.get("puntos_clave") # Idem
-                    if not key_points:
-                        key_points = summary_dict.get("'puntos_clave'")
-                else:
-                    sys.stderr.write("DEBUG: No se encontró JSON en la respuesta\n")
-                    sys.stderr.flush()
-            except json.JSONDecodeError as je:
-                sys.stderr.write(f"DEBUG: Error al parsear JSON: {str(je)}\n")
-                sys.stderr.flush()
-        
-        sys.stderr.write(f"\nDEBUG: Creando respuesta de tipo NewsSummary...\n")
-        sys.stderr.write(f"  - original_title: {news.title}\n")
-        sys.stderr.write(f"  - summary: {summary_text[:100]}...\n")
-        sys.stderr.write(f"  - summary_length: {len(summary_text.strip())}\n")
-        sys.stderr.write(f"  - key_points: {key_points}\n")
-        sys.stderr.flush()
-        
-        result = NewsSummary(
-            original_title=news.title,
-            summary=summary_text.strip(),
-            summary_length=len(summary_text.strip()),
-            key_points=key_points
-        )
-        
-        return result
-        
-    except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en summarize_news ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback completo:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR finalizado ==========\n")
-        sys.stderr.flush()
+
+async def stream_summarize_news(news: NewsInput, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Versión en streaming de `summarize_news`.
+    
+    Args:
+        news (NewsInput): Objeto con título y contenido de la noticia
+        use_cache (bool): False para saltear la caché de completions en este request
         
-        try:
-            return NewsSummary(
-                original_title=news.title,
-                summary=f"Error al procesar la noticia: {str(e)}",
-                summary_length=len(f"Error al procesar la noticia: {str(e)}"),
-                key_points=["Error en procesamiento"]
-            )
-        except Exception as e2:
-            sys.stderr.write(f"DEBUG: ERROR al crear NewsSummary de error: {str(e2)}\n")
-            sys.stderr.flush()
-            raise
+    Yields:
+        Tuple[str, Any]: Eventos `(nombre, datos)`: ("token", str) con cada fragmento generado
+        y ("result", dict) con el NewsSummary final.
+    """
+    _prepare_news(news)
+    parts = []
+    async for delta in astream_chat_completion(
+        async_groq_llm_client,
+        NEWS_SUMMARIZER_MODEL_NAME,
+        build_news_messages(news),
+        use_cache=use_cache,
+        **NEWS_SUMMARIZER_PARAMS
+    ):
+        parts.append(delta)
+        yield "token", delta
+    yield "result", parse_news_summary(news, "".join(parts)).model_dump()
 
 
 def validate_news_input(title: str, content: str) -> bool:
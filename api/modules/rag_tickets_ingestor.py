@@ -3,19 +3,44 @@ Módulo para la funcionalidad de resumen de noticias.
 Este archivo contiene la estructura mock para que implementes la funcionalidad.
 """
 
-import sys
+import os
 import json
-from pydantic import BaseModel, field_validator, ConfigDict, Field
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+import asyncio
+from pydantic import BaseModel, field_validator, ConfigDict, Field, ValidationError
 from enum import Enum
-from typing import List
-from .third_party_clients import vector_store_instance as vector_store
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Any, AsyncIterator, BinaryIO, List, Optional, Tuple
+from .third_party_clients import vector_store_instance as vector_store, open_vector_store
+from .retrieval_cache import index_generation
+from .ticket_store import ticket_store, owner_department, creation_day
+from .lexical_index import lexical_index
+from .metrics import stage, record_ingestion
+from .logging_config import get_logger
+from .ticket_stream_parser import ParsedRecord, StreamParseError, iter_records, aiter_records
 
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=200,
-    chunk_overlap=20,
-    add_start_index=True
-)
+logger = get_logger(__name__)
+
+# Cantidad de fragmentos por lote: cada lote se embebe en una sola llamada y se sube en un solo upsert
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))
+# Cantidad máxima de lotes procesándose en paralelo
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+# Cantidad de tickets validados que se ingestan juntos al leer un archivo en streaming
+INGEST_WINDOW_SIZE = int(os.getenv("INGEST_WINDOW_SIZE", "500"))
+# Máximo de errores por registro que se detallan en la respuesta (el resto sólo se cuenta)
+MAX_REPORTED_ERRORS = 100
+
+@lru_cache(maxsize=None)
+def get_text_splitter() -> Any:
+    # langchain se importa recién al fragmentar el primer ticket largo, no al arrancar la API
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=200,
+        chunk_overlap=20,
+        add_start_index=True
+    )
 
 class TicketPriority(str, Enum):
     """Enum para las prioridades de los tickets."""
@@ -35,6 +60,104 @@ class TicketModel(BaseModel):
     impact: str = Field(..., description="Impacto del problema en la productividad")
     actions: str = Field(..., description="Acciones tomadas por el solicitante antes de reportar")
 
+
+class IngestionStats(BaseModel):
+    """Métricas de una ingestión masiva."""
+    tickets: int = 0
+    skipped_tickets: int = 0
+    failed_tickets: int = 0
+    chunks: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    elapsed_seconds: float = 0.0
+    tickets_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+
+
+class StreamIngestionResult(BaseModel):
+    """Resultado de una ingestión en streaming."""
+    received: int = 0
+    ingested: int = 0
+    failed: int = 0
+    windows: int = 0
+    errors: List[dict] = Field(default_factory=list)
+    fatal_error: Optional[str] = None
+    stats: IngestionStats = Field(default_factory=IngestionStats)
+
+
+def split_ticket(ticket: TicketModel) -> List[str]:
+    """
+    Divide la descripción de un ticket en fragmentos para el vectorstore.
+    
+    Args:
+        ticket (TicketModel): Ticket a dividir.
+        
+    Returns:
+        List[str]: Fragmentos de la descripción (vacío si es demasiado corta).
+    """
+    if len(ticket.description) < 5:
+        return []
+    if len(ticket.description) > 200:
+        # Si la descripción del ticket es muy larga, se divide en fragmentos
+        return get_text_splitter().split_text(ticket.description)
+    return [ticket.description]
+
+def build_ticket_chunks(ticket: TicketModel) -> Tuple[List[str], List[dict], List[str]]:
+    """
+    Arma los textos, metadatos e IDs de los fragmentos de un ticket.
+    Los metadatos referencian al ticket (id, número de fragmento y posición en la descripción)
+    y repiten los campos filtrables (prioridad, día de creación y departamento), para que el
+    vectorstore pueda aplicar los filtros de búsqueda; el ticket completo se guarda una única
+    vez en el ticket store.
+    
+    Args:
+        ticket (TicketModel): Ticket a fragmentar.
+        
+    Returns:
+        Tuple[List[str], List[dict], List[str]]: Textos, metadatos e IDs deterministas.
+    """
+    splits = split_ticket(ticket)
+    # Generar IDs deterministas basados en el ticketId
+    ids = [f"{ticket.ticketId}_{i}" for i in range(len(splits))]
+    metadatas = []
+    filterable = {
+        "priority": ticket.priority.value,
+        "creationDay": creation_day(ticket.creationDate),
+        "department": owner_department(ticket.owner),
+    }
+    offset = 0
+    for i, split in enumerate(splits):
+        # Los fragmentos se solapan, así que se busca desde el inicio del fragmento anterior
+        found = ticket.description.find(split, offset)
+        offset = found if found >= 0 else offset
+        metadatas.append({"ticketId": ticket.ticketId, "chunk": i, "offset": offset, **filterable})
+    return splits, metadatas, ids
+
+def store_tickets(tickets_with_chunks: List[Tuple[TicketModel, int]]) -> List[str]:
+    """
+    Guarda los tickets en el ticket store y en el índice léxico, y devuelve los IDs de fragmentos
+    que quedaron obsoletos (tickets re-ingestados cuya descripción ahora genera menos fragmentos).
+    
+    Args:
+        tickets_with_chunks (List[Tuple[TicketModel, int]]): Tickets y su cantidad de fragmentos.
+        
+    Returns:
+        List[str]: IDs de fragmentos a borrar del vectorstore.
+    """
+    documents = [ticket.model_dump(mode="json") for ticket, _ in tickets_with_chunks]
+    with stage("ticket_store"):
+        previous = ticket_store.upsert_many(
+            (document, chunk_count) for document, (_, chunk_count) in zip(documents, tickets_with_chunks)
+        )
+    with stage("lexical_index"):
+        # Se indexa desde el store, junto con lo que hayan ingestado otros workers
+        lexical_index.sync()
+    return [
+        f"{ticket.ticketId}_{i}"
+        for ticket, chunk_count in tickets_with_chunks
+        for i in range(chunk_count, previous.get(ticket.ticketId, 0))
+    ]
+
 def load_support_tickets(file_path: str) -> List[TicketModel]:
     """
     Carga los tickets de soporte desde un archivo JSON.
@@ -50,59 +173,289 @@ def load_support_tickets(file_path: str) -> List[TicketModel]:
             tickets_data = json.load(file)
             return [TicketModel(**ticket) for ticket in tickets_data]
     except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en load_support_tickets ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
+        logger.error("Error en load_support_tickets: %s: %s", type(e).__name__, e, exc_info=e)
         return []
 
-def ingest_tickets_to_vectorstore(tickets: List[TicketModel]) -> None:
+def _upsert_batch(texts: List[str], metadatas: List[dict], ids: List[str]) -> int:
+    """Embebe y sube un lote de fragmentos en una sola llamada al vectorstore."""
+    # add_texts embebe todo el lote en una llamada (embedding_chunk_size de Pinecone >= tamaño del lote)
+    with stage("vector_upsert_batch"):
+        vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+    return len(texts)
+
+def ingest_tickets_to_vectorstore(
+    tickets: List[TicketModel],
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+) -> IngestionStats:
     """
     Ingresa los tickets de soporte al vectorstore para su posterior recuperación.
     
+    Los fragmentos de muchos tickets se agrupan en lotes de `batch_size`; cada lote se embebe
+    en una sola llamada y se sube con a lo sumo `max_workers` lotes en paralelo.
+    
     Args:
         tickets (List[TicketModel]): Lista de objetos TicketModel a ingresar.
+        batch_size (int): Cantidad de fragmentos por lote.
+        max_workers (int): Cantidad máxima de lotes en paralelo.
+        
+    Returns:
+        IngestionStats: Métricas de throughput de la ingestión.
+    """
+    return _ingest_tickets(tickets, batch_size, max_workers)[0]
+
+def _ingest_tickets(
+    tickets: List[TicketModel],
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+) -> Tuple[IngestionStats, List[Tuple[str, str]]]:
+    """
+    Implementación de `ingest_tickets_to_vectorstore` que además devuelve (ticketId, error) de cada
+    ticket que no quedó ingestado. `stats.tickets` cuenta sólo los tickets cuyo lote se subió.
     """
+    stats = IngestionStats()
+    failures: List[Tuple[str, str]] = []
+    # Tickets ya contados como ingestados o fallidos
+    settled = set()
+    stored = []
+    start_time = time.perf_counter()
     try:
+        batches = []
+        texts, metadatas, ids, batch_tickets = [], [], [], []
         for ticket in tickets:
-            splits = [ticket.description]
-            if len(ticket.description) < 5:
-                sys.stderr.write(f"\nDEBUG: Ticket {ticket.ticketId} tiene descripción muy corta, se omite.\n")
-                sys.stderr.flush()
+            splits, split_metadatas, split_ids = build_ticket_chunks(ticket)
+            if not splits:
+                logger.debug("El ticket %s tiene una descripción muy corta, se omite", ticket.ticketId)
+                stats.skipped_tickets += 1
                 continue
-            if len(ticket.description) > 200:
-                # Si la descripción del ticket es muy larga, se divide en fragmentos
-                splits = text_splitter.split_text(ticket.description)
-            
-            # Generar IDs deterministas basados en el ticketId
-            ids = [f"{ticket.ticketId}_{i}" for i in range(len(splits))]
-            
-            vector_store.add_texts(
-                texts=splits,
-                metadatas=[ticket.model_dump() for _ in range(len(splits))],
-                ids=ids
-            )
+            stored.append((ticket, len(splits)))
+            texts.extend(splits)
+            metadatas.extend(split_metadatas)
+            ids.extend(split_ids)
+            # Los fragmentos de un ticket nunca se reparten entre lotes: el lote decide si el ticket quedó ingestado
+            batch_tickets.append(ticket.ticketId)
+            if len(texts) >= batch_size:
+                batches.append((texts, metadatas, ids, batch_tickets))
+                texts, metadatas, ids, batch_tickets = [], [], [], []
+        if texts:
+            batches.append((texts, metadatas, ids, batch_tickets))
+        stats.batches = len(batches)
+
+        uploaded = set()
+        with stage("vector_upsert"), ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {executor.submit(_upsert_batch, *batch[:3]): batch[3] for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    stats.chunks += future.result()
+                    uploaded.update(futures[future])
+                except Exception as e:
+                    stats.failed_batches += 1
+                    error = f"Error al subir el lote: {type(e).__name__}: {e}"
+                    failures.extend((ticket_id, error) for ticket_id in futures[future])
+                    settled.update(futures[future])
+                    logger.warning("Error al subir un lote: %s: %s", type(e).__name__, e)
+        # Sólo los tickets con vectores pasan al store y al índice léxico, así la búsqueda léxica no devuelve
+        # tickets que la vectorial no encuentra. Un fragmento hallado antes de que su ticket se guarde se omite al hidratar
+        stored = [(ticket, chunk_count) for ticket, chunk_count in stored if ticket.ticketId in uploaded]
+        if stored:
+            try:
+                stale_ids = store_tickets(stored)
+            finally:
+                # El store y el índice léxico cambiaron: invalida los resultados cacheados de búsquedas anteriores
+                index_generation.bump()
+            stats.tickets = len(stored)
+            settled.update(uploaded)
+            if stale_ids:
+                with stage("vector_delete"):
+                    vector_store.delete(ids=stale_ids)
     except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en ingest_tickets_to_vectorstore ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
+        logger.error("Error en ingest_tickets_to_vectorstore: %s: %s", type(e).__name__, e, exc_info=e)
+        error = f"Error al ingestar: {type(e).__name__}: {e}"
+        failures.extend((ticket.ticketId, error) for ticket, _ in stored if ticket.ticketId not in settled)
+    stats.failed_tickets = len(failures)
+    record_ingestion(
+        "bulk", stats.tickets, stats.chunks,
+        skipped=stats.skipped_tickets, failed=stats.failed_tickets, failed_batches=stats.failed_batches,
+    )
 
-def run_ingestion_from(file_path: str) -> None:
+    stats.elapsed_seconds = time.perf_counter() - start_time
+    if stats.elapsed_seconds > 0:
+        stats.tickets_per_second = stats.tickets / stats.elapsed_seconds
+        stats.chunks_per_second = stats.chunks / stats.elapsed_seconds
+    logger.info(
+        "Ingestión: %d tickets, %d fragmentos en %d lotes (%d fallidos) en %.2fs - %.1f tickets/s, %.1f fragmentos/s",
+        stats.tickets, stats.chunks, stats.batches, stats.failed_batches,
+        stats.elapsed_seconds, stats.tickets_per_second, stats.chunks_per_second,
+    )
+    return stats, failures
+
+class TicketStreamIngestor:
+    """
+    Valida registros a medida que llegan y los agrupa en ventanas de tamaño fijo.
+    
+    Cada ventana completa se ingesta apenas se llena, por lo que los primeros tickets
+    quedan disponibles para búsqueda mientras el resto del archivo se sigue leyendo.
+    """
+
+    def __init__(self, window_size: int = INGEST_WINDOW_SIZE, result: Optional[StreamIngestionResult] = None):
+        self.window_size = max(1, window_size)
+        # Permite continuar los conteos de una ingestión previa (ej. un job reanudado)
+        self.result = result if result is not None else StreamIngestionResult()
+        self._window: List[TicketModel] = []
+        self._start_time = time.perf_counter()
+
+    def _record_error(self, index: int, error: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append({"index": index, "error": error})
+
+    def accept(self, record: ParsedRecord) -> Optional[List[TicketModel]]:
+        """
+        Valida un registro y devuelve la ventana a ingestar si quedó completa.
+        
+        Args:
+            record (ParsedRecord): Registro parseado del archivo.
+            
+        Returns:
+            Optional[List[TicketModel]]: Ventana completa o None.
+        """
+        self.result.received += 1
+        if record.error is not None:
+            self._record_error(record.index, record.error)
+            return None
+        try:
+            if not isinstance(record.data, dict):
+                raise ValueError("El registro no es un objeto JSON")
+            self._window.append(TicketModel(**record.data))
+        except ValidationError as e:
+            fields = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            self._record_error(record.index, f"Ticket inválido: {fields}")
+            return None
+        except (ValueError, TypeError) as e:
+            self._record_error(record.index, str(e))
+            return None
+        if len(self._window) >= self.window_size:
+            return self.drain()
+        return None
+
+    def drain(self) -> Optional[List[TicketModel]]:
+        """Devuelve (y vacía) la ventana en curso, si tiene tickets."""
+        if not self._window:
+            return None
+        window, self._window = self._window, []
+        return window
+
+    def commit(self, window: List[TicketModel]) -> IngestionStats:
+        """
+        Ingesta una ventana y acumula sus métricas. Los tickets cuyo lote no pudo subirse
+        se cuentan en `failed` y se detallan en `errors` con su ticketId.
+        """
+        stats, failures = _ingest_tickets(window)
+        self.result.windows += 1
+        self.result.ingested += stats.tickets
+        for ticket_id, error in failures:
+            self.result.failed += 1
+            if len(self.result.errors) < MAX_REPORTED_ERRORS:
+                self.result.errors.append({"ticketId": ticket_id, "error": error})
+        total = self.result.stats
+        total.tickets += stats.tickets
+        total.skipped_tickets += stats.skipped_tickets
+        total.failed_tickets += stats.failed_tickets
+        total.chunks += stats.chunks
+        total.batches += stats.batches
+        total.failed_batches += stats.failed_batches
+        return stats
+
+    def fail(self, error: Exception) -> None:
+        """Registra un error estructural que cortó la lectura del archivo."""
+        self.result.fatal_error = str(error)
+        logger.warning("Lectura del archivo interrumpida: %s", error)
+
+    def finish(self) -> StreamIngestionResult:
+        total = self.result.stats
+        total.elapsed_seconds = time.perf_counter() - self._start_time
+        if total.elapsed_seconds > 0:
+            total.tickets_per_second = total.tickets / total.elapsed_seconds
+            total.chunks_per_second = total.chunks / total.elapsed_seconds
+        return self.result
+
+
+def ingest_ticket_stream(
+    file: BinaryIO,
+    format: str = "auto",
+    window_size: int = INGEST_WINDOW_SIZE,
+) -> StreamIngestionResult:
+    """
+    Ingresa tickets leyendo un archivo JSON/NDJSON en streaming, con memoria acotada.
+    
+    Args:
+        file (BinaryIO): Archivo abierto en modo binario.
+        format (str): "auto", "array" o "ndjson".
+        window_size (int): Cantidad de tickets por ventana de ingestión.
+        
+    Returns:
+        StreamIngestionResult: Conteos, errores por registro y métricas.
+    """
+    ingestor = TicketStreamIngestor(window_size)
+    try:
+        for record in iter_records(file, format=format):
+            window = ingestor.accept(record)
+            if window:
+                ingestor.commit(window)
+    except StreamParseError as e:
+        ingestor.fail(e)
+    window = ingestor.drain()
+    if window:
+        ingestor.commit(window)
+    return ingestor.finish()
+
+async def ingest_ticket_stream_async(
+    chunks: AsyncIterator[bytes],
+    format: str = "auto",
+    window_size: int = INGEST_WINDOW_SIZE,
+) -> StreamIngestionResult:
+    """
+    Versión asíncrona de `ingest_ticket_stream` sobre un iterador de bloques de bytes.
+    Las ventanas se ingestan en un hilo para no bloquear el event loop.
+    
+    Args:
+        chunks (AsyncIterator[bytes]): Bloques de bytes (ej. `request.stream()`).
+        format (str): "auto", "array" o "ndjson".
+        window_size (int): Cantidad de tickets por ventana de ingestión.
+        
+    Returns:
+        StreamIngestionResult: Conteos, errores por registro y métricas.
+    """
+    ingestor = TicketStreamIngestor(window_size)
+    try:
+        async for record in aiter_records(chunks, format=format):
+            window = ingestor.accept(record)
+            if window:
+                await asyncio.to_thread(ingestor.commit, window)
+    except StreamParseError as e:
+        ingestor.fail(e)
+    window = ingestor.drain()
+    if window:
+        await asyncio.to_thread(ingestor.commit, window)
+    return ingestor.finish()
+
+def run_ingestion_from(file_path: str) -> IngestionStats:
     """
     Ejecuta el proceso de ingestión de tickets desde un archivo JSON al vectorstore.
+    El archivo se lee en streaming, por ventanas de INGEST_WINDOW_SIZE tickets.
     
     Args:
         file_path (str): Ruta al archivo JSON que contiene los tickets.
+        
+    Returns:
+        IngestionStats: Métricas de throughput de la ingestión.
     """
     try: 
-        tickets = load_support_tickets(file_path)
-        ingest_tickets_to_vectorstore(tickets)
+        with open(file_path, "rb") as file:
+            return ingest_ticket_stream(file).stats
     except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en run_ingestion_from ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
+        logger.error("Error en run_ingestion_from: %s: %s", type(e).__name__, e, exc_info=e)
+        return IngestionStats()
 
 def ingest_individual_ticket(ticket: TicketModel) -> str:
     """
@@ -115,25 +468,66 @@ def ingest_individual_ticket(ticket: TicketModel) -> str:
         str: Mensaje de éxito o error.
     """
     try:
-        splits = [ticket.description]
-        if len(ticket.description) < 5:
+        splits, metadatas, ids = build_ticket_chunks(ticket)
+        if not splits:
+            record_ingestion("individual", 0, 0, skipped=1)
             return f"ERROR: La descripción del ticket {ticket.ticketId} es demasiado corta."
-        if len(ticket.description) > 200:
-            # Si la descripción del ticket es muy larga, se divide en fragmentos
-            splits = text_splitter.split_text(ticket.description)
-            
-        # Generar IDs deterministas basados en el ticketId
-        ids = [f"{ticket.ticketId}_{i}" for i in range(len(splits))]
         
-        vector_store.add_texts(
-            texts=splits,
-            metadatas=[ticket.model_dump() for _ in range(len(splits))],
-            ids=ids
-        )
+        with stage("vector_upsert"):
+            vector_store.add_texts(
+                texts=splits,
+                metadatas=metadatas,
+                ids=ids
+            )
+        # El ticket se guarda (y se indexa en BM25) recién cuando tiene vectores
+        try:
+            stale_ids = store_tickets([(ticket, len(splits))])
+        finally:
+            index_generation.bump()
+        if stale_ids:
+            with stage("vector_delete"):
+                vector_store.delete(ids=stale_ids)
+        record_ingestion("individual", 1, len(splits))
+        return f"Ticket {ticket.ticketId} ingresado exitosamente."
+    except Exception as e:
+        record_ingestion("individual", 0, 0, failed=1)
+        logger.error("Error en ingest_individual_ticket: %s: %s", type(e).__name__, e, exc_info=e)
+        return f"ERROR al ingresar el ticket {ticket.ticketId}: {str(e)}"
+
+async def ingest_individual_ticket_async(ticket: TicketModel) -> str:
+    """
+    Versión asíncrona de `ingest_individual_ticket` (embedding y upsert sin bloquear el event loop).
+    
+    Args:
+        ticket (TicketModel): Objeto TicketModel a ingresar.
+        
+    Returns:
+        str: Mensaje de éxito o error.
+    """
+    try:
+        splits, metadatas, ids = build_ticket_chunks(ticket)
+        if not splits:
+            record_ingestion("individual", 0, 0, skipped=1)
+            return f"ERROR: La descripción del ticket {ticket.ticketId} es demasiado corta."
+        
+        # El primer uso construye el vectorstore (memmap, describe de Pinecone): se hace fuera del event loop
+        store = await open_vector_store()
+        with stage("vector_upsert"):
+            await store.aadd_texts(
+                texts=splits,
+                metadatas=metadatas,
+                ids=ids
+            )
+        try:
+            stale_ids = await asyncio.to_thread(store_tickets, [(ticket, len(splits))])
+        finally:
+            index_generation.bump()
+        if stale_ids:
+            with stage("vector_delete"):
+                await store.adelete(ids=stale_ids)
+        record_ingestion("individual", 1, len(splits))
         return f"Ticket {ticket.ticketId} ingresado exitosamente."
     except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en ingest_individual_ticket ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
-        return f"ERROR al ingresar el ticket {ticket.ticketId}: {str(e)}"
\ No newline at end of file
+        record_ingestion("individual", 0, 0, failed=1)
+        logger.error("Error en ingest_individual_ticket: %s: %s", type(e).__name__, e, exc_info=e)
+        return f"ERROR al ingresar el ticket {ticket.ticketId}: {str(e)}"
@@ -5,14 +5,48 @@ Este archivo contiene la estructura mock para que implementes la funcionalidad.
 
 from pydantic import BaseModel, field_validator, ConfigDict, Field
 from enum import Enum
-from typing import List
-from .third_party_clients import groq_llm_client, vector_store_instance as vector_store
-import sys
+from datetime import date
+from typing import Any, AsyncIterator, Collection, List, Optional, Tuple
+from .third_party_clients import groq_llm_client, async_groq_llm_client, vector_store_instance as vector_store, open_vector_store
+from .retrieval_cache import retrieval_cache, index_generation
+from .ticket_store import ticket_store, creation_day
+from .lexical_index import lexical_index
+from .completion_cache import cached_chat_completion, acached_chat_completion, astream_chat_completion
+from .metrics import stage
+from .logging_config import get_logger
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 import json
+import numpy as np
+
+logger = get_logger(__name__)
 
 CHAT_MODEL_NAME = os.getenv("CHAT_MODEL_NAME")
 
+# Se piden k * RETRIEVAL_OVERFETCH_FACTOR fragmentos para poder devolver k tickets distintos
+RETRIEVAL_OVERFETCH_FACTOR = int(os.getenv("RETRIEVAL_OVERFETCH_FACTOR", "4"))
+# Veces que se duplica el over-fetch si aún no hay k tickets distintos
+RETRIEVAL_MAX_FETCH_ROUNDS = int(os.getenv("RETRIEVAL_MAX_FETCH_ROUNDS", "3"))
+# Cómo se combinan los scores de los fragmentos de un mismo ticket: "max" o "sum"
+RETRIEVAL_SCORE_FUSION = os.getenv("RETRIEVAL_SCORE_FUSION", "max")
+# Lambda de MMR: 1.0 = sólo relevancia (sin diversidad); valores menores penalizan tickets redundantes
+RETRIEVAL_DIVERSITY_LAMBDA = float(os.getenv("RETRIEVAL_DIVERSITY_LAMBDA", "1.0"))
+# Modo de búsqueda: "vector", "hybrid" (vectorial + BM25 con RRF) o "lexical"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+# Constante k de Reciprocal Rank Fusion
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+# En modo híbrido, segundos máximos de espera de la búsqueda vectorial antes de responder sólo con BM25 (0 = sin límite)
+RETRIEVAL_VECTOR_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_VECTOR_TIMEOUT_SECONDS", "0"))
+# Máximo de tickets filtrados que se envían como pre-filtro por ticketId al vectorstore (límite de $in en Pinecone);
+# por encima de este número los filtros se aplican sobre los metadatos de los fragmentos
+RETRIEVAL_FILTER_MAX_IDS = int(os.getenv("RETRIEVAL_FILTER_MAX_IDS", "10000"))
+# Máximo de tickets por request de búsqueda por lotes
+RETRIEVAL_BATCH_MAX_TICKETS = int(os.getenv("RETRIEVAL_BATCH_MAX_TICKETS", "5000"))
+# Consultas concurrentes al vectorstore en búsquedas por lotes (si no resuelve el lote en un solo producto)
+RETRIEVAL_BATCH_MAX_WORKERS = int(os.getenv("RETRIEVAL_BATCH_MAX_WORKERS", "8"))
+
 TICKET_SUMMARIZER_SYSTEM_MESSAGE = """
     Eres un asistente que ayuda a obtener información sobre tickets de soporte técnico informático.
     Para eso cuentas con algunos ejemplos de tickets similares que permitan resolver el ticket de entrada.
@@ -46,99 +80,618 @@ class TicketModel(BaseModel):
     impact: str = Field(..., description="Impacto del problema en la productividad")
     actions: str = Field(..., description="Acciones tomadas por el solicitante antes de reportar")
 
-def retrieve_relevant_tickets(inputTicket: TicketModel) -> List[TicketModel]:
+
+class ScoredTicketModel(TicketModel):
+    """Ticket recuperado junto con su score de similitud (fusión de los scores de sus fragmentos)."""
+    score: float = Field(..., description="Score de similitud con el ticket de entrada")
+
+
+class TicketFilters(BaseModel):
+    """Filtros opcionales de metadatos para la búsqueda de tickets similares."""
+    priority: Optional[List[TicketPriority]] = Field(None, description="Prioridades aceptadas")
+    date_from: Optional[date] = Field(None, description="Fecha de creación mínima (inclusive)")
+    date_to: Optional[date] = Field(None, description="Fecha de creación máxima (inclusive)")
+    department: Optional[str] = Field(None, description="Departamento del owner (ej. IT)")
+
+    def is_empty(self) -> bool:
+        return not (self.priority or self.date_from or self.date_to or self.department)
+
+    def cache_key(self) -> tuple:
+        return (
+            tuple(sorted(priority.value for priority in self.priority or [])),
+            self.date_from, self.date_to, (self.department or "").strip().lower(),
+        )
+
+
+def resolve_filter_ids(filters: Optional[TicketFilters]) -> Optional[set]:
     """
-    Obtiene una lista de tickets similares que permitan resolver el ticket de entrada.
+    Resuelve los filtros a los ids de tickets que los cumplen, con los índices secundarios del ticket store.
     
     Args:
-        inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        filters (Optional[TicketFilters]): Filtros de la búsqueda.
         
     Returns:
-        List[TicketModel]: Lista de los tickets similares al ingresado.
+        Optional[set]: IDs permitidos, o None si no hay filtros.
+    """
+    if filters is None or filters.is_empty():
+        return None
+    return set(ticket_store.filter_ids(
+        priorities=[priority.value for priority in filters.priority or []],
+        date_from=filters.date_from.isoformat() if filters.date_from else None,
+        date_to=filters.date_to.isoformat() if filters.date_to else None,
+        department=filters.department,
+    ))
+
+
+def fuse_chunk_scores(scored_documents, fusion: str = RETRIEVAL_SCORE_FUSION) -> List[Tuple[dict, float]]:
+    """
+    Agrupa los fragmentos por ticketId y combina sus scores.
+    
+    Args:
+        scored_documents: Lista de (Document, score) devuelta por el vectorstore.
+        fusion (str): "max" (mejor fragmento) o "sum" (premia tickets con varios fragmentos relevantes).
         
-    Implementar:
-        - Lógica de resumen (ej: con un modelo de IA, algoritmo de extracción, etc.)
-        - Extracción de puntos clave
-        - Validación de entrada
+    Returns:
+        List[Tuple[dict, float]]: (metadatos del mejor fragmento del ticket, score) ordenados de mayor a menor score.
     """
-    try:
-        raw_results = vector_store.similarity_search(inputTicket.description, k=5)
-        if raw_results is None or len(raw_results) == 0:
-            return []
+    by_ticket = {}
+    for document, score in scored_documents or []:
+        ticket_id = document.metadata.get("ticketId")
+        if ticket_id is None:
+            continue
+        if ticket_id not in by_ticket:
+            by_ticket[ticket_id] = [document.metadata, score]
+        elif fusion == "sum":
+            by_ticket[ticket_id][1] += score
+        else:
+            by_ticket[ticket_id][1] = max(by_ticket[ticket_id][1], score)
+    return sorted(((metadata, score) for metadata, score in by_ticket.values()), key=lambda item: -item[1])
+
+
+def hydrate_tickets(
+    candidates: List[Tuple[dict, float]], allowed_ids: Optional[Collection[str]] = None
+) -> List[Tuple[dict, float]]:
+    """
+    Reemplaza los metadatos de fragmento por el ticket completo, con una única consulta al ticket store.
+    Los vectores ingestados antes del ticket store ya traen el ticket completo en sus metadatos.
+    
+    Args:
+        candidates (List[Tuple[dict, float]]): (metadatos del fragmento, score) por ticket.
+        allowed_ids (Optional[Collection[str]]): Si se indica, se descartan los tickets que no estén aquí.
         
-        results = []
-        for result in raw_results:
-            results.append(TicketModel(**result.metadata))
-        return results
+    Returns:
+        List[Tuple[dict, float]]: (ticket, score), en el mismo orden; se omiten los tickets que ya no existen.
+    """
+    if allowed_ids is not None:
+        candidates = [(metadata, score) for metadata, score in candidates if metadata["ticketId"] in allowed_ids]
+    missing = [metadata["ticketId"] for metadata, _ in candidates if "description" not in metadata]
+    with stage("hydrate"):
+        stored = ticket_store.get_many(missing) if missing else {}
+    hydrated = []
+    for metadata, score in candidates:
+        ticket = metadata if "description" in metadata else stored.get(metadata["ticketId"])
+        if ticket is not None:
+            hydrated.append((ticket, score))
+    return hydrated
+
+
+def mmr_select(candidates: List[Tuple[dict, float]], vectors: List[List[float]], k: int, lambda_mult: float) -> List[Tuple[dict, float]]:
+    """
+    Selecciona k candidatos con Maximal Marginal Relevance.
+    
+    Args:
+        candidates (List[Tuple[dict, float]]): (metadatos, score) ordenados por relevancia.
+        vectors (List[List[float]]): Embedding de la descripción de cada candidato.
+        k (int): Cantidad a seleccionar.
+        lambda_mult (float): Peso de la relevancia frente a la diversidad (0 a 1).
+        
+    Returns:
+        List[Tuple[dict, float]]: Candidatos seleccionados, en orden de selección.
+    """
+    if len(candidates) <= 1:
+        return candidates[:k]
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+    similarity = matrix @ matrix.T
+    relevance = np.asarray([score for _, score in candidates], dtype=np.float32)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+
+    selected = [0]
+    max_similarity = similarity[0].copy()
+    while len(selected) < min(k, len(candidates)):
+        mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        mmr_scores[selected] = -np.inf
+        best = int(np.argmax(mmr_scores))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return [candidates[i] for i in selected]
+
+
+def _needs_more(scored_documents, fused, fetch_k: int, k: int) -> bool:
+    # Si el vectorstore devolvió menos de lo pedido, no hay más fragmentos que traer
+    return len(fused) < k and len(scored_documents or []) >= fetch_k
+
+
+def _to_scored_tickets(candidates: List[Tuple[dict, float]]) -> List[ScoredTicketModel]:
+    return [
+        ScoredTicketModel(**{field: ticket[field] for field in TicketModel.model_fields}, score=score)
+        for ticket, score in candidates
+    ]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple[dict, float]]], rrf_k: int = RETRIEVAL_RRF_K) -> List[Tuple[dict, float]]:
+    """
+    Combina varios rankings de tickets con Reciprocal Rank Fusion: score = suma de 1 / (rrf_k + posición).
+    
+    Args:
+        rankings (List[List[Tuple[dict, float]]]): Rankings de (ticket, score), cada uno ordenado de mayor a menor.
+        rrf_k (int): Constante de suavizado de RRF.
+        
+    Returns:
+        List[Tuple[dict, float]]: (ticket, score RRF) ordenados de mayor a menor score.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (ticket, _) in enumerate(ranking, start=1):
+            entry = fused.setdefault(ticket["ticketId"], [ticket, 0.0])
+            entry[1] += 1.0 / (rrf_k + rank)
+    return sorted(((ticket, score) for ticket, score in fused.values()), key=lambda item: -item[1])
+
+
+def _check_mode(mode: str) -> str:
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Modo de búsqueda inválido: {mode}. Opciones: {', '.join(RETRIEVAL_MODES)}")
+    return mode
+
+
+def _lexical_candidates(description: str, k: int, allowed_ids: Optional[set] = None) -> List[Tuple[dict, float]]:
+    """Tickets con mayor score BM25, hidratados desde el ticket store."""
+    with stage("lexical_search"):
+        ranked = lexical_index.search(description, k, allowed_ids)
+    return hydrate_tickets([({"ticketId": ticket_id}, score) for ticket_id, score in ranked])
+
+
+def _metadata_filter(filters: TicketFilters) -> dict:
+    """Los filtros expresados sobre los metadatos de los fragmentos (ver `build_ticket_chunks`)."""
+    conditions = {}
+    if filters.priority:
+        conditions["priority"] = {"$in": [priority.value for priority in filters.priority]}
+    day_range = {}
+    if filters.date_from:
+        day_range["$gte"] = creation_day(filters.date_from.isoformat())
+    if filters.date_to:
+        day_range["$lte"] = creation_day(filters.date_to.isoformat())
+    if day_range:
+        conditions["creationDay"] = day_range
+    if filters.department:
+        conditions["department"] = {"$eq": filters.department.strip().lower()}
+    return conditions
+
+
+def _vector_filter(store: Any, filters: Optional[TicketFilters], allowed_ids: Optional[set]) -> dict:
+    """
+    Pre-filtro para el vectorstore: los ticketId que cumplen los filtros o, si son más de los que
+    admite el vectorstore (RETRIEVAL_FILTER_MAX_IDS en Pinecone), los mismos filtros sobre los
+    metadatos de los fragmentos.
+    """
+    if allowed_ids is None:
+        return {}
+    max_ids = getattr(store, "max_filter_ids", RETRIEVAL_FILTER_MAX_IDS)
+    if max_ids is None or len(allowed_ids) <= max_ids:
+        return {"filter": {"ticketId": {"$in": sorted(allowed_ids)}}}
+    return {"filter": _metadata_filter(filters)}
+
+
+def _query_vector_store(description: str, fetch_k: int, search_kwargs: dict, embedding: Optional[List[float]]) -> list:
+    """
+    Consulta el vectorstore con el embedding ya calculado, para medir por separado el embedding y la
+    consulta. Los vectorstores que sólo buscan por texto reciben la descripción (ambas etapas juntas).
+    """
+    with stage("vector_query"):
+        if embedding is None:
+            return vector_store.similarity_search_with_score(description, k=fetch_k, **search_kwargs)
+        return vector_store.similarity_search_by_vector_with_score(embedding, k=fetch_k, **search_kwargs)
+
+
+async def _aquery_vector_store(store: Any, description: str, fetch_k: int, search_kwargs: dict, embedding: Optional[List[float]]) -> list:
+    with stage("vector_query"):
+        if embedding is None:
+            return await store.asimilarity_search_with_score(description, k=fetch_k, **search_kwargs)
+        if hasattr(store, "asimilarity_search_by_vector_with_score"):
+            return await store.asimilarity_search_by_vector_with_score(embedding, k=fetch_k, **search_kwargs)
+        return await asyncio.to_thread(
+            store.similarity_search_by_vector_with_score, embedding, k=fetch_k, **search_kwargs
+        )
+
+
+def _vector_candidates(
+    description: str, k: int, allowed_ids: Optional[set] = None, filters: Optional[TicketFilters] = None
+) -> List[Tuple[dict, float]]:
+    """Tickets distintos más similares por embeddings (over-fetch de fragmentos, fusión e hidratación)."""
+    if allowed_ids is not None and not allowed_ids:
+        return []
+    search_kwargs = _vector_filter(vector_store, filters, allowed_ids)
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    embedding = None
+    # El embedding se calcula una vez y se reutiliza en todas las rondas de over-fetch
+    if hasattr(vector_store, "similarity_search_by_vector_with_score"):
+        with stage("embedding"):
+            embedding = vector_store.embeddings.embed_query(description)
+    for _ in range(RETRIEVAL_MAX_FETCH_ROUNDS):
+        scored_documents = _query_vector_store(description, fetch_k, search_kwargs, embedding)
+        fused = hydrate_tickets(fuse_chunk_scores(scored_documents), allowed_ids)
+        if not _needs_more(scored_documents, fused, fetch_k, k):
+            break
+        fetch_k *= 2
+    return fused
+
+
+async def _vector_candidates_async(
+    description: str, k: int, allowed_ids: Optional[set] = None, filters: Optional[TicketFilters] = None
+) -> List[Tuple[dict, float]]:
+    if allowed_ids is not None and not allowed_ids:
+        return []
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    # El vectorstore se construye fuera del event loop y comparte la sesión HTTP abierta en el arranque
+    store = await open_vector_store()
+    search_kwargs = _vector_filter(store, filters, allowed_ids)
+    embedding = None
+    if hasattr(store, "similarity_search_by_vector_with_score"):
+        with stage("embedding"):
+            embedding = await store.embeddings.aembed_query(description)
+    for _ in range(RETRIEVAL_MAX_FETCH_ROUNDS):
+        scored_documents = await _aquery_vector_store(store, description, fetch_k, search_kwargs, embedding)
+        # La hidratación lee el ticket store (SQLite): se hace en el threadpool
+        fused = await asyncio.to_thread(hydrate_tickets, fuse_chunk_scores(scored_documents), allowed_ids)
+        if not _needs_more(scored_documents, fused, fetch_k, k):
+            break
+        fetch_k *= 2
+    return fused
+
+
+def _search_by_vectors(embeddings: List[List[float]], k: int, search_kwargs: dict) -> list:
+    """
+    Consulta el vectorstore con varios embeddings: en un solo producto matricial si el vectorstore
+    lo soporta (índice local) o con consultas concurrentes (ej. Pinecone).
+    """
+    if hasattr(vector_store, "similarity_search_by_vectors_with_score"):
+        return vector_store.similarity_search_by_vectors_with_score(embeddings, k=k, **search_kwargs)
+    with ThreadPoolExecutor(max_workers=max(1, RETRIEVAL_BATCH_MAX_WORKERS)) as executor:
+        return list(executor.map(
+            lambda embedding: vector_store.similarity_search_by_vector_with_score(embedding, k=k, **search_kwargs),
+            embeddings,
+        ))
+
+
+def _vector_candidates_batch(
+    embeddings: List[List[float]], k: int, allowed_ids: Optional[set] = None, filters: Optional[TicketFilters] = None
+) -> List[List[Tuple[dict, float]]]:
+    """Versión por lotes de `_vector_candidates` a partir de embeddings ya calculados."""
+    if allowed_ids is not None and not allowed_ids:
+        return [[] for _ in embeddings]
+    search_kwargs = _vector_filter(vector_store, filters, allowed_ids)
+    results = [[] for _ in embeddings]
+    pending = list(range(len(embeddings)))
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    for _ in range(RETRIEVAL_MAX_FETCH_ROUNDS):
+        with stage("vector_query"):
+            batch = _search_by_vectors([embeddings[i] for i in pending], fetch_k, search_kwargs)
+        # Sólo se vuelven a consultar las búsquedas que todavía no tienen k tickets distintos
+        missing = []
+        for i, scored_documents in zip(pending, batch):
+            results[i] = hydrate_tickets(fuse_chunk_scores(scored_documents), allowed_ids)
+            if _needs_more(scored_documents, results[i], fetch_k, k):
+                missing.append(i)
+        if not missing:
+            break
+        pending = missing
+        fetch_k *= 2
+    return results
+
+
+def _select_tickets(candidates: List[Tuple[dict, float]], k: int) -> List[ScoredTicketModel]:
+    """Si RETRIEVAL_DIVERSITY_LAMBDA < 1 reordena con MMR, y devuelve los k primeros."""
+    if RETRIEVAL_DIVERSITY_LAMBDA < 1 and len(candidates) > k:
+        with stage("mmr"):
+            vectors = vector_store.embeddings.embed_documents([ticket["description"] for ticket, _ in candidates])
+            candidates = mmr_select(candidates, vectors, k, RETRIEVAL_DIVERSITY_LAMBDA)
+    return _to_scored_tickets(candidates[:k])
+
+
+def _log_vector_fallback(e: Exception) -> None:
+    logger.warning("Búsqueda vectorial no disponible (%s: %s), se usa sólo BM25", type(e).__name__, e)
+
+
+def search_scored_tickets(
+    description: str, k: int = 5, mode: str = RETRIEVAL_MODE, filters: Optional[TicketFilters] = None
+) -> List[ScoredTicketModel]:
+    """
+    Busca los k tickets distintos más similares a una descripción.
+    
+    En modo "vector" pide k * RETRIEVAL_OVERFETCH_FACTOR fragmentos, los agrupa por ticket con fusión
+    de scores e hidrata los tickets desde el ticket store. En modo "lexical" usa sólo el índice BM25,
+    sin llamar al servicio de embeddings. En modo "hybrid" combina ambos rankings con RRF (el score
+    devuelto es el de RRF) y, si la búsqueda vectorial falla, responde sólo con BM25.
+    Si RETRIEVAL_DIVERSITY_LAMBDA < 1, el resultado se reordena con MMR para evitar tickets redundantes.
+    Los filtros se resuelven primero con los índices del ticket store y se aplican como pre-filtro,
+    de modo que la búsqueda sólo recorre los tickets que los cumplen.
+    
+    Args:
+        description (str): Descripción del problema.
+        k (int): Cantidad de tickets a devolver.
+        mode (str): "hybrid", "vector" o "lexical".
+        filters (Optional[TicketFilters]): Filtros de metadatos.
+        
+    Returns:
+        List[ScoredTicketModel]: Hasta k tickets distintos con su score.
+    """
+    _check_mode(mode)
+    allowed_ids = resolve_filter_ids(filters)
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    if mode == "lexical":
+        candidates = _lexical_candidates(description, fetch_k, allowed_ids)
+    elif mode == "vector":
+        candidates = _vector_candidates(description, k, allowed_ids, filters)
+    else:
+        lexical = _lexical_candidates(description, fetch_k, allowed_ids)
+        try:
+            candidates = reciprocal_rank_fusion([_vector_candidates(description, k, allowed_ids, filters), lexical])
+        except Exception as e:
+            _log_vector_fallback(e)
+            candidates = lexical
+
+    return _select_tickets(candidates, k)
+
+
+async def search_scored_tickets_async(
+    description: str, k: int = 5, mode: str = RETRIEVAL_MODE, filters: Optional[TicketFilters] = None
+) -> List[ScoredTicketModel]:
+    """
+    Versión asíncrona de `search_scored_tickets`. En modo híbrido, si la búsqueda vectorial tarda más
+    de RETRIEVAL_VECTOR_TIMEOUT_SECONDS, se responde sólo con BM25.
+    
+    Args:
+        description (str): Descripción del problema.
+        k (int): Cantidad de tickets a devolver.
+        mode (str): "hybrid", "vector" o "lexical".
+        filters (Optional[TicketFilters]): Filtros de metadatos.
+        
+    Returns:
+        List[ScoredTicketModel]: Hasta k tickets distintos con su score.
+    """
+    _check_mode(mode)
+    # Los filtros, BM25 y la hidratación consultan SQLite o son CPU: se corren en el threadpool
+    allowed_ids = None
+    if filters is not None and not filters.is_empty():
+        allowed_ids = await asyncio.to_thread(resolve_filter_ids, filters)
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    if mode == "lexical":
+        candidates = await asyncio.to_thread(_lexical_candidates, description, fetch_k, allowed_ids)
+    elif mode == "vector":
+        candidates = await _vector_candidates_async(description, k, allowed_ids, filters)
+    else:
+        lexical = await asyncio.to_thread(_lexical_candidates, description, fetch_k, allowed_ids)
+        try:
+            timeout = RETRIEVAL_VECTOR_TIMEOUT_SECONDS or None
+            vector = await asyncio.wait_for(_vector_candidates_async(description, k, allowed_ids, filters), timeout)
+            candidates = reciprocal_rank_fusion([vector, lexical])
+        except Exception as e:
+            _log_vector_fallback(e)
+            candidates = lexical
+
+    if RETRIEVAL_DIVERSITY_LAMBDA < 1 and len(candidates) > k:
+        with stage("mmr"):
+            store = await open_vector_store()
+            vectors = await store.embeddings.aembed_documents([ticket["description"] for ticket, _ in candidates])
+            candidates = mmr_select(candidates, vectors, k, RETRIEVAL_DIVERSITY_LAMBDA)
+    return _to_scored_tickets(candidates[:k])
+
+
+def search_scored_tickets_batch(
+    descriptions: List[str], k: int = 5, mode: str = RETRIEVAL_MODE, filters: Optional[TicketFilters] = None
+) -> List[List[ScoredTicketModel]]:
+    """
+    Versión por lotes de `search_scored_tickets`: todas las descripciones se embeben en una sola llamada
+    y las búsquedas vectoriales se resuelven juntas (un producto matricial en el índice local,
+    consultas concurrentes en Pinecone).
+    
+    Args:
+        descriptions (List[str]): Descripciones de los problemas.
+        k (int): Cantidad de tickets a devolver por descripción.
+        mode (str): "hybrid", "vector" o "lexical".
+        filters (Optional[TicketFilters]): Filtros de metadatos, comunes a todo el lote.
         
+    Returns:
+        List[List[ScoredTicketModel]]: Tickets similares de cada descripción, en el mismo orden.
+    """
+    _check_mode(mode)
+    allowed_ids = resolve_filter_ids(filters)
+    fetch_k = k * RETRIEVAL_OVERFETCH_FACTOR
+    lexical = [_lexical_candidates(description, fetch_k, allowed_ids) for description in descriptions] if mode != "vector" else None
+    vector = None
+    if mode != "lexical":
+        try:
+            with stage("embedding"):
+                embeddings = vector_store.embeddings.embed_documents(descriptions)
+            vector = _vector_candidates_batch(embeddings, k, allowed_ids, filters)
+        except Exception as e:
+            if mode == "vector":
+                raise
+            _log_vector_fallback(e)
+
+    results = []
+    for i in range(len(descriptions)):
+        if vector is None:
+            candidates = lexical[i]
+        elif lexical is None:
+            candidates = vector[i]
+        else:
+            candidates = reciprocal_rank_fusion([vector[i], lexical[i]])
+        results.append(_select_tickets(candidates, k))
+    return results
+
+
+def retrieve_relevant_tickets_batch(
+    inputTickets: List[TicketModel], k: int = 5, mode: Optional[str] = None, filters: Optional[TicketFilters] = None
+) -> List[List[ScoredTicketModel]]:
+    """
+    Obtiene los tickets similares de varios tickets en una sola pasada.
+    Los resultados cacheados se reutilizan y las descripciones repetidas se buscan una sola vez.
+    
+    Args:
+        inputTickets (List[TicketModel]): Tickets a resolver.
+        k (int): Cantidad de resultados por ticket.
+        mode (Optional[str]): "hybrid", "vector" o "lexical"; por defecto RETRIEVAL_MODE.
+        filters (Optional[TicketFilters]): Filtros de prioridad, rango de fechas y departamento.
+        
+    Returns:
+        List[List[ScoredTicketModel]]: Tickets similares de cada ticket de entrada, en el mismo orden.
+    """
+    try:
+        mode = mode or RETRIEVAL_MODE
+        filters_key = filters.cache_key() if filters else None
+        results: List[Optional[List[ScoredTicketModel]]] = [None] * len(inputTickets)
+        pending = {}
+        for i, ticket in enumerate(inputTickets):
+            cache_key = retrieval_cache.make_key(ticket.description, k, mode, filters_key)
+            cached = retrieval_cache.get(cache_key)
+            if cached is not None:
+                results[i] = list(cached)
+            else:
+                pending.setdefault(cache_key, (ticket.description, []))[1].append(i)
+        generation = index_generation.value
+
+        if pending:
+            descriptions = [description for description, _ in pending.values()]
+            found = search_scored_tickets_batch(descriptions, k=k, mode=mode, filters=filters)
+            for (cache_key, (_, positions)), tickets in zip(pending.items(), found):
+                retrieval_cache.put(cache_key, tickets, generation)
+                for i in positions:
+                    results[i] = list(tickets)
+        return results
+
     except Exception as e:
-        sys.stderr.write(f"\n========== DEBUG: ERROR en retrieve_relevant_tickets ==========\n")
-        sys.stderr.write(f"DEBUG: Tipo de error: {type(e).__name__}\n")
-        sys.stderr.write(f"DEBUG: Mensaje de error: {str(e)}\n")
-        sys.stderr.flush()
-        import traceback
-        sys.stderr.write(f"DEBUG: Traceback completo:\n")
-        sys.stderr.write(traceback.format_exc())
-        sys.stderr.write("========== DEBUG: ERROR finalizado ==========\n")
-        sys.stderr.flush()
+        _log_retrieval_error(e)
+        return [[] for _ in inputTickets]
+
+
+def retrieve_relevant_tickets(
+    inputTicket: TicketModel, k: int = 5, mode: Optional[str] = None, filters: Optional[TicketFilters] = None
+) -> List[ScoredTicketModel]:
+    """
+    Obtiene una lista de tickets similares que permitan resolver el ticket de entrada.
+    Los resultados se cachean por descripción normalizada, k, modo y filtros hasta la próxima ingestión.
+    
+    Args:
+        inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        k (int): Cantidad de resultados a devolver.
+        mode (Optional[str]): "hybrid", "vector" o "lexical"; por defecto RETRIEVAL_MODE.
+        filters (Optional[TicketFilters]): Filtros de prioridad, rango de fechas y departamento.
+        
+    Returns:
+        List[ScoredTicketModel]: Hasta k tickets distintos similares al ingresado, con su score.
+    """
+    try:
+        mode = mode or RETRIEVAL_MODE
+        cache_key = retrieval_cache.make_key(inputTicket.description, k, mode, filters.cache_key() if filters else None)
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        generation = index_generation.value
+
+        results = search_scored_tickets(inputTicket.description, k=k, mode=mode, filters=filters)
+        retrieval_cache.put(cache_key, results, generation)
+        return list(results)
         
+    except Exception as e:
+        _log_retrieval_error(e)
         return []
 
 
-def augment_similar_tickets(inputTicket: TicketModel) -> str:
+async def retrieve_relevant_tickets_async(
+    inputTicket: TicketModel, k: int = 5, mode: Optional[str] = None, filters: Optional[TicketFilters] = None
+) -> List[ScoredTicketModel]:
     """
-    Utilizando un LLM, retorna información sobre tickets similares, contactos y acciones sugeridas.
+    Versión asíncrona de `retrieve_relevant_tickets` (embedding y consulta al vectorstore sin bloquear).
     
     Args:
         inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        k (int): Cantidad de resultados a devolver.
+        mode (Optional[str]): "hybrid", "vector" o "lexical"; por defecto RETRIEVAL_MODE.
+        filters (Optional[TicketFilters]): Filtros de prioridad, rango de fechas y departamento.
         
     Returns:
-        str: Un texto con información sobre tickets similares, contactos y acciones sugeridas.
+        List[ScoredTicketModel]: Hasta k tickets distintos similares al ingresado, con su score.
     """
+    try:
+        mode = mode or RETRIEVAL_MODE
+        cache_key = retrieval_cache.make_key(inputTicket.description, k, mode, filters.cache_key() if filters else None)
+        cached = await retrieval_cache.aget(cache_key)
+        if cached is not None:
+            return list(cached)
+        generation = index_generation.value
 
-    relevant_tickets = retrieve_relevant_tickets(inputTicket)
+        results = await search_scored_tickets_async(inputTicket.description, k=k, mode=mode, filters=filters)
+        await retrieval_cache.aput(cache_key, results, generation)
+        return list(results)
+        
+    except Exception as e:
+        _log_retrieval_error(e)
+        return []
 
-    if (len(relevant_tickets) == 0):
-        return {
-            "resumen": "No se encontraron tickets similares",
-            "contactos": []
+
+def _log_retrieval_error(e: Exception) -> None:
+    logger.error("Error en retrieve_relevant_tickets: %s: %s", type(e).__name__, e, exc_info=e)
+
+
+NO_SIMILAR_TICKETS_RESPONSE = {
+    "resumen": "No se encontraron tickets similares",
+    "contactos": []
+}
+
+# Parámetros de muestreo usados para aumentar tickets
+AUGMENT_PARAMS = {"temperature": 0.7}
+
+
+def build_augment_messages(inputTicket: TicketModel, relevant_tickets: List[TicketModel]) -> List[dict]:
+    """Arma los mensajes system/user con el ticket de entrada y los tickets similares."""
+    return [
+        {
+            "role": "system",
+            "content": TICKET_SUMMARIZER_SYSTEM_MESSAGE
+        },
+        {
+            "role": "user",
+            "content": f"""
+                Ticket de entrada:
+                {inputTicket}
+                
+                Tickets similares:
+                {relevant_tickets}
+            """
         }
+    ]
 
-    user_message = {
-                "role": "user",
-                "content": f"""
-                    Ticket de entrada:
-                    {inputTicket}
-                    
-                    Tickets similares:
-                    {relevant_tickets}
-                """
-            }
-
-    message = groq_llm_client.chat.completions.create(
-        model=CHAT_MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": TICKET_SUMMARIZER_SYSTEM_MESSAGE
-            },
-            {
-                "role": "user",
-                "content": f"""
-                    Ticket de entrada:
-                    {inputTicket}
-                    
-                    Tickets similares:
-                    {relevant_tickets}
-                """
-            }
-        ],
-        temperature=0.7
-    )
 
-    choice = message.choices[0]
+@stage("parse")
+def parse_augment_response(completion_text: str, relevant_tickets: List[TicketModel]) -> dict:
+    """
+    Extrae el resumen de la respuesta del LLM y arma la lista de contactos.
     
-    summary_text = choice.message.content.split("```json")[1].split("```")[0]
+    Args:
+        completion_text (str): Respuesta bruta del LLM.
+        relevant_tickets (List[TicketModel]): Tickets similares usados como contexto.
+        
+    Returns:
+        dict: Diccionario con `resumen` y `contactos`.
+    """
+    summary_text = completion_text or ""
+    if "```json" in summary_text:
+        summary_text = summary_text.split("```json")[1].split("```")[0]
+    unique_owners = list(set([t.owner for t in relevant_tickets]))
 
     try:
         # Intentar parsear la respuesta como JSON
@@ -148,13 +701,100 @@ def augment_similar_tickets(inputTicket: TicketModel) -> str:
             resumen = response_data.get("'resumen'", "")
         return {
             "resumen": resumen,
-            "contactos": list(set([t.owner for t in relevant_tickets]))
+            "contactos": unique_owners
         }
     except json.JSONDecodeError:
         # Fallback si el LLM no devuelve JSON válido
-        sys.stderr.write(f"DEBUG: Error al parsear JSON del LLM. Usando fallback.\n")
-        unique_owners = list(set([t.owner for t in relevant_tickets]))
+        logger.warning("Error al parsear el JSON del LLM, se usa la respuesta como resumen")
         return {
             "resumen": summary_text,
             "contactos": unique_owners
         }
+
+
+def augment_similar_tickets(inputTicket: TicketModel, use_cache: bool = True) -> dict:
+    """
+    Utilizando un LLM, retorna información sobre tickets similares, contactos y acciones sugeridas.
+    
+    Args:
+        inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        use_cache (bool): False para saltear la caché de completions en este request.
+        
+    Returns:
+        dict: Resumen de los tickets similares (`resumen`) y contactos sugeridos (`contactos`).
+    """
+
+    relevant_tickets = retrieve_relevant_tickets(inputTicket)
+
+    if (len(relevant_tickets) == 0):
+        return dict(NO_SIMILAR_TICKETS_RESPONSE)
+
+    completion_text = cached_chat_completion(
+        groq_llm_client,
+        CHAT_MODEL_NAME,
+        build_augment_messages(inputTicket, relevant_tickets),
+        use_cache=use_cache,
+        **AUGMENT_PARAMS
+    )
+    return parse_augment_response(completion_text, relevant_tickets)
+
+
+async def augment_similar_tickets_async(inputTicket: TicketModel, use_cache: bool = True) -> dict:
+    """
+    Versión asíncrona de `augment_similar_tickets`: retrieval y LLM sin bloquear el event loop.
+    
+    Args:
+        inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        use_cache (bool): False para saltear la caché de completions en este request.
+        
+    Returns:
+        dict: Resumen de los tickets similares (`resumen`) y contactos sugeridos (`contactos`).
+    """
+
+    relevant_tickets = await retrieve_relevant_tickets_async(inputTicket)
+
+    if (len(relevant_tickets) == 0):
+        return dict(NO_SIMILAR_TICKETS_RESPONSE)
+
+    completion_text = await acached_chat_completion(
+        async_groq_llm_client,
+        CHAT_MODEL_NAME,
+        build_augment_messages(inputTicket, relevant_tickets),
+        use_cache=use_cache,
+        **AUGMENT_PARAMS
+    )
+    return parse_augment_response(completion_text, relevant_tickets)
+
+
+async def stream_augment_similar_tickets(inputTicket: TicketModel, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Versión en streaming de `augment_similar_tickets`.
+    
+    Args:
+        inputTicket (TicketModel): Objeto con los detalles del ticket a resolver.
+        use_cache (bool): False para saltear la caché de completions en este request.
+        
+    Yields:
+        Tuple[str, Any]: Eventos `(nombre, datos)`:
+            - ("tickets", [...]): tickets similares, apenas termina el retrieval.
+            - ("token", str): fragmentos del resumen a medida que los genera el LLM.
+            - ("result", dict): respuesta final con `resumen` y `contactos`.
+    """
+    relevant_tickets = await retrieve_relevant_tickets_async(inputTicket)
+    yield "tickets", [ticket.model_dump(mode="json") for ticket in relevant_tickets]
+
+    if (len(relevant_tickets) == 0):
+        yield "result", dict(NO_SIMILAR_TICKETS_RESPONSE)
+        return
+
+    parts = []
+    async for delta in astream_chat_completion(
+        async_groq_llm_client,
+        CHAT_MODEL_NAME,
+        build_augment_messages(inputTicket, relevant_tickets),
+        use_cache=use_cache,
+        **AUGMENT_PARAMS
+    ):
+        parts.append(delta)
+        yield "token", delta
+    yield "result", parse_augment_response("".join(parts), relevant_tickets)
@@ -0,0 +1,233 @@
+"""
+Módulo con el control de cuota para llamadas en lote a Groq.
+Combina un token bucket de requests y otro de tokens por minuto, una concurrencia
+adaptativa (AIMD) y reintentos con backoff exponencial ante respuestas 429.
+"""
+
+import os
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, List, Optional
+from groq import RateLimitError
+from .shared_state import API_WORKERS
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+# Límites de la concurrencia adaptativa
+GROQ_MIN_CONCURRENCY = int(os.getenv("GROQ_MIN_CONCURRENCY", "1"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+# Reintentos ante un 429 y backoff exponencial (segundos)
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+GROQ_BACKOFF_BASE_SECONDS = float(os.getenv("GROQ_BACKOFF_BASE_SECONDS", "1"))
+GROQ_BACKOFF_MAX_SECONDS = float(os.getenv("GROQ_BACKOFF_MAX_SECONDS", "30"))
+
+# Aproximación usada para estimar los tokens de un prompt sin tokenizar
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int = 0) -> int:
+    """Estima los tokens que consume una completion (prompt + máximo de salida)."""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + 1 + max_tokens
+
+
+class TokenBucket:
+    """
+    Token bucket con reserva: `reserve` descuenta siempre y devuelve cuánto hay que esperar
+    hasta que la reserva quede cubierta, de modo que los pedidos se atienden en orden.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        # Cantidad de veces que se vació el bucket: anula las reservas hechas antes
+        self.drains = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self._tokens -= amount
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Devuelve `amount` al bucket (negativo para cobrar de más), ej. al conocer el consumo real."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    def drain(self, seconds: float) -> None:
+        """
+        Vacía el bucket de modo que la próxima reserva de una unidad espere `seconds`
+        (ej. cuando el proveedor pide esperar con Retry-After). Las reservas en espera quedan
+        anuladas (ver `drains`) y deben volver a pedirse, detrás de esa espera.
+        """
+        self._refill()
+        self._tokens = 1 - seconds * self.rate
+        self.drains += 1
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de llamadas simultáneas con AIMD: crece de a una tras `limit` éxitos seguidos
+    y se reduce a la mitad ante cada 429.
+    """
+
+    def __init__(self, minimum: int = GROQ_MIN_CONCURRENCY, maximum: int = GROQ_MAX_CONCURRENCY):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = self.minimum
+        self._in_flight = 0
+        self._successes = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def __aenter__(self) -> "AdaptiveConcurrency":
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+
+
+def _retry_after_seconds(error: RateLimitError) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class GroqRateLimiter:
+    """Cuota de Groq (requests y tokens por minuto) más concurrencia adaptativa y backoff ante 429."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE,
+        max_retries: int = GROQ_MAX_RETRIES,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency()
+        self.max_retries = max_retries
+        self.throttled = 0
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Reserva un request y `tokens` tokens y espera hasta que la reserva quede cubierta.
+        Si mientras tanto un 429 vació el bucket de requests, la reserva se vuelve a pedir.
+        """
+        while True:
+            drains = self.requests.drains
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+            if self.requests.drains == drains:
+                return
+            self.tokens.refund(tokens)
+
+    def backoff(self, attempt: int, error: RateLimitError) -> float:
+        """
+        Posterga los próximos pedidos: Retry-After si el proveedor lo indica, si no exponencial con jitter.
+        La espera se aplica vaciando el bucket de requests: el reintento la cumple en su próximo
+        `acquire`, y las llamadas del lote que ya esperaban una reserva la vuelven a pedir detrás de ella.
+        """
+        self.throttled += 1
+        self.concurrency.on_throttle()
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = min(GROQ_BACKOFF_MAX_SECONDS, GROQ_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+        self.requests.drain(delay)
+        return delay
+
+    def reconcile(self, estimated: int, result: Any) -> None:
+        """Ajusta el bucket de tokens con el consumo real que informa la respuesta (`usage.total_tokens`)."""
+        actual = getattr(getattr(result, "usage", None), "total_tokens", None)
+        if isinstance(actual, (int, float)):
+            self.tokens.refund(estimated - actual)
+
+    async def call(self, create: Any, tokens: int, **kwargs: Any) -> Any:
+        """
+        Ejecuta `create(**kwargs)` respetando la cuota, reintentando ante 429.
+
+        Args:
+            create (Any): Función asíncrona a llamar (ej. `client.chat.completions.create`).
+            tokens (int): Tokens estimados de la llamada; se corrigen con el `usage` de la respuesta.
+
+        Returns:
+            Any: Resultado de la llamada.
+        """
+        for attempt in range(self.max_retries + 1):
+            # La reserva se hace dentro del límite de concurrencia: las llamadas que esperan un lugar
+            # todavía no reservaron, así que un 429 mientras tanto también las posterga
+            async with self.concurrency:
+                await self.acquire(tokens)
+                try:
+                    result = await create(**kwargs)
+                except RateLimitError as e:
+                    # Un pedido rechazado no consume tokens: el reintento vuelve a reservarlos
+                    self.tokens.refund(tokens)
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self.backoff(attempt, e)
+                else:
+                    self.concurrency.on_success()
+                    self.reconcile(tokens, result)
+                    return result
+            logger.info("Groq devolvió 429, reintento %d en %.1fs", attempt + 1, delay)
+
+    def wrap(self, client: Any) -> Any:
+        """
+        Devuelve un cliente con la misma interfaz `chat.completions.create` que pasa por el limitador.
+        Los reintentos propios del SDK se desactivan para que los 429 los maneje el limitador.
+        """
+        if hasattr(client, "with_options"):
+            client = client.with_options(max_retries=0)
+
+        async def create(**kwargs: Any) -> Any:
+            tokens = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens") or 0)
+            return await self.call(client.chat.completions.create, tokens, **kwargs)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+# Cada worker tiene sus propios buckets: la cuota de la cuenta se reparte entre los procesos
+groq_rate_limiter = GroqRateLimiter(
+    requests_per_minute=GROQ_REQUESTS_PER_MINUTE / API_WORKERS,
+    tokens_per_minute=GROQ_TOKENS_PER_MINUTE / API_WORKERS,
+)
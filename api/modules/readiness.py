@@ -0,0 +1,183 @@
+"""
+Módulo de arranque y disponibilidad de la API: warmup de las dependencias (clientes de Groq,
+modelo de embeddings, vectorstore, store de tickets e índice léxico) y su estado por dependencia
+para el endpoint de readiness.
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from pydantic import BaseModel
+from typing import Awaitable, Callable, Dict, List, Optional
+from .third_party_clients import groq_llm_client, async_groq_llm_client, embeddings_model, open_vector_store
+from .ticket_store import ticket_store
+from .lexical_index import lexical_index
+from .metrics import observe_stage
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# "background" (el servidor acepta requests mientras se hace el warmup), "blocking" (el arranque
+# espera al warmup) u "off" (las dependencias se verifican recién con la primera consulta de readiness)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "background").lower()
+# Tiempo máximo por dependencia en cada verificación
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+# Dependencias que deben estar disponibles para que la API se considere lista
+READINESS_DEPENDENCIES = tuple(
+    name.strip() for name in os.getenv(
+        "READINESS_DEPENDENCIES", "ticket_store,lexical_index,groq,embeddings,vector_store"
+    ).split(",") if name.strip()
+)
+# Cada cuántos segundos se vuelve a verificar una dependencia que no estaba disponible
+READINESS_RETRY_SECONDS = float(os.getenv("READINESS_RETRY_SECONDS", "5"))
+# Texto que se embebe durante el warmup: carga el modelo en Ollama y sirve para consultar el vectorstore
+WARMUP_PROBE_TEXT = "warmup"
+
+
+class DependencyStatus(BaseModel):
+    """Estado de una dependencia según su última verificación."""
+    name: str
+    ready: bool = False
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[datetime] = None
+
+
+class ReadinessReport(BaseModel):
+    """Resultado del endpoint de readiness."""
+    ready: bool
+    warmup: str
+    dependencies: List[DependencyStatus]
+
+
+class WarmupManager:
+    """
+    Verifica las dependencias de la API y recuerda su estado. La verificación también es el warmup:
+    construye los clientes, abre sus conexiones, carga el modelo de embeddings y el índice léxico,
+    de modo que el primer request de los usuarios no paga esos costos.
+    """
+
+    def __init__(self, dependencies: tuple = READINESS_DEPENDENCIES):
+        unknown = [name for name in dependencies if name not in self._probes()]
+        if unknown:
+            raise ValueError(f"READINESS_DEPENDENCIES desconocidas: {', '.join(unknown)}. Opciones: {', '.join(self._probes())}")
+        self.dependencies = dependencies
+        self._statuses: Dict[str, DependencyStatus] = {name: DependencyStatus(name=name) for name in dependencies}
+        self._probe_vector: Optional[List[float]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.state = "pending"
+
+    def _probes(self) -> Dict[str, Callable[[], Awaitable[None]]]:
+        return {
+            "ticket_store": self._check_ticket_store,
+            "lexical_index": self._check_lexical_index,
+            "groq": self._check_groq,
+            "embeddings": self._check_embeddings,
+            "vector_store": self._check_vector_store,
+        }
+
+    async def _check_ticket_store(self) -> None:
+        await asyncio.to_thread(ticket_store.count)
+
+    async def _check_lexical_index(self) -> None:
+        # Construye el índice desde el store de tickets, que de otro modo se cargaría en la primera búsqueda
+        await asyncio.to_thread(lexical_index.load)
+
+    async def _check_groq(self) -> None:
+        groq_llm_client.get()
+        # Una llamada liviana que valida la API key y deja abierta la conexión del pool asíncrono
+        await async_groq_llm_client.models.list()
+
+    async def _check_embeddings(self) -> None:
+        embeddings = await asyncio.to_thread(embeddings_model.get)
+        # Se evita la caché de embeddings para que el modelo realmente se cargue en Ollama
+        model = getattr(embeddings, "underlying", embeddings)
+        self._probe_vector = await model.aembed_query(WARMUP_PROBE_TEXT)
+
+    async def _check_vector_store(self) -> None:
+        store = await open_vector_store()
+        if self._probe_vector is None:
+            await self._check_embeddings()
+        if hasattr(store, "asimilarity_search_by_vector_with_score"):
+            await store.asimilarity_search_by_vector_with_score(self._probe_vector, k=1)
+        else:
+            await asyncio.to_thread(store.similarity_search_by_vector_with_score, self._probe_vector, k=1)
+
+    async def _check(self, name: str) -> None:
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(self._probes()[name](), WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            error = f"Sin respuesta en {WARMUP_TIMEOUT_SECONDS:g} segundos"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        observe_stage(f"warmup_{name}", elapsed)
+        if error is not None:
+            logger.warning("La dependencia %s no está disponible: %s", name, error)
+        self._statuses[name] = DependencyStatus(
+            name=name,
+            ready=error is None,
+            latency_ms=round(elapsed * 1000, 2),
+            error=error,
+            checked_at=datetime.now(timezone.utc),
+        )
+
+    async def warmup(self, dependencies: Optional[List[str]] = None) -> None:
+        """
+        Verifica las dependencias indicadas (todas por defecto). Se verifican en paralelo, salvo
+        el vectorstore, que se consulta con el embedding de prueba y por eso va al final.
+        """
+        names = list(dependencies or self.dependencies)
+        self.state = "running"
+        start = time.perf_counter()
+        first = [name for name in names if name != "vector_store"]
+        await asyncio.gather(*(self._check(name) for name in first))
+        if "vector_store" in names:
+            await self._check("vector_store")
+        self.state = "done"
+        logger.info(
+            "Warmup de %s terminado en %.2f s (listas: %s)", ", ".join(names), time.perf_counter() - start,
+            ", ".join(name for name in names if self._statuses[name].ready) or "ninguna",
+        )
+
+    def start(self, dependencies: Optional[List[str]] = None) -> None:
+        """Lanza el warmup en segundo plano, salvo que ya haya uno en curso."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.warmup(dependencies))
+
+    async def stop(self) -> None:
+        """Cancela el warmup en curso (al apagar el servidor)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return all(status.ready for status in self._statuses.values())
+
+    def report(self) -> ReadinessReport:
+        """
+        Estado actual de cada dependencia, sin esperar a ninguna verificación. Las que no
+        estaban disponibles (o nunca se verificaron) se vuelven a verificar en segundo plano,
+        como máximo una vez cada READINESS_RETRY_SECONDS.
+        """
+        if not self.ready and (self._task is None or self._task.done()):
+            now = datetime.now(timezone.utc)
+            stale = [
+                name for name, status in self._statuses.items()
+                if not status.ready and (
+                    status.checked_at is None or (now - status.checked_at).total_seconds() >= READINESS_RETRY_SECONDS
+                )
+            ]
+            if stale:
+                self.start(stale)
+        return ReadinessReport(ready=self.ready, warmup=self.state, dependencies=list(self._statuses.values()))
+
+
+warmup_manager = WarmupManager()
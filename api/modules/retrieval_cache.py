@@ -0,0 +1,199 @@
+"""
+Módulo con la caché de resultados de búsqueda de tickets similares.
+Las entradas expiran por TTL, se desalojan por LRU y se invalidan cuando cambia
+la generación del índice (cada ingestión la incrementa, en cualquier worker).
+Con varios workers, un nivel compartido en SQLite reutiliza entre procesos los
+resultados que calculó cualquiera de ellos.
+"""
+
+import os
+import time
+import asyncio
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from .embedding_cache import normalize_text, content_hash
+from .shared_state import API_WORKERS, IndexGeneration, index_generation
+from .metrics import record_cache
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "300"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))
+# Nivel compartido entre workers (activado por defecto cuando hay más de uno)
+RETRIEVAL_CACHE_SHARED = os.getenv(
+    "RETRIEVAL_CACHE_SHARED", "true" if API_WORKERS > 1 else "false"
+).lower() in ("1", "true", "yes")
+RETRIEVAL_CACHE_PATH = os.getenv("RETRIEVAL_CACHE_PATH", ".retrieval_cache.sqlite")
+# Cada cuántas escrituras se borran del nivel compartido las entradas vencidas o de generaciones viejas
+_SHARED_PRUNE_INTERVAL = 64
+
+
+class RetrievalCache:
+    """
+    Caché TTL/LRU de resultados de `retrieve_relevant_tickets`.
+
+    La clave es la descripción normalizada más los parámetros de búsqueda; cada entrada
+    guarda la generación del índice en la que se calculó y deja de ser válida al cambiar.
+    Con `shared_path`, las entradas se guardan también en una base SQLite que leen todos
+    los workers; el nivel en memoria de cada proceso queda como primer nivel.
+    """
+
+    def __init__(
+        self,
+        generation: IndexGeneration,
+        ttl_seconds: float = RETRIEVAL_CACHE_TTL_SECONDS,
+        max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+        enabled: bool = RETRIEVAL_CACHE_ENABLED,
+        shared_path: Optional[str] = None,
+    ):
+        self.generation = generation
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared: Optional[sqlite3.Connection] = None
+        self._shared_puts = 0
+        if enabled and shared_path:
+            self._shared = sqlite3.connect(shared_path, check_same_thread=False)
+            self._shared.execute("PRAGMA journal_mode=WAL")
+            self._shared.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, generation INTEGER NOT NULL, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            self._shared.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results(expires_at)")
+            self._shared.commit()
+
+    @staticmethod
+    def make_key(description: str, *params: Hashable) -> Hashable:
+        return (normalize_text(description),) + params
+
+    @staticmethod
+    def _shared_key(key: Hashable) -> str:
+        # Los valores se serializan con pickle, que guarda la ruta de import de sus clases: la API
+        # (`modules.`) y el agente en proceso (`api.modules.`) no leen entradas del otro
+        return content_hash(f"{__name__}\x00{key!r}".encode("utf-8"))
+
+    def _memory_put(self, key: Hashable, value: Any, generation: int, expires_at: float) -> None:
+        self._entries[key] = (generation, expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _shared_get(self, key: Hashable, generation: int) -> Optional[Tuple[float, Any]]:
+        """Busca una entrada vigente en el nivel compartido; devuelve (segundos restantes, valor)."""
+        now = time.time()
+        try:
+            row = self._shared.execute(
+                "SELECT expires_at, value FROM results WHERE key = ? AND generation = ? AND expires_at > ?",
+                (self._shared_key(key), generation, now),
+            ).fetchone()
+        except sqlite3.Error as e:
+            # La caché nunca hace fallar una búsqueda (ej. base bloqueada por otro worker)
+            logger.warning("Error al leer la caché compartida de resultados: %s", e)
+            return None
+        if row is None:
+            return None
+        return row[0] - now, pickle.loads(row[1])
+
+    def _shared_put(self, key: Hashable, value: Any, generation: int) -> None:
+        try:
+            self._shared.execute(
+                "INSERT OR REPLACE INTO results (key, generation, expires_at, value) VALUES (?, ?, ?, ?)",
+                (self._shared_key(key), generation, time.time() + self.ttl_seconds,
+                 pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            self._shared_puts += 1
+            if self._shared_puts % _SHARED_PRUNE_INTERVAL == 0:
+                self._shared.execute(
+                    "DELETE FROM results WHERE generation < ? OR expires_at <= ?", (self.generation.value, time.time())
+                )
+                self._shared.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._shared.commit()
+        except sqlite3.Error as e:
+            self._shared.rollback()
+            logger.warning("Error al escribir la caché compartida de resultados: %s", e)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el resultado cacheado o None si no existe, expiró o el índice cambió."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            current_generation = self.generation.value
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == current_generation and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    record_cache("retrieval", True)
+                    return value
+                del self._entries[key]
+            if self._shared is not None:
+                found = self._shared_get(key, current_generation)
+                if found is not None:
+                    remaining, value = found
+                    self._memory_put(key, value, current_generation, time.monotonic() + remaining)
+                    self.hits += 1
+                    record_cache("retrieval", True)
+                    return value
+            self.misses += 1
+            record_cache("retrieval", False)
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """
+        Guarda un resultado calculado en la generación `generation` (la leída antes de buscar,
+        para no cachear como vigente un resultado que se cruzó con una ingestión).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._memory_put(key, value, generation, time.monotonic() + self.ttl_seconds)
+            if self._shared is not None:
+                self._shared_put(key, value, generation)
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """Versión asíncrona de `get`: con el nivel compartido, la lectura de SQLite se hace en el threadpool."""
+        if self._shared is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: Hashable, value: Any, generation: int) -> None:
+        """Versión asíncrona de `put`."""
+        if self._shared is None:
+            self.put(key, value, generation)
+        else:
+            await asyncio.to_thread(self.put, key, value, generation)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._shared is not None:
+                self._shared.execute("DELETE FROM results")
+                self._shared.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "generation": self.generation.value,
+            "shared": self._shared is not None,
+        }
+
+
+retrieval_cache = RetrievalCache(index_generation, shared_path=RETRIEVAL_CACHE_PATH if RETRIEVAL_CACHE_SHARED else None)
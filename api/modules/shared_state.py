@@ -0,0 +1,90 @@
+"""
+Módulo con el estado compartido entre los workers de la API (varios procesos sobre los mismos
+archivos): la cantidad de workers, locks de archivo entre procesos y el contador de generación
+del índice, mapeado en memoria para que leerlo no cueste una syscall.
+"""
+
+import os
+import mmap
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin locks entre procesos, sólo se soporta un worker
+    fcntl = None
+
+# Cantidad de procesos que sirven la API (`uvicorn --workers`, `gunicorn -w`). Se usa para repartir
+# recursos por proceso, como la cuota de Groq; los stores y cachés compartidos no dependen de este valor
+API_WORKERS = max(1, int(os.getenv("API_WORKERS", "1")))
+INDEX_GENERATION_PATH = os.getenv("INDEX_GENERATION_PATH", ".index_generation")
+
+if API_WORKERS > 1 and fcntl is None:
+    raise RuntimeError("API_WORKERS > 1 requiere locks de archivo (fcntl), no disponibles en esta plataforma")
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Lock exclusivo entre procesos (y entre hilos) sobre el archivo `path`, que se crea si no existe.
+    Devuelve si se obtuvo el lock: con `blocking=False`, False indica que lo tiene otro.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        # Cerrar el descriptor libera el lock
+        os.close(fd)
+
+
+class IndexGeneration:
+    """
+    Contador que se incrementa cada vez que se ingestan tickets nuevos.
+
+    Vive en un archivo mapeado en memoria compartido por todos los workers: una ingestión en
+    cualquiera de ellos invalida las cachés de resultados y hace que los demás sincronicen sus
+    índices en memoria. Leerlo es una lectura de memoria; incrementarlo toma el lock del archivo.
+    """
+
+    _FORMAT = struct.Struct("<Q")
+
+    def __init__(self, path: str = INDEX_GENERATION_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        # El archivo se crea y se mapea en el primer uso: importar el módulo no escribe en disco
+        self._map = None
+
+    def _get_map(self) -> mmap.mmap:
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+                    try:
+                        if os.fstat(fd).st_size < self._FORMAT.size:
+                            os.ftruncate(fd, self._FORMAT.size)
+                        self._map = mmap.mmap(fd, self._FORMAT.size)
+                    finally:
+                        os.close(fd)
+        return self._map
+
+    @property
+    def value(self) -> int:
+        return self._FORMAT.unpack_from(self._get_map())[0]
+
+    def bump(self) -> int:
+        generation_map = self._get_map()
+        with self._lock, file_lock(self._path):
+            value = self._FORMAT.unpack_from(generation_map)[0] + 1
+            self._FORMAT.pack_into(generation_map, 0, value)
+            return value
+
+
+index_generation = IndexGeneration()
@@ -1,26 +1,158 @@
 import os
-from groq import Groq
-from pinecone import Pinecone
+import asyncio
+import importlib
+import threading
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
-from typing import Any
-from langchain_ollama import OllamaEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore
 
 
 load_dotenv()
-groq_llm_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-pinecone_client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 
 TOKENIZER_MODEL_NAME = "all-minilm:22m"
 
-embeddings_model = OllamaEmbeddings(model=TOKENIZER_MODEL_NAME)
+# Backend del vectorstore: "pinecone" (por defecto), "local" o una ruta "paquete.modulo:fabrica"
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", ".vector_store")
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class LazyClient:
+    """
+    Cliente compartido que se construye recién en el primer uso y se reutiliza en todo el proceso.
+    Importar el módulo no abre conexiones ni llama a servicios externos, y si un servicio no está
+    disponible falla el primer uso (que se reintenta en el siguiente) y no la importación.
+    Los atributos se delegan al cliente construido.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """Devuelve el cliente, construyéndolo una única vez aunque lo pidan varios hilos a la vez."""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.get(), attribute)
+
+    def __repr__(self) -> str:
+        state = "inicializado" if self.initialized else "sin inicializar"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+def build_embeddings() -> Any:
+    from langchain_ollama import OllamaEmbeddings
+
+    embeddings = OllamaEmbeddings(model=TOKENIZER_MODEL_NAME)
+    if EMBEDDING_CACHE_ENABLED:
+        from .embedding_cache import CachedEmbeddings
+
+        # Consultas repetidas y re-ingestas de tickets idénticos no vuelven a llamar a Ollama
+        embeddings = CachedEmbeddings(embeddings, model_name=TOKENIZER_MODEL_NAME)
+    return embeddings
 
 def get_pinecone_index() -> Any:
+    from pinecone import Pinecone
+
     pinecone_index_string = os.getenv("PINECONE_INDEX_NAME")
     if pinecone_index_string is None:
         raise ValueError("PINECONE_INDEX_NAME no está definido en las variables de entorno")
+    pinecone_client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    return pinecone_client.Index(pinecone_index_string)
+
+def build_pinecone_vector_store(embedding: Any) -> "VectorStore":
+    from langchain_pinecone import PineconeVectorStore
+
+    return PineconeVectorStore(embedding=embedding, index=get_pinecone_index())
+
+def build_local_vector_store(embedding: Any) -> "VectorStore":
+    from .local_vector_store import LocalVectorStore
+
+    return LocalVectorStore(embedding=embedding, path=LOCAL_VECTOR_STORE_PATH)
+
+VECTOR_STORE_BACKENDS = {
+    "pinecone": build_pinecone_vector_store,
+    "local": build_local_vector_store,
+}
+
+def build_vector_store(backend: str, embedding: Any) -> "VectorStore":
+    """
+    Construye el vectorstore según el backend configurado.
+
+    Args:
+        backend (str): Nombre de un backend registrado o ruta "paquete.modulo:fabrica"
+            a una función que recibe el modelo de embeddings y devuelve un VectorStore.
+        embedding (Any): Modelo de embeddings a utilizar.
+
+    Returns:
+        VectorStore: Instancia del vectorstore.
+    """
+    if backend in VECTOR_STORE_BACKENDS:
+        return VECTOR_STORE_BACKENDS[backend](embedding)
+    if ":" in backend:
+        module_name, factory_name = backend.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), factory_name)
+        return factory(embedding)
+    raise ValueError(
+        f"VECTOR_STORE_BACKEND desconocido: {backend}. Opciones: {', '.join(VECTOR_STORE_BACKENDS)} o 'modulo:fabrica'"
+    )
+
+groq_llm_client = LazyClient("groq", lambda: Groq(api_key=os.getenv("GROQ_API_KEY")))
+# Cliente asíncrono compartido: un único pool de conexiones HTTP para todos los requests concurrentes
+async_groq_llm_client = LazyClient("async_groq", lambda: AsyncGroq(api_key=os.getenv("GROQ_API_KEY")))
+embeddings_model = LazyClient("embeddings", build_embeddings)
+vector_store_instance = LazyClient(
+    "vector_store", lambda: build_vector_store(VECTOR_STORE_BACKEND, embeddings_model.get())
+)
+
+_vector_store_context_open = False
+_vector_store_context_lock = asyncio.Lock()
+
+
+async def open_vector_store() -> "VectorStore":
+    """
+    Construye el vectorstore sin bloquear el event loop y, si admite `async with` (Pinecone),
+    abre su cliente asíncrono una única vez. Así todos los requests comparten una sesión HTTP
+    en lugar de abrir y cerrar una por llamada, que además falla con llamadas concurrentes.
+    """
+    global _vector_store_context_open
+    if vector_store_instance.initialized:
+        store = vector_store_instance.get()
     else:
-        test = pinecone_client.Index(pinecone_index_string)
-        return pinecone_client.Index(pinecone_index_string)
-        
-vector_store_instance = PineconeVectorStore(embedding=embeddings_model, index=get_pinecone_index())
\ No newline at end of file
+        store = await asyncio.to_thread(vector_store_instance.get)
+    if not _vector_store_context_open and hasattr(store, "__aenter__"):
+        async with _vector_store_context_lock:
+            if not _vector_store_context_open:
+                await store.__aenter__()
+                _vector_store_context_open = True
+    return store
+
+
+async def close_clients() -> None:
+    """Cierra los clientes asíncronos abiertos (sólo los que llegaron a construirse)."""
+    global _vector_store_context_open
+    if _vector_store_context_open:
+        await vector_store_instance.get().aclose()
+        _vector_store_context_open = False
+    if async_groq_llm_client.initialized:
+        await async_groq_llm_client.get().close()
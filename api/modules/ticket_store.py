@@ -0,0 +1,200 @@
+"""
+Módulo con el almacén de documentos de tickets.
+Cada ticket se guarda una sola vez (SQLite, clave ticketId); los vectores sólo
+llevan el id del ticket y la posición del fragmento, y la recuperación hidrata
+los tickets ganadores con una única consulta.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+TICKET_STORE_PATH = os.getenv("TICKET_STORE_PATH", ".tickets.sqlite")
+
+TICKET_FIELDS = ("ticketId", "creationDate", "priority", "owner", "description", "impact", "actions")
+
+# Límite de parámetros por consulta de SQLite
+_SQL_BATCH = 500
+
+
+def owner_department(owner: str) -> str:
+    """Extrae el departamento del campo owner ("Nombre - Departamento"), normalizado a minúsculas."""
+    return owner.rsplit(" - ", 1)[-1].strip().lower() if " - " in owner else ""
+
+
+def creation_day(creation_date: str) -> int:
+    """Fecha de creación "YYYY-MM-DD" como entero YYYYMMDD (0 si no tiene ese formato), comparable por rango."""
+    digits = creation_date[:10].replace("-", "")
+    return int(digits) if len(digits) == 8 and digits.isdigit() else 0
+
+
+class TicketStore:
+    """Almacén SQLite de tickets, con la cantidad de fragmentos indexados de cada uno."""
+
+    def __init__(self, path: str = TICKET_STORE_PATH):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            "ticketId TEXT PRIMARY KEY, creationDate TEXT NOT NULL, priority TEXT NOT NULL, owner TEXT NOT NULL, "
+            "description TEXT NOT NULL, impact TEXT NOT NULL, actions TEXT NOT NULL, "
+            "chunk_count INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(tickets)")]
+        if "department" not in columns:
+            # Migración de stores creados antes de los filtros por departamento
+            self._connection.execute("ALTER TABLE tickets ADD COLUMN department TEXT NOT NULL DEFAULT ''")
+            self._connection.executemany(
+                "UPDATE tickets SET department = ? WHERE ticketId = ?",
+                [(owner_department(owner), ticket_id)
+                 for ticket_id, owner in self._connection.execute("SELECT ticketId, owner FROM tickets").fetchall()],
+            )
+        if "updated_seq" not in columns:
+            # Secuencia de actualización: permite a cada worker indexar sólo los tickets que cambiaron
+            self._connection.execute("ALTER TABLE tickets ADD COLUMN updated_seq INTEGER NOT NULL DEFAULT 0")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tickets_updated_seq ON tickets(updated_seq)")
+        # Índices secundarios para los filtros de búsqueda
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tickets_priority ON tickets(priority, creationDate)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tickets_creation_date ON tickets(creationDate)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tickets_department ON tickets(department, creationDate)")
+        self._connection.commit()
+
+    def upsert_many(self, tickets: Iterable[Tuple[dict, int]]) -> Dict[str, int]:
+        """
+        Inserta o actualiza tickets.
+
+        Args:
+            tickets (Iterable[Tuple[dict, int]]): Pares (ticket como dict, cantidad de fragmentos).
+
+        Returns:
+            Dict[str, int]: Cantidad de fragmentos que tenía cada ticket ya existente,
+            para poder borrar los fragmentos que sobran si el ticket se acortó.
+        """
+        rows = [
+            tuple(ticket[field] for field in TICKET_FIELDS) + (chunk_count, owner_department(ticket["owner"]))
+            for ticket, chunk_count in tickets
+        ]
+        if not rows:
+            return {}
+        with self._lock:
+            previous = {}
+            ids = [row[0] for row in rows]
+            for start in range(0, len(ids), _SQL_BATCH):
+                block = ids[start:start + _SQL_BATCH]
+                previous.update(self._connection.execute(
+                    f"SELECT ticketId, chunk_count FROM tickets WHERE ticketId IN ({','.join('?' * len(block))})",
+                    block,
+                ).fetchall())
+            # La secuencia se calcula dentro de la transacción de escritura, que SQLite serializa
+            # entre procesos: cada fila recibe un valor único y creciente
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO tickets ({', '.join(TICKET_FIELDS)}, chunk_count, department, updated_seq) "
+                f"VALUES ({', '.join('?' * (len(TICKET_FIELDS) + 2))}, "
+                f"(SELECT COALESCE(MAX(updated_seq), 0) + 1 FROM tickets))",
+                rows,
+            )
+            self._connection.commit()
+        return previous
+
+    def get_many(self, ticket_ids: List[str]) -> Dict[str, dict]:
+        """
+        Obtiene varios tickets por id en una sola consulta (por bloques).
+
+        Args:
+            ticket_ids (List[str]): IDs a buscar.
+
+        Returns:
+            Dict[str, dict]: Tickets encontrados, por ticketId.
+        """
+        found = {}
+        unique_ids = list(dict.fromkeys(ticket_ids))
+        with self._lock:
+            for start in range(0, len(unique_ids), _SQL_BATCH):
+                block = unique_ids[start:start + _SQL_BATCH]
+                rows = self._connection.execute(
+                    f"SELECT {', '.join(TICKET_FIELDS)} FROM tickets WHERE ticketId IN ({','.join('?' * len(block))})",
+                    block,
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = dict(zip(TICKET_FIELDS, row))
+        return found
+
+    def filter_ids(
+        self,
+        priorities: Optional[List[str]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        department: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Devuelve los ids de los tickets que cumplen los filtros, resueltos con los índices secundarios.
+
+        Args:
+            priorities (Optional[List[str]]): Prioridades aceptadas.
+            date_from (Optional[str]): Fecha de creación mínima (YYYY-MM-DD, inclusive).
+            date_to (Optional[str]): Fecha de creación máxima (YYYY-MM-DD, inclusive).
+            department (Optional[str]): Departamento del owner (sin distinguir mayúsculas).
+
+        Returns:
+            List[str]: IDs de los tickets que cumplen todos los filtros.
+        """
+        conditions, params = [], []
+        if priorities:
+            conditions.append(f"priority IN ({','.join('?' * len(priorities))})")
+            params.extend(priorities)
+        if date_from:
+            conditions.append("creationDate >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("creationDate <= ?")
+            params.append(date_to)
+        if department:
+            conditions.append("department = ?")
+            params.append(department.strip().lower())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return [row[0] for row in self._connection.execute(f"SELECT ticketId FROM tickets{where}", params)]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[dict]:
+        """Itera todos los tickets guardados, por bloques."""
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT {', '.join(TICKET_FIELDS)} FROM tickets WHERE ticketId > ? ORDER BY ticketId LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(TICKET_FIELDS, row))
+            last_id = rows[-1][0]
+
+    def iter_updated(self, after_seq: int, batch_size: int = 1000) -> Iterator[Tuple[int, dict]]:
+        """Itera (secuencia, ticket) de los tickets guardados o actualizados después de `after_seq`."""
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT updated_seq, {', '.join(TICKET_FIELDS)} FROM tickets "
+                    f"WHERE updated_seq > ? ORDER BY updated_seq LIMIT ?",
+                    (after_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], dict(zip(TICKET_FIELDS, row[1:]))
+            after_seq = rows[-1][0]
+
+    def last_seq(self) -> int:
+        """Secuencia de la última actualización."""
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(MAX(updated_seq), 0) FROM tickets").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+
+ticket_store = TicketStore()
@@ -0,0 +1,232 @@
+"""
+Módulo para el parseo incremental de archivos de tickets.
+Soporta arrays JSON y NDJSON (un objeto por línea) leyendo por bloques,
+sin cargar el archivo completo en memoria.
+"""
+
+import re
+import json
+import codecs
+from typing import Any, AsyncIterator, BinaryIO, Iterator, List, NamedTuple, Optional
+
+STREAM_READ_SIZE = 64 * 1024
+
+# Fuera de un string sólo interesan delimitadores de estructura y comillas;
+# dentro de un string, comillas de cierre y escapes
+_STRUCTURE_PATTERN = re.compile(r'[{}\[\]"]')
+_STRING_PATTERN = re.compile(r'["\\]')
+_WHITESPACE_PATTERN = re.compile(r"\s*")
+
+
+class ParsedRecord(NamedTuple):
+    """Un registro del archivo: `data` si se pudo parsear, `error` en caso contrario."""
+    index: int
+    data: Optional[Any]
+    error: Optional[str]
+
+
+class StreamParseError(ValueError):
+    """Error estructural que impide seguir leyendo el archivo."""
+
+
+class IncrementalRecordParser:
+    """
+    Parser incremental de registros JSON.
+
+    Se alimenta con bloques de bytes (`feed`) y devuelve los registros completos
+    encontrados hasta el momento. El buffer sólo retiene el registro en curso.
+
+    Formatos:
+        - "array": un array JSON de objetos.
+        - "ndjson": un objeto JSON por línea.
+        - "auto": "array" si el primer carácter es '[', "ndjson" en otro caso.
+    """
+
+    def __init__(self, format: str = "auto"):
+        if format not in ("auto", "array", "ndjson"):
+            raise ValueError(f"Formato desconocido: {format}")
+        self._format = format
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._index = 0
+        self._started = False
+        self._finished = False
+        # Estado del escaneo del elemento en curso (modo array)
+        self._value_start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._expect_separator = False
+
+    def feed(self, data: bytes) -> List[ParsedRecord]:
+        """Agrega un bloque de bytes y devuelve los registros completos."""
+        self._buffer += self._decoder.decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> List[ParsedRecord]:
+        """Indica el fin del stream y devuelve los registros restantes."""
+        self._buffer += self._decoder.decode(b"", final=True)
+        records = self._parse(final=True)
+        if self._format == "array" and not self._finished:
+            raise StreamParseError("El archivo terminó antes de cerrar el array JSON")
+        return records
+
+    def _parse(self, final: bool) -> List[ParsedRecord]:
+        if not self._started:
+            self._pos = _WHITESPACE_PATTERN.match(self._buffer, self._pos).end()
+            if self._pos >= len(self._buffer):
+                return []
+            if self._format == "auto":
+                self._format = "array" if self._buffer[self._pos] == "[" else "ndjson"
+            if self._format == "array":
+                if self._buffer[self._pos] != "[":
+                    raise StreamParseError("Se esperaba '[' al inicio del archivo")
+                self._pos += 1
+            self._started = True
+
+        if self._format == "ndjson":
+            records = self._parse_lines(final)
+        else:
+            records = self._parse_array()
+
+        # Descartar lo ya consumido para mantener el buffer acotado
+        consumed = self._pos if self._value_start is None else self._value_start
+        if consumed:
+            self._buffer = self._buffer[consumed:]
+            self._pos -= consumed
+            if self._value_start is not None:
+                self._value_start = 0
+        return records
+
+    def _emit(self, text: str) -> ParsedRecord:
+        index = self._index
+        self._index += 1
+        try:
+            return ParsedRecord(index, json.loads(text), None)
+        except json.JSONDecodeError as e:
+            return ParsedRecord(index, None, f"JSON inválido: {str(e)}")
+
+    def _parse_lines(self, final: bool) -> List[ParsedRecord]:
+        records = []
+        while True:
+            newline = self._buffer.find("\n", self._pos)
+            if newline == -1:
+                if final and self._buffer[self._pos:].strip():
+                    records.append(self._emit(self._buffer[self._pos:]))
+                    self._pos = len(self._buffer)
+                return records
+            line = self._buffer[self._pos:newline]
+            self._pos = newline + 1
+            if line.strip():
+                records.append(self._emit(line))
+
+    def _parse_array(self) -> List[ParsedRecord]:
+        records = []
+        buffer = self._buffer
+        while not self._finished:
+            if self._value_start is None:
+                # Entre elementos: espacios, comas y el cierre del array
+                self._pos = _WHITESPACE_PATTERN.match(buffer, self._pos).end()
+                if self._pos >= len(buffer):
+                    break
+                char = buffer[self._pos]
+                if char == "]":
+                    self._pos += 1
+                    self._finished = True
+                    break
+                if self._expect_separator:
+                    if char != ",":
+                        raise StreamParseError(f"Se esperaba ',' o ']' después del registro {self._index - 1}")
+                    self._pos += 1
+                    self._expect_separator = False
+                    continue
+                if char not in "{[":
+                    raise StreamParseError(f"Se esperaba un objeto JSON en el registro {self._index}")
+                self._value_start = self._pos
+                self._depth = 0
+
+            # Dentro de un elemento: se salta hasta el próximo carácter relevante
+            while True:
+                if self._in_string:
+                    match = _STRING_PATTERN.search(buffer, self._pos)
+                    if match is None:
+                        self._pos = len(buffer)
+                        return records
+                    if match.group() == "\\":
+                        if match.end() >= len(buffer):
+                            # El escape está cortado entre bloques: se reintenta con el próximo
+                            self._pos = match.start()
+                            return records
+                        self._pos = match.end() + 1
+                        continue
+                    self._in_string = False
+                    self._pos = match.end()
+                    continue
+
+                match = _STRUCTURE_PATTERN.search(buffer, self._pos)
+                if match is None:
+                    self._pos = len(buffer)
+                    return records
+                self._pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        records.append(self._emit(buffer[self._value_start:self._pos]))
+                        self._value_start = None
+                        self._expect_separator = True
+                        break
+        return records
+
+
+def iter_records(file: BinaryIO, format: str = "auto", read_size: int = STREAM_READ_SIZE) -> Iterator[ParsedRecord]:
+    """
+    Itera los registros de un archivo binario leyéndolo por bloques.
+
+    Args:
+        file (BinaryIO): Archivo (o stream) abierto en modo binario.
+        format (str): "auto", "array" o "ndjson".
+        read_size (int): Tamaño de cada bloque leído.
+
+    Yields:
+        ParsedRecord: Registros en el orden del archivo.
+    """
+    parser = IncrementalRecordParser(format)
+    while True:
+        chunk = file.read(read_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_records(chunks: AsyncIterator[bytes], format: str = "auto") -> AsyncIterator[ParsedRecord]:
+    """
+    Versión asíncrona de `iter_records` sobre un iterador de bloques (ej. el body de un request).
+
+    Args:
+        chunks (AsyncIterator[bytes]): Bloques de bytes.
+        format (str): "auto", "array" o "ndjson".
+
+    Yields:
+        ParsedRecord: Registros en el orden del stream.
+    """
+    parser = IncrementalRecordParser(format)
+    async for chunk in chunks:
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
+
+
+def guess_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """Deduce el formato a partir del nombre de archivo o del content-type."""
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type):
+        return "ndjson"
+    return "auto"
@@ -0,0 +1,485 @@
+"""
+Local stand-ins for the external services used by the API and the agent, for offline benchmarks.
+
+One HTTP server emulates, on the same port:
+- the Groq chat completions API (OpenAI format, including streaming),
+- the Ollama embeddings API,
+- the Pinecone control plane (describe index) and data plane (upsert, query, delete),
+- the Tavily search API.
+
+Each service has its own fault injector (latency, jitter and error rate), so a run can model a
+slow LLM or a flaky vector database. The real SDKs are pointed at the server through their
+base URL environment variables (see `service_environment`), so the code under test is unchanged.
+
+Run it with `python -m benchmarks.fakes --port 8900 --config '{"groq": {"latency_ms": 300}}'`.
+"""
+
+import re
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SERVICES = ("groq", "ollama", "pinecone", "tavily")
+PINECONE_INDEX_NAME = "benchmark"
+DEFAULT_EMBEDDING_DIMENSION = 384
+
+
+@dataclass
+class FaultConfig:
+    """Latency and error injection for one fake service."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Sent as Retry-After on 429 responses (seconds)
+    retry_after_seconds: float = 1.0
+
+
+DEFAULT_ERROR_STATUS = {"groq": 429, "ollama": 500, "pinecone": 503, "tavily": 500}
+
+
+@dataclass
+class FakeServicesConfig:
+    faults: Dict[str, FaultConfig] = field(default_factory=dict)
+    embedding_dimension: int = DEFAULT_EMBEDDING_DIMENSION
+    # Approximate size of each fake completion, in words
+    completion_words: int = 60
+    seed: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FakeServicesConfig":
+        faults = {
+            service: FaultConfig(**{"error_status": DEFAULT_ERROR_STATUS[service], **data.get(service, {})})
+            for service in SERVICES
+        }
+        return cls(
+            faults=faults,
+            embedding_dimension=data.get("embedding_dimension", DEFAULT_EMBEDDING_DIMENSION),
+            completion_words=data.get("completion_words", 60),
+            seed=data.get("seed", 0),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            **{service: asdict(fault) for service, fault in self.faults.items()},
+            "embedding_dimension": self.embedding_dimension,
+            "completion_words": self.completion_words,
+            "seed": self.seed,
+        }
+
+
+class FaultInjector:
+    """Applies the configured latency and decides which calls fail; counts both."""
+
+    def __init__(self, config: FaultConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self.calls = 0
+        self.errors = 0
+
+    async def delay(self) -> None:
+        latency = self.config.latency_ms + self.rng.uniform(0, self.config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def failure(self) -> Optional[JSONResponse]:
+        """Error response to return instead of the real one, or None."""
+        self.calls += 1
+        if self.rng.random() >= self.config.error_rate:
+            return None
+        self.errors += 1
+        headers = {}
+        if self.config.error_status == 429:
+            headers["retry-after"] = str(self.config.retry_after_seconds)
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "benchmark_fault"}},
+            status_code=self.config.error_status,
+            headers=headers,
+        )
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def hashed_embedding(text: str, dimension: int) -> List[float]:
+    """
+    Deterministic bag-of-words embedding (hashing trick): texts sharing words get similar vectors,
+    so similarity search over the fakes returns meaningful neighbours.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        bucket = zlib.crc32(token.encode("utf-8"))
+        vector[bucket % dimension] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[zlib.crc32(text.encode("utf-8")) % dimension] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+def _matches_filter(metadata: dict, condition: Optional[dict]) -> bool:
+    """Subset of Pinecone's metadata filter language: implicit equality, $eq, $ne, $in, $nin, $and, $or."""
+    if not condition:
+        return True
+    for key, value in condition.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, item) for item in value):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, item) for item in value):
+                return False
+            continue
+        actual = metadata.get(key)
+        if not isinstance(value, dict):
+            value = {"$eq": value}
+        for operator, operand in value.items():
+            if operator == "$eq" and actual != operand:
+                return False
+            if operator == "$ne" and actual == operand:
+                return False
+            if operator == "$in" and actual not in operand:
+                return False
+            if operator == "$nin" and actual in operand:
+                return False
+    return True
+
+
+class FakePineconeIndex:
+    """In-memory index with exact cosine search; the matrix grows by doubling."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._vectors = np.zeros((1024, dimension), dtype=np.float32)
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[dict]] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[dict]) -> int:
+        with self._lock:
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                norm = np.linalg.norm(values)
+                row = self._rows.get(vector["id"])
+                if row is None:
+                    row = len(self._ids)
+                    if row >= len(self._vectors):
+                        self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+                    self._ids.append(vector["id"])
+                    self._metadata.append(None)
+                    self._rows[vector["id"]] = row
+                self._vectors[row] = values / norm if norm > 0 else values
+                self._metadata[row] = vector.get("metadata") or {}
+        return len(vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is not None:
+                    self._ids[row] = None
+                    self._metadata[row] = None
+                    self._vectors[row] = 0.0
+
+    def query(self, vector: List[float], top_k: int, include_metadata: bool, condition: Optional[dict]) -> List[dict]:
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return []
+            scores = self._vectors[:count] @ np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                scores = scores / norm
+            if condition:
+                allowed = [row for row in range(count) if self._ids[row] and _matches_filter(self._metadata[row], condition)]
+                rows = np.asarray(allowed, dtype=np.int64)
+            else:
+                rows = np.asarray([row for row in range(count) if self._ids[row]], dtype=np.int64)
+            if len(rows) == 0:
+                return []
+            candidate_scores = scores[rows]
+            top = min(top_k, len(rows))
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best])]
+            matches = []
+            for position in best:
+                row = int(rows[position])
+                match = {"id": self._ids[row], "score": float(candidate_scores[position]), "values": []}
+                if include_metadata:
+                    match["metadata"] = dict(self._metadata[row])
+                matches.append(match)
+            return matches
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def _completion_text(words: int, rng: random.Random) -> str:
+    vocabulary = ("revisar", "reiniciar", "configuración", "servicio", "usuario", "equipo", "red", "acceso", "actualizar", "verificar")
+    summary = " ".join(rng.choice(vocabulary) for _ in range(max(1, words)))
+    return json.dumps(
+        {"resumen": summary, "puntos_clave": ["benchmark", "fake"], "contactos": []},
+        ensure_ascii=False,
+    )
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def build_fake_services_app(config: FakeServicesConfig) -> FastAPI:
+    """FastAPI app implementing the subset of each external API that this repository uses."""
+    app = FastAPI(title="Benchmark fake services")
+    rng = random.Random(config.seed)
+    injectors = {service: FaultInjector(config.faults[service], rng) for service in SERVICES}
+    index = FakePineconeIndex(config.embedding_dimension)
+    app.state.index = index
+    app.state.injectors = injectors
+
+    async def inject(service: str) -> Optional[JSONResponse]:
+        injector = injectors[service]
+        await injector.delay()
+        return injector.failure()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "services": {service: {"calls": i.calls, "errors": i.errors} for service, i in injectors.items()},
+            "pinecone_vectors": len(index),
+            "config": config.to_dict(),
+        }
+
+    # --- Groq (OpenAI-compatible chat completions) ---
+
+    @app.get("/openai/v1/models")
+    async def list_models():
+        failure = await inject("groq")
+        if failure is not None:
+            return failure
+        return {"object": "list", "data": [{"id": "benchmark-model", "object": "model", "created": 0, "owned_by": "benchmark"}]}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = await inject("groq")
+        if failure is not None:
+            return failure
+        content = _completion_text(config.completion_words, rng)
+        prompt_tokens = sum(_estimate_tokens(str(message.get("content") or "")) for message in body.get("messages", []))
+        completion_tokens = _estimate_tokens(content)
+        completion_id = f"chatcmpl-{rng.getrandbits(48):x}"
+        model = body.get("model") or "benchmark-model"
+        created = int(time.time())
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        async def events():
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+            for position, piece in enumerate(pieces):
+                delta = {"content": piece}
+                if position == 0:
+                    delta["role"] = "assistant"
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None, "logprobs": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "logprobs": None}],
+                "x_groq": {"usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # --- Ollama embeddings ---
+
+    @app.post("/api/embed")
+    async def ollama_embed(request: Request):
+        body = await request.json()
+        failure = await inject("ollama")
+        if failure is not None:
+            return failure
+        texts = body.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        return {
+            "model": body.get("model", ""),
+            "embeddings": [hashed_embedding(text, config.embedding_dimension) for text in texts],
+        }
+
+    # --- Pinecone control plane ---
+
+    @app.get("/indexes/{name}")
+    async def describe_index(name: str, request: Request):
+        return {
+            "name": name,
+            "metric": "cosine",
+            "dimension": config.embedding_dimension,
+            "host": str(request.base_url).rstrip("/"),
+            "vector_type": "dense",
+            "deletion_protection": "disabled",
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "status": {"ready": True, "state": "Ready"},
+        }
+
+    # --- Pinecone data plane ---
+
+    @app.post("/vectors/upsert")
+    async def pinecone_upsert(request: Request):
+        body = await request.json()
+        failure = await inject("pinecone")
+        if failure is not None:
+            return failure
+        return {"upsertedCount": index.upsert(body.get("vectors", []))}
+
+    @app.post("/vectors/delete")
+    async def pinecone_delete(request: Request):
+        body = await request.json()
+        failure = await inject("pinecone")
+        if failure is not None:
+            return failure
+        index.delete(body.get("ids") or [])
+        return {}
+
+    @app.post("/query")
+    async def pinecone_query(request: Request):
+        body = await request.json()
+        failure = await inject("pinecone")
+        if failure is not None:
+            return failure
+        matches = index.query(
+            body.get("vector") or [],
+            int(body.get("topK", 10)),
+            bool(body.get("includeMetadata")),
+            body.get("filter"),
+        )
+        return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 1}}
+
+    @app.post("/describe_index_stats")
+    async def pinecone_stats():
+        return {"namespaces": {"": {"vectorCount": len(index)}}, "dimension": config.embedding_dimension,
+                "indexFullness": 0.0, "totalVectorCount": len(index)}
+
+    # --- Tavily ---
+
+    @app.post("/search")
+    async def tavily_search(request: Request):
+        body = await request.json()
+        failure = await inject("tavily")
+        if failure is not None:
+            return failure
+        query = body.get("query", "")
+        max_results = int(body.get("max_results", 3))
+        results = [
+            {
+                "title": f"Result {position + 1} for {query[:40]}",
+                "url": f"https://docs.example.com/{zlib.crc32(query.encode('utf-8')):x}/{position}",
+                "content": f"Documentation about {query[:200]}. Restart the service, check the logs and update the client.",
+                "score": round(1.0 - position * 0.1, 2),
+            }
+            for position in range(max_results)
+        ]
+        return {"query": query, "results": results, "response_time": 0.0}
+
+    return app
+
+
+def service_environment(base_url: str) -> Dict[str, str]:
+    """Environment variables that point the real SDKs at the fake server."""
+    return {
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": base_url,
+        "GROQ_API_BASE": base_url,
+        "CHAT_MODEL_NAME": "benchmark-model",
+        "OLLAMA_HOST": base_url,
+        "PINECONE_API_KEY": "benchmark",
+        "PINECONE_CONTROLLER_HOST": base_url,
+        "PINECONE_INDEX_NAME": PINECONE_INDEX_NAME,
+        "TAVILY_API_KEY": "benchmark",
+        "BENCHMARK_TAVILY_URL": base_url,
+    }
+
+
+class FakeTavilyProvider:
+    """
+    Web search provider for the agent (`WEB_SEARCH_PROVIDER=benchmarks.fakes:FakeTavilyProvider`)
+    that calls the fake Tavily endpoint, so search latency and errors go through the injector.
+    Implements the `web_search.WebSearchProvider` interface.
+    """
+
+    name = "fake-tavily"
+
+    def __init__(self):
+        import os
+        self.url = f"{os.environ['BENCHMARK_TAVILY_URL']}/search"
+
+    def search(self, query: str, max_results: int = 3) -> List[dict]:
+        import requests
+        response = requests.post(self.url, json={"query": query, "max_results": max_results}, timeout=30)
+        response.raise_for_status()
+        return response.json()["results"]
+
+    async def asearch(self, query: str, max_results: int = 3) -> List[dict]:
+        import httpx
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(self.url, json={"query": query, "max_results": max_results})
+        response.raise_for_status()
+        return response.json()["results"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the benchmark fake services")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", default="{}", help="JSON FakeServicesConfig (per-service faults, embedding_dimension, ...)")
+    args = parser.parse_args()
+    app = build_fake_services_app(FakeServicesConfig.from_dict(json.loads(args.config)))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""
+Offline benchmark runner.
+
+Starts the fake external services, the ticket API and the agent backend as separate processes
+(wired to the fakes through environment variables), then runs the selected scenarios:
+
+- ingestion: streams a synthetic data set through `/api/ingest_ticket_stream` (throughput),
+- endpoints: concurrent load on every `api/app.py` endpoint (p50/p95/p99 latency, throughput),
+- agent: end-to-end `/solve_ticket` timing on the agent backend.
+
+Results are written as JSON for regression tracking. Example:
+
+    python -m benchmarks.run --tickets 10000 --requests 200 --concurrency 16 \\
+        --groq-latency-ms 400 --pinecone-error-rate 0.01 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import platform
+import argparse
+import tempfile
+import subprocess
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+import numpy as np
+from .fakes import SERVICES, service_environment
+from .ticket_generator import generate_tickets, write_tickets
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+API_DIR = os.path.join(REPO_ROOT, "api")
+AGENT_DIR = os.path.join(REPO_ROOT, "agent_app", "backend")
+SCENARIOS = ("ingestion", "endpoints", "agent")
+RESULTS_VERSION = 1
+
+
+# --- Processes ---
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServiceProcess:
+    """A server started as a child process; its output goes to a log file in the work directory."""
+
+    def __init__(self, name: str, command: List[str], cwd: str, env: Dict[str, str], port: int, log_dir: str):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.url = f"http://127.0.0.1:{port}"
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+        self.startup_seconds: Optional[float] = None
+
+    def start(self, ready_path: str, timeout: float) -> None:
+        self._log = open(self.log_path, "wb")
+        started = time.monotonic()
+        self._process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = started + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with code {self._process.returncode}; see {self.log_path}")
+            try:
+                if httpx.get(self.url + ready_path, timeout=1).status_code < 500:
+                    self.startup_seconds = time.monotonic() - started
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.name} was not ready after {timeout:.0f}s; see {self.log_path}")
+
+    def stop(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._log is not None:
+            self._log.close()
+
+
+def _uvicorn_command(app: str, port: int, workers: int = 1) -> List[str]:
+    command = [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    return command
+
+
+# --- Measurements ---
+
+def latency_summary(seconds: List[float]) -> dict:
+    """Count, mean, p50/p95/p99 and max of a list of durations, in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    values = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def _fake_stats(fakes_url: str) -> dict:
+    return httpx.get(f"{fakes_url}/_stats", timeout=10).json()["services"]
+
+
+def _fake_stats_delta(before: dict, after: dict) -> dict:
+    return {
+        service: {key: after[service][key] - before[service][key] for key in ("calls", "errors")}
+        for service in after
+    }
+
+
+@dataclass
+class EndpointSpec:
+    """How to build the i-th request of an endpoint's load run."""
+    name: str
+    method: str
+    path: Callable[[int, dict], str]
+    build: Callable[[int, dict], dict]
+    stream: bool = False
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    spec: EndpointSpec,
+    requests: int,
+    concurrency: int,
+    context: dict,
+    on_response: Optional[Callable[[httpx.Response], None]] = None,
+) -> dict:
+    """
+    Send `requests` requests to one endpoint from `concurrency` concurrent workers.
+    Latencies of successful (2xx) and failed requests are reported separately; streaming
+    endpoints also report the time to the first byte. `on_response` sees each non-streamed response.
+    """
+    latencies: List[float] = []
+    failed: List[float] = []
+    first_bytes: List[float] = []
+    statuses: Counter = Counter()
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        for i in pending:
+            kwargs = spec.build(i, context)
+            started = time.perf_counter()
+            status: Any
+            try:
+                if spec.stream:
+                    first_byte = None
+                    async with client.stream(spec.method, spec.path(i, context), **kwargs) as response:
+                        async for _ in response.aiter_bytes():
+                            if first_byte is None:
+                                first_byte = time.perf_counter() - started
+                    if first_byte is not None:
+                        first_bytes.append(first_byte)
+                else:
+                    response = await client.request(spec.method, spec.path(i, context), **kwargs)
+                    if on_response is not None:
+                        on_response(response)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[str(status)] += 1
+            (latencies if isinstance(status, int) and status < 300 else failed).append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "status_counts": dict(statuses),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests / wall, 3) if wall > 0 else None,
+        "latency_ms": latency_summary(latencies),
+        "failed_latency_ms": latency_summary(failed),
+    }
+    if spec.stream:
+        result["ttfb_ms"] = latency_summary(first_bytes)
+    return result
+
+
+# --- Endpoints of api/app.py ---
+
+def _ticket(i: int, context: dict) -> dict:
+    tickets = context["tickets"]
+    return tickets[i % len(tickets)]
+
+
+def _new_ticket(i: int, context: dict) -> dict:
+    # Ingestion endpoints get unique ids so each request writes a new ticket
+    return {**_ticket(i, context), "ticketId": f"BENCH-{context['run_id']}-{i:07d}"}
+
+
+def _news(i: int, context: dict) -> dict:
+    ticket = _ticket(i, context)
+    return {"title": f"Noticia {i}: {ticket['impact'][:60]}", "content": ticket["description"]}
+
+
+def _ndjson(tickets: List[dict]) -> bytes:
+    return "".join(json.dumps(ticket, ensure_ascii=False) + "\n" for ticket in tickets).encode("utf-8")
+
+
+def _upload(i: int, context: dict, prefix: str) -> dict:
+    tickets = [_new_ticket(i * context["upload_size"] + j, {**context, "run_id": f"{context['run_id']}{prefix}"})
+               for j in range(context["upload_size"])]
+    return {"files": {"file": (f"bench_{i}.ndjson", _ndjson(tickets), "application/x-ndjson")}}
+
+
+def _static(path: str) -> Callable[[int, dict], str]:
+    return lambda i, context: path
+
+
+ENDPOINTS = [
+    EndpointSpec("welcome", "GET", _static("/"), lambda i, c: {}),
+    EndpointSpec("summarize_news", "POST", _static("/api/summarize_news"),
+                 lambda i, c: {"json": _news(i, c), "headers": c["llm_headers"]}),
+    EndpointSpec("summarize_news_batch", "POST", _static("/api/summarize_news/batch"),
+                 lambda i, c: {"json": [_news(i * c["batch_size"] + j, c) for j in range(c["batch_size"])],
+                               "headers": c["llm_headers"]}),
+    EndpointSpec("summarize_news_stream", "POST", _static("/api/summarize_news/stream"),
+                 lambda i, c: {"json": _news(i, c), "headers": c["llm_headers"]}, stream=True),
+    EndpointSpec("ingest_json_ticket", "POST", _static("/api/ingest_json_ticket"),
+                 lambda i, c: {"json": _new_ticket(i, {**c, "run_id": c["run_id"] + "T"})}),
+    EndpointSpec("ingest_json_file", "POST", _static("/api/ingest_json_file"), lambda i, c: _upload(i, c, "F")),
+    EndpointSpec("ingest_ticket_stream", "POST", _static("/api/ingest_ticket_stream"),
+                 lambda i, c: {"content": _ndjson([_new_ticket(i * c["upload_size"] + j, {**c, "run_id": c["run_id"] + "S"})
+                                                   for j in range(c["upload_size"])]),
+                               "headers": {"content-type": "application/x-ndjson"}}),
+    EndpointSpec("submit_ingestion_job", "POST", _static("/api/ingestion_jobs"), lambda i, c: _upload(i, c, "J")),
+    EndpointSpec("list_ingestion_jobs", "GET", _static("/api/ingestion_jobs"), lambda i, c: {}),
+    EndpointSpec("get_ingestion_job", "GET", lambda i, c: f"/api/ingestion_jobs/{c['job_id']}", lambda i, c: {}),
+    EndpointSpec("cancel_ingestion_job", "POST", lambda i, c: f"/api/ingestion_jobs/{c['job_id']}/cancel", lambda i, c: {}),
+    EndpointSpec("get_similar_tickets", "POST", _static("/api/get_similar_tickets"), lambda i, c: {"json": _ticket(i, c)}),
+    EndpointSpec("get_similar_tickets_lexical", "POST", _static("/api/get_similar_tickets"),
+                 lambda i, c: {"json": _ticket(i, c), "params": {"mode": "lexical"}}),
+    EndpointSpec("get_similar_tickets_hybrid", "POST", _static("/api/get_similar_tickets"),
+                 lambda i, c: {"json": _ticket(i, c), "params": {"mode": "hybrid"}}),
+    EndpointSpec("get_similar_tickets_filtered", "POST", _static("/api/get_similar_tickets"),
+                 lambda i, c: {"json": _ticket(i, c), "params": {"priority": ["High", "Urgent"]}}),
+    EndpointSpec("get_similar_tickets_batch", "POST", _static("/api/get_similar_tickets/batch"),
+                 lambda i, c: {"json": [_ticket(i * c["batch_size"] + j, c) for j in range(c["batch_size"])]}),
+    EndpointSpec("augment_ticket_information", "POST", _static("/api/augment_ticket_information"),
+                 lambda i, c: {"json": _ticket(i, c), "headers": c["llm_headers"]}),
+    EndpointSpec("augment_ticket_information_stream", "POST", _static("/api/augment_ticket_information/stream"),
+                 lambda i, c: {"json": _ticket(i, c), "headers": c["llm_headers"]}, stream=True),
+]
+ENDPOINT_NAMES = [spec.name for spec in ENDPOINTS]
+
+
+# --- Scenarios ---
+
+async def _file_chunks(path: str, chunk_size: int = 1 << 20):
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def ingestion_scenario(api_url: str, fakes_url: str, tickets_path: str) -> dict:
+    """Stream the synthetic data set through `/api/ingest_ticket_stream` and measure throughput."""
+    before = _fake_stats(fakes_url)
+    size = os.path.getsize(tickets_path)
+    async with httpx.AsyncClient(base_url=api_url, timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/ingest_ticket_stream",
+            content=_file_chunks(tickets_path),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    result = response.json()
+    return {
+        "file_bytes": size,
+        "wall_seconds": round(elapsed, 3),
+        "tickets_per_second": round(result["ingested"] / elapsed, 3) if elapsed > 0 else None,
+        "megabytes_per_second": round(size / 1e6 / elapsed, 3) if elapsed > 0 else None,
+        "received": result["received"],
+        "ingested": result["ingested"],
+        "failed": result["failed"],
+        "windows": result["windows"],
+        "server_stats": result["stats"],
+        "external_calls": _fake_stats_delta(before, _fake_stats(fakes_url)),
+    }
+
+
+JOB_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+async def wait_for_jobs(client: httpx.AsyncClient, job_ids: List[str], poll_seconds: float = 0.2) -> float:
+    """Poll the ingestion jobs until all of them reach a terminal status; returns the seconds waited."""
+    started = time.perf_counter()
+    pending = set(job_ids)
+    while pending:
+        for job_id in list(pending):
+            response = await client.get(f"/api/ingestion_jobs/{job_id}")
+            if response.status_code == 404 or response.json()["status"] in JOB_TERMINAL_STATUSES:
+                pending.discard(job_id)
+        if pending:
+            await asyncio.sleep(poll_seconds)
+    return time.perf_counter() - started
+
+
+async def endpoints_scenario(api_url: str, fakes_url: str, context: dict, names: List[str], requests: int, concurrency: int) -> dict:
+    """Concurrent load on each selected endpoint, one endpoint at a time."""
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=None, limits=limits) as client:
+        # A finished job for the job status/cancel endpoints
+        job = await client.post("/api/ingestion_jobs", **_upload(0, context, "setup"))
+        job.raise_for_status()
+        context["job_id"] = job.json()["job_id"]
+        await wait_for_jobs(client, [context["job_id"]])
+        for spec in ENDPOINTS:
+            if spec.name not in names:
+                continue
+            job_ids: List[str] = []
+
+            def collect_job(response: httpx.Response) -> None:
+                if response.status_code == 202:
+                    job_ids.append(response.json()["job_id"])
+
+            before = _fake_stats(fakes_url)
+            result = await run_load(client, spec, requests, concurrency, context, on_response=collect_job)
+            if job_ids:
+                # Submitted jobs run in the background: let them finish so they do not load the next endpoints
+                result["jobs_drain_seconds"] = round(await wait_for_jobs(client, job_ids), 3)
+            result["external_calls"] = _fake_stats_delta(before, _fake_stats(fakes_url))
+            results[spec.name] = result
+            print(f"  {spec.name:<36} ok {result['ok']:>5}/{requests:<5} {result['throughput_rps'] or 0:>9.1f} req/s  "
+                  f"p50 {result['latency_ms'].get('p50', 0):>9.1f} ms  p99 {result['latency_ms'].get('p99', 0):>9.1f} ms",
+                  file=sys.stderr)
+    return results
+
+
+async def agent_scenario(agent_url: str, fakes_url: str, tickets: List[dict], requests: int, concurrency: int) -> dict:
+    """End-to-end `/solve_ticket` timing; also counts answers reused from the solution memo."""
+    reused = Counter()
+
+    def count_reused(response: httpx.Response) -> None:
+        if response.status_code == 200:
+            reused[bool(response.json().get("reused"))] += 1
+
+    spec = EndpointSpec(
+        "solve_ticket", "POST", _static("/solve_ticket"),
+        lambda i, context: {"json": {"ticket": tickets[i % len(tickets)]}},
+    )
+    before = _fake_stats(fakes_url)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=agent_url, timeout=None, limits=limits) as client:
+        result = await run_load(client, spec, requests, concurrency, {}, on_response=count_reused)
+    result["reused"] = reused[True]
+    result["external_calls"] = _fake_stats_delta(before, _fake_stats(fakes_url))
+    return result
+
+
+# --- Runner ---
+
+def _fake_config(args: argparse.Namespace) -> dict:
+    config = {"embedding_dimension": args.embedding_dimension, "seed": args.seed}
+    for service in SERVICES:
+        config[service] = {
+            "latency_ms": getattr(args, f"{service}_latency_ms"),
+            "jitter_ms": getattr(args, f"{service}_jitter_ms"),
+            "error_rate": getattr(args, f"{service}_error_rate"),
+        }
+    return config
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_environment(args: argparse.Namespace, workdir: str, fakes_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(service_environment(fakes_url))
+    env.update({
+        "VECTOR_STORE_BACKEND": args.vector_store,
+        "LOCAL_VECTOR_STORE_PATH": os.path.join(workdir, "vector_store"),
+        "TICKET_STORE_PATH": os.path.join(workdir, "tickets.sqlite"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite"),
+        "RETRIEVAL_CACHE_PATH": os.path.join(workdir, "retrieval_cache.sqlite"),
+        "INDEX_GENERATION_PATH": os.path.join(workdir, "index_generation"),
+        "API_WORKERS": str(args.api_workers),
+        "INGESTION_JOBS_DIR": os.path.join(workdir, "ingestion_jobs"),
+        "WEB_SEARCH_PROVIDER": "benchmarks.fakes:FakeTavilyProvider",
+        "WEB_SEARCH_CACHE_PATH": os.path.join(workdir, "web_search_cache.sqlite"),
+        "SOLUTION_MEMO_PATH": os.path.join(workdir, "solution_memo.sqlite"),
+        "AGENT_RETRIEVAL_MODE": "http",
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+    })
+    # The fakes have no quota: unless set explicitly, the Groq limiter should not throttle the run
+    env.setdefault("GROQ_REQUESTS_PER_MINUTE", "1000000")
+    env.setdefault("GROQ_TOKENS_PER_MINUTE", "1000000000")
+    if args.disable_caches:
+        for name in ("EMBEDDING_CACHE_ENABLED", "RETRIEVAL_CACHE_ENABLED", "LLM_CACHE_ENABLED",
+                     "WEB_SEARCH_CACHE_ENABLED", "SOLUTION_MEMO_ENABLED"):
+            env[name] = "false"
+    return env
+
+
+async def run_scenarios(args: argparse.Namespace, workdir: str, services: dict, tickets_path: str) -> dict:
+    results = {}
+    scenarios = args.scenarios.split(",")
+    # Ingestion always runs: the other scenarios need an indexed data set
+    print(f"ingestion: {args.tickets} tickets", file=sys.stderr)
+    results["ingestion"] = await ingestion_scenario(services["api"].url, services["fakes"].url, tickets_path)
+    print(f"  {results['ingestion']['tickets_per_second']} tickets/s", file=sys.stderr)
+    # Query tickets: new synthetic tickets (different seed) from the same distribution as the data set
+    query_tickets = list(generate_tickets(max(args.requests, args.agent_requests, 100), seed=args.seed + 1))
+    if "endpoints" in scenarios:
+        print("endpoints:", file=sys.stderr)
+        context = {
+            "tickets": query_tickets,
+            "run_id": f"{int(time.time())}",
+            "batch_size": args.batch_size,
+            "upload_size": args.upload_size,
+            "llm_headers": {"X-LLM-Cache": "bypass"} if args.disable_caches else {},
+        }
+        names = args.endpoints.split(",") if args.endpoints else ENDPOINT_NAMES
+        results["endpoints"] = await endpoints_scenario(
+            services["api"].url, services["fakes"].url, context, names, args.requests, args.concurrency
+        )
+    if "agent" in scenarios:
+        print(f"agent: {args.agent_requests} tickets", file=sys.stderr)
+        results["agent"] = await agent_scenario(
+            services["agent"].url, services["fakes"].url, query_tickets, args.agent_requests, args.agent_concurrency
+        )
+        print(f"  p50 {results['agent']['latency_ms'].get('p50', 0):.1f} ms, reused {results['agent']['reused']}", file=sys.stderr)
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="llm_apps_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    tickets_path = args.tickets_file
+    if tickets_path is None:
+        tickets_path = os.path.join(workdir, "tickets.ndjson")
+        print(f"generating {args.tickets} tickets in {tickets_path}", file=sys.stderr)
+        write_tickets(tickets_path, args.tickets, "ndjson", args.seed)
+
+    fakes_port, api_port, agent_port = free_port(), free_port(), free_port()
+    fake_config = _fake_config(args)
+    fakes = ServiceProcess(
+        "fakes",
+        [sys.executable, "-m", "benchmarks.fakes", "--port", str(fakes_port), "--config", json.dumps(fake_config)],
+        REPO_ROOT, dict(os.environ), fakes_port, workdir,
+    )
+    services = {"fakes": fakes}
+    try:
+        fakes.start("/health", args.startup_timeout)
+        env = build_environment(args, workdir, fakes.url)
+        services["api"] = ServiceProcess(
+            "api", _uvicorn_command("app:app", api_port, args.api_workers), API_DIR, env, api_port, workdir
+        )
+        # /health/ready answers 503 until the warmup has reached every dependency
+        services["api"].start("/health/ready", args.startup_timeout)
+        if "agent" in args.scenarios.split(","):
+            agent_env = {**env, "TICKET_API_URL": services["api"].url, "AGENT_MODE": args.agent_mode}
+            services["agent"] = ServiceProcess("agent", _uvicorn_command("main:app", agent_port), AGENT_DIR, agent_env, agent_port, workdir)
+            services["agent"].start("/docs", args.startup_timeout)
+
+        started_at = datetime.now(timezone.utc).isoformat()
+        scenarios = asyncio.run(run_scenarios(args, workdir, services, tickets_path))
+        return {
+            "version": RESULTS_VERSION,
+            "started_at": started_at,
+            "git_commit": _git_commit(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "fakes": fake_config,
+            "external_calls_total": _fake_stats(fakes.url),
+            "startup_seconds": {name: service.startup_seconds for name, service in services.items()},
+            "scenarios": scenarios,
+        }
+    finally:
+        for service in reversed(list(services.values())):
+            service.stop()
+        if args.workdir is None and not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"work directory (logs, stores): {workdir}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ticket API and the agent")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated: ingestion,endpoints,agent")
+    parser.add_argument("--tickets", type=int, default=10000, help="Synthetic tickets to ingest")
+    parser.add_argument("--tickets-file", default=None, help="Existing NDJSON data set to ingest instead of generating one")
+    parser.add_argument("--endpoints", default=None, help=f"Comma-separated subset of: {','.join(ENDPOINT_NAMES)}")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=16, help="Items per request on batch endpoints")
+    parser.add_argument("--upload-size", type=int, default=50, help="Tickets per request on file/stream ingestion endpoints")
+    parser.add_argument("--agent-requests", type=int, default=20)
+    parser.add_argument("--agent-concurrency", type=int, default=4)
+    parser.add_argument("--agent-mode", choices=("fast", "react"), default="fast")
+    parser.add_argument("--vector-store", default="pinecone", help="VECTOR_STORE_BACKEND of the API (pinecone uses the fake)")
+    parser.add_argument("--api-workers", type=int, default=1, help="Worker processes of the API (uvicorn --workers)")
+    parser.add_argument("--embedding-dimension", type=int, default=384)
+    parser.add_argument("--disable-caches", action="store_true", help="Disable embedding/retrieval/LLM/web caches and the solution memo")
+    for service in SERVICES:
+        parser.add_argument(f"--{service}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-jitter-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--workdir", default=None, help="Directory for stores and logs (default: a temporary one, removed afterwards)")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    results = run(args)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
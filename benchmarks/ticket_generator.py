@@ -0,0 +1,129 @@
+"""
+Synthetic ticket generator: scales `api/static/mock/support_tickets.json` to any size (10^4-10^6+).
+
+Each synthetic ticket starts from a seed ticket and varies the date, priority, owner and the
+description (extra detail sentences with hostnames, error codes and asset numbers), so the data
+set keeps the vocabulary and length distribution of the real mock data without being a set of
+exact copies. Tickets are produced lazily and written as NDJSON or a JSON array without holding
+the data set in memory.
+
+Run it with `python -m benchmarks.ticket_generator --count 100000 --output tickets.ndjson`.
+"""
+
+import os
+import json
+import random
+import argparse
+from datetime import date, timedelta
+from typing import Iterator, List, Optional
+
+SEED_TICKETS_PATH = os.path.join(os.path.dirname(__file__), "..", "api", "static", "mock", "support_tickets.json")
+
+PRIORITIES = ("Low", "Medium", "High", "Urgent")
+PRIORITY_WEIGHTS = (0.3, 0.4, 0.2, 0.1)
+FIRST_NAMES = ("Ana", "Carlos", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Javier", "Camila", "Pablo")
+LAST_NAMES = ("Torres", "Ruiz", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "Sánchez", "Romero")
+DEPARTMENTS = ("Contabilidad", "Marketing", "Ventas", "Recursos Humanos", "IT", "Legales", "Operaciones", "Finanzas")
+DETAIL_TEMPLATES = (
+    "El error aparece en el equipo PC-{number:04d}.",
+    "El mensaje indica el código de error 0x{code:08X}.",
+    "También ocurre al conectarse al servidor srv{number:02d}.corp.local.",
+    "Sucede desde la actualización de la semana pasada (versión {major}.{minor}.{number}).",
+    "Afecta a {number} personas del área.",
+    "El problema es intermitente y ocurre cada {minor} minutos aproximadamente.",
+    "Se probó desde otra red y el resultado fue el mismo.",
+    "El ticket anterior relacionado es el #{number:05d}.",
+)
+
+
+def load_seed_tickets(path: str = SEED_TICKETS_PATH) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _ticket_prefix(seed_ticket: dict) -> str:
+    return seed_ticket["ticketId"].split("-", 1)[0]
+
+
+def generate_tickets(
+    count: int,
+    seed: int = 0,
+    seed_tickets: Optional[List[dict]] = None,
+    start_date: date = date(2024, 1, 1),
+    days: int = 730,
+    max_details: int = 3,
+) -> Iterator[dict]:
+    """
+    Yield `count` synthetic tickets derived from the seed tickets.
+
+    Args:
+        count (int): Number of tickets to generate.
+        seed (int): Random seed; the same seed produces the same data set.
+        seed_tickets (Optional[List[dict]]): Base tickets (default: the API's mock tickets).
+        start_date (date): First creation date.
+        days (int): Creation dates are spread over this many days from `start_date`.
+        max_details (int): Maximum number of extra detail sentences per description.
+    """
+    rng = random.Random(seed)
+    seed_tickets = seed_tickets or load_seed_tickets()
+    for number in range(count):
+        base = rng.choice(seed_tickets)
+        created = start_date + timedelta(days=rng.randrange(days))
+        details = [
+            template.format(
+                number=rng.randrange(1, 10000),
+                code=rng.getrandbits(32),
+                major=rng.randrange(1, 20),
+                minor=rng.randrange(1, 60),
+            )
+            for template in rng.sample(DETAIL_TEMPLATES, rng.randint(0, max_details))
+        ]
+        owner = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} - {rng.choice(DEPARTMENTS)}"
+        yield {
+            "ticketId": f"{_ticket_prefix(base)}-{created.strftime('%Y%m%d')}-{number:07d}",
+            "creationDate": created.isoformat(),
+            "priority": rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            "owner": owner,
+            "description": " ".join([base["description"], *details]),
+            "impact": base["impact"],
+            "actions": base["actions"],
+        }
+
+
+def write_tickets(path: str, count: int, format: str = "ndjson", seed: int = 0) -> int:
+    """
+    Write `count` synthetic tickets to `path` as NDJSON (one ticket per line) or a JSON array.
+
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        if format == "ndjson":
+            for ticket in generate_tickets(count, seed=seed):
+                file.write(json.dumps(ticket, ensure_ascii=False))
+                file.write("\n")
+        elif format == "array":
+            file.write("[")
+            for position, ticket in enumerate(generate_tickets(count, seed=seed)):
+                if position:
+                    file.write(",\n")
+                file.write(json.dumps(ticket, ensure_ascii=False))
+            file.write("]\n")
+        else:
+            raise ValueError(f"Unknown format: {format}. Options: ndjson, array")
+    return os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic support tickets")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--output", default="synthetic_tickets.ndjson")
+    parser.add_argument("--format", choices=("ndjson", "array"), default="ndjson")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    size = write_tickets(args.output, args.count, args.format, args.seed)
+    print(f"Wrote {args.count} tickets to {args.output} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()